@@ -0,0 +1,71 @@
+'''
+Run the benchmark suite from the repository root:
+
+    python -m benchmarks --output results.json
+    python -m benchmarks --baseline baseline.json --threshold 0.2 -k 'canvas.*'
+'''
+from typing import List
+import argparse
+import json
+import os
+import sys
+
+from benchmarks import harness, suite
+
+
+def main(argv: List[str] | None = None) -> int:
+    '''Command line entry point. Returns 1 if anything regressed past the threshold.'''
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Run the benchmark suite.')
+    parser.add_argument('-k', dest='pattern', default='*',
+                        help='Only run cases whose names match this glob pattern')
+    parser.add_argument('--sizes', default=','.join(suite.SIZES),
+                        help='Comma separated map sizes to run (' + ', '.join(suite.SIZES) + ')')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare against results from an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Slowdown over the baseline that counts as a regression')
+    parser.add_argument('--list', action='store_true', help='List the cases and exit')
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    sizes = set(args.sizes.split(','))
+    benchmarks = []
+    for bench in harness.BENCHMARKS:
+        if 'size' in bench.params:
+            bench = harness.Benchmark(bench.name, bench.setup,
+                                      {**bench.params,
+                                       'size': [s for s in bench.params['size'] if s in sizes]})
+        benchmarks.append(bench)
+
+    if args.list:
+        for bench in benchmarks:
+            for name, _ in bench.cases():
+                print(name)
+        return 0
+
+    def report(result: harness.Result) -> None:
+        print(f'{result.name:<45} {result.median * 1000:10.3f} ms '
+              f'(min {result.min * 1000:.3f}, stdev {result.stdev * 1000:.3f}, '
+              f'{result.repeats}x{result.number})')
+
+    results = harness.run(benchmarks, args.pattern, args.repeats, report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(harness.to_json(results), file, indent=2)
+
+    if args.baseline:
+        regressions = harness.compare(results, harness.load_results(args.baseline),
+                                      args.threshold)
+        for name, ratio in regressions:
+            print(f'REGRESSION {name}: {ratio:.2f}x the baseline')
+        if regressions:
+            return 1
+        print(f'No regressions beyond {args.threshold:.0%}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+'''Timing, statistics and baseline comparison for the benchmark suite.'''
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+import fnmatch
+import itertools
+import json
+import math
+import platform
+import statistics
+import time
+
+import pygame
+
+
+# A benchmark's setup takes the case parameters and returns the function to time
+Setup = Callable[..., Callable[[], Any]]
+
+
+@dataclass
+class Benchmark:
+    '''A benchmark and the parameters to run it with'''
+    name: str
+    setup: Setup
+    params: Dict[str, List[Any]] = field(default_factory=dict)
+
+    def cases(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        '''Get the name and parameters of every combination of parameters.'''
+        keys = list(self.params)
+        for values in itertools.product(*(self.params[key] for key in keys)):
+            params = dict(zip(keys, values))
+            if params:
+                yield (f'{self.name}[' + ','.join(f'{k}={v}' for k, v in params.items()) + ']',
+                       params)
+            else:
+                yield self.name, params
+
+
+@dataclass
+class Result:
+    '''Timings of one benchmark case, in seconds per call'''
+    name: str
+    repeats: int
+    number: int
+    min: float
+    median: float
+    mean: float
+    stdev: float
+
+
+BENCHMARKS: List[Benchmark] = []
+
+
+def benchmark(name: str, **params: List[Any]) -> Callable[[Setup], Setup]:
+    '''Register a benchmark setup function, run once for every combination of params.'''
+    def register(setup: Setup) -> Setup:
+        BENCHMARKS.append(Benchmark(name, setup, params))
+        return setup
+    return register
+
+
+def measure(func: Callable[[], Any], name: str = '', repeats: int = 5,
+            min_time: float = 0.05) -> Result:
+    '''
+    Time a function with time.perf_counter.
+
+    The first call warms up caches and calibrates how many calls each repeat makes, so that
+    a repeat takes at least min_time and very quick functions are still timed accurately.
+
+        Args:
+            func: Callable[[], Any]: The function to time.
+            name: str: The name to give the result.
+            repeats: int: How many times to time the calls.
+            min_time: float: The shortest a repeat should take, in seconds.
+
+        Returns:
+            Result: The timings per call.
+    '''
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    number = max(1, math.ceil(min_time / elapsed)) if elapsed > 0 else 1000
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number)
+    return Result(name, repeats, number, min(times), statistics.median(times),
+                  statistics.mean(times), statistics.stdev(times) if repeats > 1 else 0.0)
+
+
+def run(benchmarks: List[Benchmark], pattern: str = '*', repeats: int = 5,
+        report: Callable[[Result], None] | None = None) -> List[Result]:
+    '''Run every benchmark case whose name matches a glob pattern.'''
+    results = []
+    for bench in benchmarks:
+        for name, params in bench.cases():
+            if not fnmatch.fnmatch(name, pattern):
+                continue
+            result = measure(bench.setup(**params), name, repeats)
+            results.append(result)
+            if report is not None:
+                report(result)
+    return results
+
+
+def to_json(results: List[Result]) -> Dict[str, Any]:
+    '''Build the JSON document for a set of results, along with what they were run on.'''
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S%z')
+        },
+        'results': {result.name: asdict(result) for result in results}
+    }
+
+
+def load_results(path: str) -> Dict[str, Result]:
+    '''Load results from a JSON file written by to_json.'''
+    with open(path, encoding='utf-8') as file:
+        data = json.load(file)
+    return {name: Result(**result) for name, result in data['results'].items()}
+
+
+def compare(results: List[Result], baseline: Dict[str, Result],
+            threshold: float) -> List[Tuple[str, float]]:
+    '''
+    Find the cases that got slower than the baseline by more than threshold.
+
+    Medians are compared, since they are less affected by the occasional slow repeat than
+    means. Cases missing from the baseline are skipped.
+
+        Returns:
+            List[Tuple[str, float]]: The name and slowdown ratio of every regression.
+    '''
+    regressions = []
+    for result in results:
+        if result.name not in baseline or baseline[result.name].median <= 0:
+            continue
+        ratio = result.median / baseline[result.name].median
+        if ratio > 1 + threshold:
+            regressions.append((result.name, ratio))
+    return regressions
@@ -0,0 +1,208 @@
+'''
+The benchmarks. Each setup function builds what it needs untimed and returns the function to
+time. Maps are generated with a fixed seed, so every run times the same work.
+'''
+from typing import Any, Callable, Dict
+import functools
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+import pygame
+
+from benchmarks.harness import benchmark
+from ffrontier.game import ecs, economy, population
+from ffrontier.game.maphandler import MapHandler
+from ffrontier.game.yields import CityYields
+from ffrontier.hex import hexgrid
+from ffrontier.hex.tileutils import TileMap
+from ffrontier.managers.asset_manager import AssetManager
+from ffrontier.tools import mapgen, render
+
+
+ASSET_FILE = 'ffrontier/assets/configs/city_assets.json'
+IMAGE_FILE = 'tests/testing_assets/grasslands.png'
+# Map radii by size name
+SIZES: Dict[str, int] = {'small': 5, 'medium': 15, 'large': 40}
+VIEW_SIZE = (800, 600)
+SEED = 42
+
+_map_dir = tempfile.TemporaryDirectory(prefix='ffrontier-bench-')
+
+
+@functools.lru_cache(maxsize=None)
+def map_file(size: str) -> str:
+    '''Generate the map for a size the first time it is needed.'''
+    path = os.path.join(_map_dir.name, f'{size}.ffm')
+    mapgen.generate_map(path, radius=SIZES[size], seed=SEED)
+    return path
+
+
+def _tilemap(size: str, scale: int = 50) -> TileMap:
+    return TileMap(AssetManager(ASSET_FILE, scale), map_file(size))
+
+
+@benchmark('maphandler.load', size=list(SIZES))
+def bench_maphandler_load(size: str) -> Callable[[], Any]:
+    '''Parse and validate a map file.'''
+    path = map_file(size)
+    return lambda: MapHandler(path)
+
+
+@benchmark('tilemap.build', size=list(SIZES))
+def bench_tilemap_build(size: str) -> Callable[[], Any]:
+    '''Load a map file into a TileMap, including validating the grid.'''
+    assets = AssetManager(ASSET_FILE)
+    path = map_file(size)
+    return lambda: TileMap(assets, path)
+
+
+@benchmark('tilemap.validate', size=list(SIZES))
+def bench_tilemap_validate(size: str) -> Callable[[], Any]:
+    '''Check a loaded map is a complete hexagon.'''
+    # pylint: disable=protected-access
+    return _tilemap(size)._validate_map
+
+
+@benchmark('tilemap.check_collision', size=list(SIZES))
+def bench_check_collision(size: str) -> Callable[[], Any]:
+    '''Hit-test 1000 random points spread over the map.'''
+    tilemap = _tilemap(size)
+    extent = SIZES[size] * 50
+    rng = random.Random(SEED)
+    points = [(rng.randint(-extent, extent), rng.randint(-extent, extent)) for _ in range(1000)]
+
+    def check() -> None:
+        for point in points:
+            tilemap.check_collision(point)
+    return check
+
+
+@benchmark('canvas.draw', size=list(SIZES), scale=[20, 30, 50, 100])
+def bench_canvas_draw(size: str, scale: int) -> Callable[[], Any]:
+    '''Draw a full viewport centered on the map at a zoom level.'''
+    render.init_headless()
+    canvas = render.load_canvas(map_file(size), ASSET_FILE, scale)
+    # Measure the level of detail the game would pick at each scale
+    canvas.fixed_lod = None
+    canvas.center_on((0, 0), VIEW_SIZE)
+    surface = pygame.Surface(VIEW_SIZE)
+    return lambda: canvas.draw(surface, VIEW_SIZE)
+
+
+@benchmark('assets.load')
+def bench_assets_load() -> Callable[[], Any]:
+    '''Load and mask the images of an asset config.'''
+    return lambda: AssetManager(ASSET_FILE)
+
+
+@benchmark('assets.rescale', images=[10, 100])
+def bench_assets_rescale(images: int) -> Callable[[], Any]:
+    '''Rescale in-use images one zoom step up and back down.'''
+    assets = AssetManager()
+    for i in range(images):
+        assets.load_image(IMAGE_FILE, f'grasslands{i}')
+        assets.in_use.add(f'grasslands{i}')
+
+    def rescale() -> None:
+        assets.scale_up()
+        assets.scale_down()
+    return rescale
+
+
+@benchmark('economy.resolve', districts=[100, 5000], tiles=[1000, 100_000])
+def bench_economy_resolve(districts: int, tiles: int) -> Callable[[], Any]:
+    '''Resolve a turn for a city of districts with claimed overland tiles.'''
+    city = economy.Economy()
+    rng = random.Random(SEED)
+    for _ in range(districts):
+        city.add_district(rng.choice(economy.DISTRICT_TYPES), rng.randint(1, economy.MAX_TIER),
+                          rng.choice(economy.WEALTH_LEVELS), rng.randint(0, 500),
+                          rng.randint(0, 3))
+    radius = int((tiles / 3) ** 0.5) + 1
+    coordinates = list(hexgrid.hexagon_coordinates(radius))[:tiles]
+    for i, resource in enumerate(economy.TILE_RESOURCES):
+        city.claim_tiles(coordinates[i::len(economy.TILE_RESOURCES)], resource)
+    return city.resolve_turn
+
+
+@benchmark('population.resolve', districts=[100, 5000])
+def bench_population_resolve(districts: int) -> Callable[[], Any]:
+    '''Draw a turn of births, deaths, thinkers and wizards for every district.'''
+    city = economy.Economy()
+    for i in range(districts):
+        city.add_district('residential', population=5000, education=(i % 10) / 10)
+    people = population.Population(SEED)
+    # Populations and researchers drift a little with every call, which doesn't change the
+    # work done
+    return lambda: people.resolve_turn(city, 0)
+
+
+@benchmark('ecs.query', entities=[1000, 100_000])
+def bench_ecs_query(entities: int) -> Callable[[], Any]:
+    '''Query districts with positions, half of all entities, and sum a column.'''
+    world = ecs.World()
+    created = world.create(entities)
+    world.add('district', created, kind=0, tier=1, wealth=0, population=10)
+    world.add('position', created[::2], q=0, r=0)
+    return lambda: world.query('district', 'position').column('district', 'population').sum()
+
+
+@benchmark('yields.update', size=list(SIZES))
+def bench_yields_update(size: str) -> Callable[[], Any]:
+    '''Change one tile's features and read the city's total yield.'''
+    tilemap = _tilemap(size)
+    yields = CityYields(tilemap)
+    yields.total_yield()
+    features = [['farm'], ['tree']]
+
+    def update() -> None:
+        features.reverse()
+        tilemap.set_features((0, 0), features[0])
+        yields.total_yield()
+    return update
+
+
+@benchmark('startup.first_frame')
+def bench_first_frame() -> Callable[[], Any]:
+    '''Start the game in a new process until its first frame is drawn.'''
+    env = {**os.environ, 'SDL_VIDEODRIVER': 'dummy', 'SDL_AUDIODRIVER': 'dummy'}
+    # The game finds its config and assets relative to the repository root
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return lambda: subprocess.run([sys.executable, os.path.join(root, 'main.py'),
+                                   '--profile-startup'], env=env, cwd=root, check=True,
+                                  stdout=subprocess.DEVNULL)
+
+
+@benchmark('hexgrid.axial_to_pixel')
+def bench_axial_to_pixel() -> Callable[[], Any]:
+    '''Convert the coordinates of a radius 20 hexagon to pixels.'''
+    hexes = [hexgrid.HexInfo(q, r, True, 0) for q, r in hexgrid.hexagon_coordinates(20)]
+
+    def convert() -> None:
+        for hex_info in hexes:
+            hexgrid.axial_to_pixel(hex_info, 25)
+    return convert
+
+
+@benchmark('hexgrid.collides')
+def bench_collides() -> Callable[[], Any]:
+    '''Test 1000 points against a hex.'''
+    hex_info = hexgrid.HexInfo(0, 0, True, 0)
+    rng = random.Random(SEED)
+    points = [(rng.randint(-30, 30), rng.randint(-30, 30)) for _ in range(1000)]
+
+    def collide() -> None:
+        for x, y in points:
+            hex_info.collides(x, y, 25)
+    return collide
+
+
+@benchmark('hexgrid.hexes_in_rect', flat=[True, False])
+def bench_hexes_in_rect(flat: bool) -> Callable[[], Any]:
+    '''Find the hexes under a full viewport.'''
+    # It's a generator, so consume it to time the work
+    return lambda: list(hexgrid.hexes_in_rect(0, 0, VIEW_SIZE[0], VIEW_SIZE[1], 10, flat,
+                                              (VIEW_SIZE[0] // 2, VIEW_SIZE[1] // 2)))
@@ -0,0 +1,159 @@
+'''
+A graph of derived values that are only recomputed when something they depend on changed.
+
+Inputs hold values set from outside. Derived nodes declare the nodes they are computed from,
+and SumNodes total many nodes. Setting an input only marks the nodes downstream of it dirty;
+nothing is recomputed until a dirty node is read, and then only the dirty nodes it depends on
+are. A SumNode remembers which of its inputs changed and adjusts its total by their
+difference, so changing one of thousands of inputs costs one subtraction and one addition.
+'''
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Sequence, Set
+import math
+
+from ffrontier.utils.profiling import PROFILER
+
+
+# Constants
+# A SumNode recomputes its total from scratch after this many inputs were updated, so float
+# rounding in the differences doesn't build up over a long game
+REBUILD_UPDATES = 4096
+
+
+class Node(ABC):
+    '''A value in the graph that other nodes can depend on.'''
+    dependents: List['Node']
+
+    def __init__(self):
+        self.dependents = []
+
+    @abstractmethod
+    def get(self) -> Any:
+        '''Get the current value, recomputing it first if it is out of date.'''
+
+    def _depend_on(self, inputs: Sequence['Node']) -> None:
+        '''Register as a dependent of inputs.'''
+        for node in inputs:
+            node.dependents.append(self)
+
+    @abstractmethod
+    def _invalidate(self, source: 'Node') -> None:
+        '''Called when source, one of this node's inputs, changed.'''
+
+    def _notify(self) -> None:
+        '''Tell every dependent this node changed.'''
+        for node in self.dependents:
+            node._invalidate(self)  # pylint: disable=protected-access
+
+
+class Input(Node):
+    '''A value set from outside the graph.'''
+    value: Any
+
+    def __init__(self, value: Any = None):
+        super().__init__()
+        self.value = value
+
+    def get(self) -> Any:
+        return self.value
+
+    def set(self, value: Any) -> None:
+        '''Change the value, marking dependents dirty if it is different.'''
+        if value == self.value:
+            return
+        self.value = value
+        self._notify()
+
+    def _invalidate(self, source: Node) -> None:
+        raise TypeError('Inputs do not depend on other nodes')
+
+
+class Derived(Node):
+    '''A value computed from other nodes, recomputed lazily after any of them changed.'''
+    compute: Callable[..., Any]
+    inputs: List[Node]
+    dirty: bool
+
+    def __init__(self, compute: Callable[..., Any], inputs: Sequence[Node]):
+        '''
+        Initialize the Derived class.
+
+            Args:
+                compute (Callable[..., Any]): Called with the inputs' values, in order.
+                inputs (Sequence[Node]): The nodes the value is computed from.
+        '''
+        super().__init__()
+        self.compute = compute
+        self.inputs = list(inputs)
+        self.dirty = True
+        self._value: Any = None
+        self._depend_on(self.inputs)
+
+    def get(self) -> Any:
+        if self.dirty:
+            self._value = self.compute(*(node.get() for node in self.inputs))
+            self.dirty = False
+            PROFILER.count('deps.recompute')
+        return self._value
+
+    def _invalidate(self, source: Node) -> None:
+        # Dependents were already told the first time
+        if not self.dirty:
+            self.dirty = True
+            self._notify()
+
+
+class SumNode(Node):
+    '''
+    The total of many nodes, updated by the difference of those that changed. start is the
+    total of no inputs, like 0 or 0.0. Float totals are rebuilt with math.fsum every
+    REBUILD_UPDATES updates, so they stay within rounding of the true sum.
+    '''
+    inputs: List[Node]
+    total: Any
+
+    def __init__(self, inputs: Sequence[Node], start: Any = 0):
+        super().__init__()
+        self.inputs = list(inputs)
+        self.total = start
+        self._start = start
+        self._updates = 0
+        self._values: List[Any] = [start] * len(self.inputs)
+        self._positions: Dict[int, List[int]] = {}
+        for position, node in enumerate(self.inputs):
+            self._positions.setdefault(id(node), []).append(position)
+        # Everything counts as changed until the first read
+        self._changed: Set[int] = set(range(len(self.inputs)))
+        self._depend_on(self.inputs)
+
+    @property
+    def dirty(self) -> bool:
+        '''Check if any input changed since the total was last read.'''
+        return bool(self._changed)
+
+    def get(self) -> Any:
+        for position in self._changed:
+            value = self.inputs[position].get()
+            self.total += value - self._values[position]
+            self._values[position] = value
+        if self._changed:
+            PROFILER.count('deps.sum_updates', len(self._changed))
+            self._updates += len(self._changed)
+            self._changed.clear()
+            if self._updates >= REBUILD_UPDATES:
+                self.rebuild()
+        return self.total
+
+    def rebuild(self) -> None:
+        '''Recompute the total from the inputs' last values, dropping accumulated rounding.'''
+        if isinstance(self.total, float):
+            self.total = math.fsum(self._values)
+        else:
+            self.total = sum(self._values, self._start)
+        self._updates = 0
+
+    def _invalidate(self, source: Node) -> None:
+        notify = not self._changed
+        self._changed.update(self._positions[id(source)])
+        if notify:
+            self._notify()
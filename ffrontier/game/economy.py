@@ -0,0 +1,258 @@
+'''
+The city's economy, resolved once per turn.
+
+Districts are entities in the city's entity-component store, and claimed overland tiles are
+stored column by column the same way, in NumPy arrays rather than as objects. A turn is a
+few whole-array passes however many there are:
+
+- Production is summed per district type and per tile resource with np.bincount, then
+  turned into resources with a small (type x resource) output table.
+- Upkeep comes from the district type and tier, the upgrades, and each claimed tile's
+  distance from the city.
+- Taxes depend on each district's population and wealth level.
+'''
+from dataclasses import dataclass
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+from ffrontier.game.ecs import ABSENT, UPGRADE_SLOTS, Component, World
+from ffrontier.utils.profiling import PROFILER
+
+
+# Constants
+RESOURCES = ('gold', 'food', 'wood', 'stone', 'ore')
+GOLD = RESOURCES.index('gold')
+
+DISTRICT_TYPES = ('residential', 'commerce', 'mixed', 'recreation', 'administrative',
+                  'military')
+MAX_TIER = 3
+# Wealth levels a district's residents can have, poorest first
+WEALTH_LEVELS = ('poor', 'modest', 'comfortable', 'rich')
+
+TILE_RESOURCES = ('farm', 'forest', 'quarry', 'mine', 'pasture')
+
+# What a tier 1 district of each type produces per turn, in RESOURCES order
+DISTRICT_OUTPUT = np.array([
+    [0.0, 0.0, 0.0, 0.0, 0.0],  # residential pays taxes instead
+    [4.0, 0.0, 0.0, 0.0, 0.0],  # commerce
+    [2.0, 0.0, 0.0, 0.0, 0.0],  # mixed
+    [0.0, 0.0, 0.0, 0.0, 0.0],  # recreation
+    [1.0, 0.0, 0.0, 0.0, 0.0],  # administrative
+    [0.0, 0.0, 0.0, 0.0, 0.0],  # military
+])
+# Gold a tier 1 district of each type costs to run per turn
+DISTRICT_UPKEEP = np.array([0.5, 1.0, 1.0, 1.5, 2.0, 3.0])
+# How output and upkeep grow with tier, indexed by tier (0 is unused)
+TIER_SCALE = np.array([0.0, 1.0, 1.75, 2.5])
+# Gold each upgrade in a district costs per turn
+UPGRADE_UPKEEP = 0.5
+# Gold paid per resident per turn, by wealth level
+TAX_RATE = np.array([0.02, 0.05, 0.1, 0.2])
+
+# What a claimed tile of each resource yields per turn at yield 1, in RESOURCES order
+TILE_OUTPUT = np.array([
+    [0.0, 3.0, 0.0, 0.0, 0.0],  # farm
+    [0.0, 0.0, 2.0, 0.0, 0.0],  # forest
+    [0.0, 0.0, 0.0, 2.0, 0.0],  # quarry
+    [0.0, 0.0, 0.0, 0.0, 1.0],  # mine
+    [0.0, 1.5, 0.0, 0.0, 0.0],  # pasture
+])
+# Gold to maintain a claimed tile of each resource per turn, before distance
+TILE_UPKEEP = np.array([0.1, 0.1, 0.2, 0.3, 0.1])
+# Extra gold per turn for every hex between a claimed tile and the city
+DISTANCE_UPKEEP = 0.05
+
+# Columns start at this many rows and double when full
+INITIAL_CAPACITY = 64
+
+
+@dataclass
+class TurnReport:
+    '''What one turn of the economy produced and cost, per resource in RESOURCES order.'''
+    production: npt.NDArray[np.float64]
+    upkeep: npt.NDArray[np.float64]
+    taxes: float
+
+    @property
+    def net(self) -> npt.NDArray[np.float64]:
+        '''Get the change to the stockpile.'''
+        net = self.production - self.upkeep
+        net[GOLD] += self.taxes
+        return net
+
+    def as_dict(self) -> Dict[str, float]:
+        '''Get the net change by resource name.'''
+        return dict(zip(RESOURCES, self.net.tolist()))
+
+
+def _district_values(**values: int | str | float) -> Dict[str, int | float]:
+    '''
+    Turn district values by name into column values, checking them.
+
+        Raises:
+            ValueError: For an unknown kind, wealth level or column, or a tier that has no
+                output or upkeep scale.
+    '''
+    columns: Dict[str, int | float] = {}
+    for name, value in values.items():
+        if name == 'kind':
+            columns[name] = DISTRICT_TYPES.index(str(value))
+        elif name == 'wealth':
+            columns[name] = WEALTH_LEVELS.index(str(value))
+        elif name == 'tier':
+            if not 1 <= int(value) <= MAX_TIER:
+                raise ValueError(f'District tier must be between 1 and {MAX_TIER}, not {value}')
+            columns[name] = int(value)
+        elif name == 'education':
+            columns[name] = float(value)
+        elif name in ('population', 'thinkers', 'wizards'):
+            columns[name] = int(value)
+        else:
+            raise ValueError(f'Districts have no {name}')
+    return columns
+
+
+class _Columns:
+    '''Equal length NumPy arrays that grow together, with rows marked active or removed.'''
+    count: int
+    active: npt.NDArray[np.bool_]
+
+    def __init__(self, dtypes: Dict[str, npt.DTypeLike]):
+        self.count = 0
+        self.columns = {name: np.zeros(INITIAL_CAPACITY, dtype)
+                        for name, dtype in dtypes.items()}
+        self.active = np.zeros(INITIAL_CAPACITY, bool)
+
+    def view(self, name: str) -> npt.NDArray:
+        '''Get the used part of a column.'''
+        return self.columns[name][:self.count]
+
+    @property
+    def mask(self) -> npt.NDArray[np.bool_]:
+        '''Get which used rows haven't been removed.'''
+        return self.active[:self.count]
+
+    def append(self, rows: int, values: Dict[str, npt.ArrayLike]) -> npt.NDArray[np.intp]:
+        '''Add rows, growing the columns if needed, and return their indices.'''
+        end = self.count + rows
+        capacity = len(self.active)
+        if end > capacity:
+            while capacity < end:
+                capacity *= 2
+            for name, column in self.columns.items():
+                self.columns[name] = np.resize(column, capacity)
+            self.active = np.resize(self.active, capacity)
+        for name, column in self.columns.items():
+            column[self.count:end] = values[name]
+        self.active[self.count:end] = True
+        indices = np.arange(self.count, end)
+        self.count = end
+        return indices
+
+
+class Economy:
+    '''
+    Districts and claimed tiles, and the stockpile they feed.
+
+    Districts are the world's entities with the district component, and their upgrades the
+    entities with the upgrade component. Adding a district returns its entity id. Tile rows
+    are never moved, so the index returned when claiming a tile stays valid for releasing it.
+    '''
+    stockpile: npt.NDArray[np.float64]
+    city: Tuple[int, int]
+    world: World
+    districts: Component
+
+    def __init__(self, city: Tuple[int, int] = (0, 0), world: World | None = None):
+        '''
+        Initialize the Economy class.
+
+            Args:
+                city (Tuple[int, int]): The axial coordinates of the city on the overland map,
+                    which claimed tiles' maintenance is measured from.
+                world (World | None): The entity-component store holding the city's
+                    districts. A new one if not given.
+        '''
+        self.city = city
+        self.stockpile = np.zeros(len(RESOURCES))
+        self.world = world if world is not None else World()
+        self.districts = self.world.components['district']
+        self.tiles = _Columns({'q': np.int32, 'r': np.int32, 'resource': np.int8,
+                               'yield': np.float32, 'distance': np.int32})
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def add_district(self, kind: str, tier: int = 1, wealth: str = 'poor',
+                     population: int = 0, upgrades: int = 0, education: float = 0.0) -> int:
+        '''
+        Add a district and return its entity. education is from 0 to 1, and upgrades is a
+        number of one slot upgrades to build in it.
+        '''
+        values = _district_values(kind=kind, tier=tier, wealth=wealth)
+        if not 0 <= upgrades <= UPGRADE_SLOTS:
+            raise ValueError(f'Districts have room for {UPGRADE_SLOTS} upgrades, not {upgrades}')
+        entity = self.world.create(1)
+        self.world.add('district', entity, population=population, education=education,
+                       **values)
+        if upgrades:
+            self.world.add_upgrades(self.world.create(upgrades), entity, kind=0)
+        return int(entity[0])
+
+    def set_district(self, entity: int, **values: int | str | float) -> None:
+        '''Change a district's kind, tier, wealth, population, education or researchers.'''
+        row = self.districts.rows([entity])[0]
+        if row == ABSENT:
+            raise ValueError(f'Entity {entity} is not a district')
+        for name, value in _district_values(**values).items():
+            self.districts.columns[name][row] = value
+
+    def remove_district(self, entity: int) -> None:
+        '''Destroy a district, and its upgrades, so it stops counting towards the economy.'''
+        self.world.destroy([entity])
+
+    def claim_tiles(self, coordinates: Iterable[Tuple[int, int]], resource: str,
+                    tile_yield: float = 1.0) -> npt.NDArray[np.intp]:
+        '''Claim overland tiles of one resource and return their indices.'''
+        coords = np.array(list(coordinates), dtype=np.int32).reshape(-1, 2)
+        dq = coords[:, 0] - self.city[0]
+        dr = coords[:, 1] - self.city[1]
+        distance = np.maximum(np.maximum(np.abs(dq), np.abs(dr)), np.abs(dq + dr))
+        return self.tiles.append(len(coords), {
+            'q': coords[:, 0], 'r': coords[:, 1], 'resource': TILE_RESOURCES.index(resource),
+            'yield': tile_yield, 'distance': distance})
+
+    def release_tiles(self, indices: npt.ArrayLike) -> None:
+        '''Give up claimed tiles.'''
+        self.tiles.mask[indices] = False
+
+    @PROFILER.timed('economy.resolve')
+    def resolve_turn(self) -> TurnReport:
+        '''Work out this turn's production, upkeep and taxes and add them to the stockpile.'''
+        # The component's rows are packed, so every row is a district that exists
+        districts = self.districts
+        scale = TIER_SCALE[districts.view('tier')]
+        # Districts of a type produce the same mix, so only the scaled count per type matters
+        per_kind = np.bincount(districts.view('kind'), scale, minlength=len(DISTRICT_TYPES))
+        production = per_kind @ DISTRICT_OUTPUT
+        upkeep = np.zeros(len(RESOURCES))
+        # Upgrades are destroyed with their district, so all of them are in use
+        upkeep[GOLD] = (per_kind @ DISTRICT_UPKEEP +
+                        UPGRADE_UPKEEP * len(self.world.components['upgrade']))
+        taxes = float(np.dot(districts.view('population').astype(np.float64),
+                             TAX_RATE[districts.view('wealth')]))
+
+        tiles = self.tiles
+        claimed = tiles.mask
+        resource = tiles.view('resource')
+        per_resource = np.bincount(resource, tiles.view('yield') * claimed,
+                                   minlength=len(TILE_RESOURCES))
+        production += per_resource @ TILE_OUTPUT
+        upkeep[GOLD] += (np.bincount(resource, claimed, minlength=len(TILE_RESOURCES))
+                         @ TILE_UPKEEP +
+                         DISTANCE_UPKEEP * tiles.view('distance').sum(where=claimed,
+                                                                      dtype=np.int64))
+
+        report = TurnReport(production, upkeep, taxes)
+        self.stockpile += report.net
+        return report
@@ -0,0 +1,310 @@
+'''
+An entity-component store for what is built on the map, like districts and their upgrades.
+
+Entities are integer ids. Each component is a sparse set: a dense block of NumPy columns
+holding the values, a dense array of the entities that have it, and a sparse array mapping
+an entity id to its row. Rows are kept packed, so a system reads a component as whole
+contiguous arrays:
+
+    found = world.query('district', 'position')
+    tiers = found.column('district', 'tier')
+    q = found.column('position', 'q')
+
+Adding, removing and querying all work on arrays of entities at a time. The economy keeps
+the city's districts here, and the population draws read and write their columns directly.
+'''
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+
+# Constants
+# The components the game uses, as column name to dtype
+# thinkers and wizards are the residents who research, counted within population
+DISTRICT = {'kind': np.int8, 'tier': np.int8, 'wealth': np.int8, 'population': np.int32,
+            'education': np.float32, 'thinkers': np.int32, 'wizards': np.int32}
+UPGRADE = {'kind': np.int16, 'tier': np.int8, 'slots': np.int8, 'district': np.int32}
+POSITION = {'q': np.int32, 'r': np.int32}
+COMPONENTS: Dict[str, Dict[str, npt.DTypeLike]] = {
+    'district': DISTRICT,
+    'upgrade': UPGRADE,
+    'position': POSITION
+}
+# How many upgrade slots a district has
+UPGRADE_SLOTS = 3
+
+# Arrays start this long and double when full
+INITIAL_CAPACITY = 64
+# Marks an entity without the component in a sparse array
+ABSENT = -1
+
+
+def _grow(array: npt.NDArray, size: int, fill: int = 0) -> npt.NDArray:
+    '''Get the array grown by doubling until it holds size, with new entries set to fill.'''
+    capacity = len(array)
+    if size <= capacity:
+        return array
+    while capacity < size:
+        capacity *= 2
+    grown = np.full(capacity, fill, array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class Component:
+    '''A sparse set of the entities with one component and their packed values.'''
+    name: str
+    count: int
+    entities: npt.NDArray[np.int32]
+    sparse: npt.NDArray[np.int32]
+    columns: Dict[str, npt.NDArray]
+
+    def __init__(self, name: str, dtypes: Dict[str, npt.DTypeLike]):
+        self.name = name
+        self.count = 0
+        self.entities = np.zeros(INITIAL_CAPACITY, np.int32)
+        self.sparse = np.full(INITIAL_CAPACITY, ABSENT, np.int32)
+        self.columns = {column: np.zeros(INITIAL_CAPACITY, dtype)
+                        for column, dtype in dtypes.items()}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def rows(self, entities: npt.ArrayLike) -> npt.NDArray[np.int32]:
+        '''Get the rows of entities, with ABSENT for those without the component.'''
+        entities = np.asarray(entities)
+        rows = np.full(entities.shape, ABSENT, np.int32)
+        known = (entities >= 0) & (entities < len(self.sparse))
+        rows[known] = self.sparse[entities[known]]
+        return rows
+
+    def has(self, entities: npt.ArrayLike) -> npt.NDArray[np.bool_]:
+        '''Check which entities have the component.'''
+        return self.rows(entities) != ABSENT
+
+    def view(self, column: str) -> npt.NDArray:
+        '''Get the packed values of a column, in the order of active_entities.'''
+        return self.columns[column][:self.count]
+
+    @property
+    def active_entities(self) -> npt.NDArray[np.int32]:
+        '''Get the entities with the component, in row order.'''
+        return self.entities[:self.count]
+
+    def add(self, entities: npt.ArrayLike, values: Dict[str, npt.ArrayLike]) -> None:
+        '''
+        Give entities the component, or overwrite its values if they already have it.
+        Columns without a value start at 0 for new entities and are kept for existing ones.
+        '''
+        entities = np.asarray(entities, np.int32).reshape(-1)
+        unknown = set(values) - set(self.columns)
+        if unknown:
+            raise ValueError(f'{self.name} has no columns {sorted(unknown)}')
+        if len(np.unique(entities)) != len(entities):
+            raise ValueError(f'Entities added to {self.name} more than once')
+        self.sparse = _grow(self.sparse, int(entities.max(initial=-1)) + 1, ABSENT)
+        rows = self.sparse[entities]
+        new = rows == ABSENT
+        end = self.count + int(new.sum())
+        self.entities = _grow(self.entities, end)
+        for column in self.columns:
+            self.columns[column] = _grow(self.columns[column], end)
+        rows[new] = np.arange(self.count, end)
+        self.entities[rows] = entities
+        self.sparse[entities] = rows
+        self.count = end
+        for column, array in self.columns.items():
+            if column in values:
+                array[rows] = values[column]
+            else:
+                array[rows[new]] = 0
+
+    def remove(self, entities: npt.ArrayLike) -> None:
+        '''Take the component away from entities. Entities without it are ignored.'''
+        rows = self.rows(entities)
+        rows = rows[rows != ABSENT]
+        if not len(rows):
+            return
+        self.sparse[self.entities[rows]] = ABSENT
+        # Keep the remaining rows packed and in order
+        keep = np.ones(self.count, bool)
+        keep[rows] = False
+        remaining = int(keep.sum())
+        self.entities[:remaining] = self.entities[:self.count][keep]
+        for array in self.columns.values():
+            array[:remaining] = array[:self.count][keep]
+        self.count = remaining
+        self.sparse[self.entities[:remaining]] = np.arange(remaining)
+
+
+class Query:
+    '''The entities that have every component of a query, and their rows in each.'''
+    entities: npt.NDArray[np.int32]
+
+    def __init__(self, entities: npt.NDArray[np.int32],
+                 components: Dict[str, Component]):
+        self.entities = entities
+        self._components = components
+        self._rows = {name: component.rows(entities) for name, component in components.items()}
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    def column(self, component: str, column: str) -> npt.NDArray:
+        '''Get a column's values for the matched entities, in the order of entities.'''
+        return self._components[component].columns[column][self._rows[component]]
+
+    def rows(self, component: str) -> npt.NDArray[np.int32]:
+        '''Get the matched entities' rows in a component, for writing values back.'''
+        return self._rows[component]
+
+
+class World:
+    '''
+    Creates and destroys entities and holds their components.
+
+    Destroyed ids are reused, after every component of the entity has been removed, along
+    with any upgrades it had as a district. Entities with a position are indexed by tile, so
+    what stands on a tile can be looked up directly.
+    '''
+    components: Dict[str, Component]
+
+    def __init__(self, components: Dict[str, Dict[str, npt.DTypeLike]] | None = None):
+        if components is None:
+            components = COMPONENTS
+        self.components = {name: Component(name, dtypes)
+                           for name, dtypes in components.items()}
+        self._next_id = 0
+        self._free: List[int] = []
+        self._alive: Set[int] = set()
+        self._tiles: Dict[Tuple[int, int], List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._alive)
+
+    def create(self, count: int = 1) -> npt.NDArray[np.int32]:
+        '''Create entities without any components and return their ids.'''
+        reused = [self._free.pop() for _ in range(min(count, len(self._free)))]
+        fresh = range(self._next_id, self._next_id + count - len(reused))
+        self._next_id += len(fresh)
+        entities = np.array(reused + list(fresh), np.int32)
+        self._alive.update(entities.tolist())
+        return entities
+
+    def destroy(self, entities: npt.ArrayLike) -> None:
+        '''
+        Remove every component of entities and free their ids. The upgrades of destroyed
+        districts are destroyed with them, so a reused id doesn't inherit them.
+        '''
+        entities = np.asarray(entities, np.int32).reshape(-1)
+        upgrades = self.components.get('upgrade')
+        if upgrades is not None and len(upgrades):
+            owned = upgrades.active_entities[np.isin(upgrades.view('district'), entities)]
+            entities = np.unique(np.concatenate([entities, owned]))
+        if 'position' in self.components:
+            self._unindex(entities)
+        for component in self.components.values():
+            component.remove(entities)
+        for entity in entities.tolist():
+            if entity in self._alive:
+                self._alive.remove(entity)
+                self._free.append(entity)
+
+    def add(self, component: str, entities: npt.ArrayLike, **values: npt.ArrayLike) -> None:
+        '''Give entities a component, with a value or an array of values per column.'''
+        entities = np.asarray(entities, np.int32).reshape(-1)
+        # Checked before the tile index is touched, so a bad call leaves it as it was
+        if len(np.unique(entities)) != len(entities):
+            raise ValueError(f'Entities added to {component} more than once')
+        if (entities < 0).any():
+            raise ValueError('Entity ids must not be negative')
+        dead = [entity for entity in entities.tolist() if entity not in self._alive]
+        if dead:
+            raise ValueError(f'Entities {dead} do not exist')
+        if component == 'position':
+            self._unindex(entities)
+        self.components[component].add(entities, values)
+        if component == 'position':
+            self._index(entities)
+
+    def remove(self, component: str, entities: npt.ArrayLike) -> None:
+        '''Take a component away from entities.'''
+        if component == 'position':
+            self._unindex(np.asarray(entities, np.int32).reshape(-1))
+        self.components[component].remove(entities)
+
+    def query(self, *names: str) -> Query:
+        '''Find the entities that have every one of the components.'''
+        components = {name: self.components[name] for name in names}
+        # Scan the smallest component and check the others through their sparse arrays
+        smallest = min(components.values(), key=len)
+        entities = smallest.active_entities
+        for component in components.values():
+            if component is not smallest:
+                entities = entities[component.has(entities)]
+        return Query(entities.copy(), components)
+
+    def at(self, q: int, r: int) -> List[int]:
+        '''Get the entities positioned on a tile.'''
+        return list(self._tiles.get((q, r), ()))
+
+    def _index(self, entities: npt.NDArray[np.int32]) -> None:
+        '''Add positioned entities to the tile index.'''
+        position = self.components['position']
+        rows = position.rows(entities)
+        for entity, q, r in zip(entities.tolist(), position.columns['q'][rows].tolist(),
+                                position.columns['r'][rows].tolist()):
+            self._tiles.setdefault((q, r), []).append(entity)
+
+    def _unindex(self, entities: npt.NDArray[np.int32]) -> None:
+        '''Take entities that have a position out of the tile index.'''
+        position = self.components['position']
+        rows = position.rows(entities)
+        placed = rows != ABSENT
+        for entity, q, r in zip(entities[placed].tolist(),
+                                position.columns['q'][rows[placed]].tolist(),
+                                position.columns['r'][rows[placed]].tolist()):
+            tile = self._tiles[(q, r)]
+            tile.remove(entity)
+            if not tile:
+                del self._tiles[(q, r)]
+
+    def slots_used(self, districts: npt.ArrayLike) -> npt.NDArray[np.int64]:
+        '''Get how many upgrade slots each district's upgrades take.'''
+        districts = np.asarray(districts, np.int32).reshape(-1)
+        upgrades = self.components['upgrade']
+        owners = upgrades.view('district')
+        slots = np.zeros(len(districts), np.int64)
+        if not len(owners):
+            return slots
+        order = np.argsort(districts)
+        found = np.searchsorted(districts, owners, sorter=order)
+        found = np.minimum(found, len(districts) - 1)
+        matched = districts[order[found]] == owners
+        np.add.at(slots, order[found[matched]], upgrades.view('slots')[matched])
+        return slots
+
+    def add_upgrades(self, entities: npt.ArrayLike, districts: npt.ArrayLike,
+                     kind: npt.ArrayLike, slots: npt.ArrayLike = 1,
+                     tier: npt.ArrayLike = 1) -> None:
+        '''
+        Make entities new upgrades in districts, checking the districts have room.
+
+            Raises:
+                ValueError: If an upgrade would take a district past UPGRADE_SLOTS, or an
+                    entity is already an upgrade.
+        '''
+        entities = np.asarray(entities, np.int32).reshape(-1)
+        if self.components['upgrade'].has(entities).any():
+            raise ValueError('Entities are already upgrades')
+        districts = np.broadcast_to(np.asarray(districts, np.int32), entities.shape)
+        slots = np.broadcast_to(np.asarray(slots, np.int8), entities.shape)
+        targets, inverse = np.unique(districts, return_inverse=True)
+        if not self.components['district'].has(targets).all():
+            raise ValueError('Upgrades can only go in districts')
+        needed = self.slots_used(targets) + np.bincount(inverse, slots, len(targets))
+        if (needed > UPGRADE_SLOTS).any():
+            full = targets[needed > UPGRADE_SLOTS].tolist()
+            raise ValueError(f'Not enough upgrade slots in districts {full}')
+        self.add('upgrade', entities, kind=kind, tier=tier, slots=slots, district=districts)
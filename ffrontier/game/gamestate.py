@@ -1,22 +1,96 @@
 '''Handles the current state of the game, including the map and the players.'''
+from typing import TYPE_CHECKING
+import secrets
 
 import pygame
 
 from ffrontier.managers.config_manager import ConfigManager
+from ffrontier.utils.profiling import PROFILER
+
+if TYPE_CHECKING:
+    from ffrontier.game.economy import Economy, TurnReport
+    from ffrontier.game.population import Population
+    from ffrontier.game.research import Research
+    from ffrontier.game.yields import CityYields
+    from ffrontier.hex.tileutils import TileMap
 
 
 class GameState:
-    '''Handles the current state of the game, including the map and the players.'''
+    '''
+    Handles the current state of the game, including the map and the players.
+
+    The economy, population, research and yields pull in NumPy, so they are only imported
+    and built by load(), which the game calls once its first frame is on screen.
+    '''
     cfg: ConfigManager
     turn: int
+    seed: int
+    loaded: bool
+    economy: 'Economy'
+    last_report: 'TurnReport | None'
+    yields: 'CityYields | None'
+    last_yield: float
+    research: 'Research | None'
+    population: 'Population'
+    thinkers: int
+    wizards: int
 
-    def __init__(self, cfg: ConfigManager):
-        '''Initializes the game state with the given map size and number of players.'''
+    def __init__(self, cfg: ConfigManager, tilemap: 'TileMap | None' = None,
+                 research_file: str | None = None, seed: int | None = None):
+        '''
+        Initializes the game state with the given map size and number of players.
+
+            Args:
+                cfg (ConfigManager): The game's configuration.
+                tilemap (TileMap | None): The city map, for tile yields.
+                research_file (str | None): The research trees to load, if any.
+                seed (int | None): The seed every random draw of the game comes from, as
+                    saved in the map's header. A new game gets a fresh one, which is put in
+                    the header to be saved with the map.
+        '''
         self.turn = 0
         self.cfg = cfg
+        self.seed = seed if seed is not None else secrets.randbits(128)
+        if tilemap is not None:
+            tilemap.map_handler.seed = self.seed
+        self.loaded = False
+        self._tilemap = tilemap
+        self._research_file = research_file
+        self.last_report = None
+        self.last_yield = 0.0
+        # The city's thinkers and wizards, who research tech and magic every turn
+        self.thinkers = 0
+        self.wizards = 0
+
+    def load(self) -> None:
+        '''Build the economy, population, research and yields, if they aren't already.'''
+        if self.loaded:
+            return
+        # pylint: disable=import-outside-toplevel
+        from ffrontier.game.economy import Economy
+        from ffrontier.game.population import Population
+        from ffrontier.game.research import Research, ResearchTree
+        from ffrontier.game.yields import CityYields
+        self.population = Population(self.seed)
+        self.economy = Economy()
+        # Tile yields are recomputed only where the city map changed
+        self.yields = CityYields(self._tilemap) if self._tilemap is not None else None
+        self.research = (Research(ResearchTree.load(self._research_file))
+                         if self._research_file is not None else None)
+        self.loaded = True
 
+    @PROFILER.timed('turn.next')
     def next_turn(self):
-        '''Go to the next turn.'''
+        '''Go to the next turn, resolving the population and economy for the turn that ended.'''
+        self.load()
+        drawn = self.population.resolve_turn(self.economy, self.turn)
+        self.thinkers = drawn.total_thinkers
+        self.wizards = drawn.total_wizards
+        self.last_report = self.economy.resolve_turn()
+        if self.yields is not None:
+            self.last_yield = self.yields.total_yield()
+        if self.research is not None:
+            self.research.accumulate(self.thinkers, self.wizards)
         self.turn += 1
 
     def get_turn(self) -> int:
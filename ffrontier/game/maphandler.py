@@ -1,17 +1,29 @@
 '''Handles the map data file/structure.'''
-from typing import Dict, List, Tuple, TypedDict
-import csv
+from typing import Dict, Iterable, Iterator, List, Tuple, TypedDict
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import heapq
+import io
+import itertools
 import json
+import operator
+import os
+import pickle
+import secrets
+import stat
+import tempfile
 
-import jsonschema
-
-from ffrontier.utils.parsing import hex_to_rgba
+from ffrontier.utils.parsing import hex_to_rgba, rgba_to_hex
+from ffrontier.utils.profiling import PROFILER
+from ffrontier.utils.validation import compile_schema
 
 # Constants
 MAP_CONFIG_SCHEMA = {
     'type': 'object',
     'properties': {
-        'orientation': {'type': 'boolean'}
+        'orientation': {'type': 'boolean'},
+        'seed': {'type': 'integer', 'minimum': 0},
+        'generation': {'type': 'integer', 'minimum': 0}
     },
     'required': ['orientation']
 }
@@ -32,11 +44,30 @@ MAP_DATA_SCHEMA = {
         },
         "features": {"type": "array", "items": {"type": "string"}},
         "border": {"type": "integer"},
-        "color": {"type": "string"}
+        "color": {"type": "string"},
+        "generation": {"type": "integer", "minimum": 0}
     },
     "required": ["coordinates"]
 }
 
+validate_config = compile_schema(MAP_CONFIG_SCHEMA)
+validate_tile = compile_schema(MAP_DATA_SCHEMA)
+
+# Edited tiles are appended to this file next to the map until it is compacted
+DELTA_SUFFIX = '.delta'
+# Compact once the delta log holds this fraction of the map's tile count...
+COMPACT_RATIO = 0.25
+# ...but never bother for fewer records than this
+COMPACT_MIN_RECORDS = 256
+
+# Maps smaller than this load faster in one process than it takes to start a pool
+PARALLEL_MIN_BYTES = 1 << 20
+# Split the file finer than one chunk per worker so uneven chunks still balance out
+CHUNKS_PER_WORKER = 4
+
+# Bump whenever TileData or the cache layout changes so stale caches are reparsed
+CACHE_VERSION = 3
+
 
 class TileData(TypedDict):
     '''TypedDict for tile data.'''
@@ -47,76 +78,426 @@ class TileData(TypedDict):
     color: Tuple[int, int, int, int]
 
 
+def parse_tile(tile: dict) -> TileData:
+    '''Convert a validated tile record from a map file into TileData.'''
+    return {
+        'coordinates': tuple(tile['coordinates']),
+        'layers': tile.get('layers', []),
+        'features': tile.get('features', []),
+        'border': tile.get('border', 0),
+        'color': hex_to_rgba(tile.get('color', '#ffffff'))
+    }
+
+
+def _split_lines(file: io.BufferedReader, start: int, end: int,
+                 count: int) -> List[Tuple[int, int]]:
+    '''Split a byte range of a file into about count ranges that end on line boundaries.'''
+    ranges = []
+    step = max(1, (end - start) // count)
+    while start < end:
+        file.seek(min(start + step, end))
+        # Extend the range to the end of the line it stopped in
+        file.readline()
+        stop = min(file.tell(), end)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def _parse_chunk(map_file: str, start: int, end: int) -> List[TileData]:
+    '''Parse and validate the tile lines in a byte range of a map file, sorted by coordinates.'''
+    with open(map_file, 'rb') as file:
+        file.seek(start)
+        lines = file.read(end - start).decode('utf-8').splitlines()
+    tiles = []
+    for line in lines:
+        tile = json.loads(line)
+        validate_tile(tile)
+        tiles.append(parse_tile(tile))
+    tiles.sort(key=operator.itemgetter('coordinates'))
+    return tiles
+
+
+def encode_tile(tile: TileData, generation: int | None = None) -> str:
+    '''
+    Encode TileData as a single line of the .ffm format. Delta records also carry the
+    generation of the map file they apply to.
+    '''
+    record = {
+        'coordinates': list(tile['coordinates']),
+        'layers': tile['layers'],
+        'features': tile['features'],
+        'border': tile['border'],
+        'color': rgba_to_hex(tile['color'])
+    }
+    if generation is not None:
+        record['generation'] = generation
+    return json.dumps(record)
+
+
+def encode_config(flat: bool, seed: int | None = None, generation: int | None = None) -> str:
+    '''Encode the header line of the .ffm format.'''
+    config: Dict[str, bool | int] = {'orientation': flat}
+    if seed is not None:
+        config['seed'] = seed
+    if generation is not None:
+        config['generation'] = generation
+    return json.dumps(config)
+
+
+def _create_temp(path: str) -> Tuple[int, str]:
+    '''
+    Create a new temporary file next to path for writing. Unlike mkstemp it is created with
+    mode 0o666, so the kernel applies the umask as it would for an ordinary write.
+    '''
+    directory = os.path.dirname(os.path.abspath(path))
+    while True:
+        tmp_path = os.path.join(directory, f'.{os.path.basename(path)}.'
+                                           f'{secrets.token_hex(4)}.tmp')
+        try:
+            return os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), tmp_path
+        except FileExistsError:
+            continue
+
+
+def write_lines_atomic(path: str, lines: Iterable[str]) -> None:
+    '''
+    Stream lines to a temporary file next to path and rename it over path.
+
+    The rename is atomic, so a crash part way through a save leaves the previous file intact
+    instead of a truncated map.
+
+        Args:
+            path: str: The file to write.
+            lines: Iterable[str]: The lines to write, without trailing newlines.
+
+        Returns:
+            None
+    '''
+    fd, tmp_path = _create_temp(path)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='\n') as file:
+            for line in lines:
+                file.write(line)
+                file.write('\n')
+            file.flush()
+            os.fsync(file.fileno())
+        # Replacing a file keeps its permissions
+        if os.path.exists(path):
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(path).st_mode))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
 class MapHandler:
     '''Handles the map data file/structure.'''
     map_file: str
     map_data: List[TileData]
     flat: bool
+    seed: int | None
+    generation: int | None
+    delta_records: int
+    cache_dir: str | None
+    from_cache: bool
+    workers: int
+
+    def __init__(self, map_file: str, cache_dir: str | None = None, workers: int = 1):
+        '''
+        Initialize the map.
 
-    def __init__(self, map_file: str):
-        '''Initialize the map.'''
+            Args:
+                map_file: str: The .ffm file to load.
+                cache_dir: str | None: A directory for caching parsed, validated map data.
+                    Maps that have not changed since they were cached are loaded from there
+                    without parsing or validating any JSON. Disabled if not given.
+                workers: int: The number of processes to parse large maps with. 0 uses every
+                    core. Maps parsed in parallel come back in coordinate order rather than
+                    file order.
+        '''
         self.map_file = map_file
         self.map_data = []
-        self._load_map()
+        # The game's random seed, saved in the header so a game replays the same way
+        self.seed = None
+        # Counts full saves. Delta records carry it, so ones left from an earlier map file
+        # by a crash part way through a save are ignored rather than replayed
+        self.generation = None
+        self.delta_records = 0
+        self.cache_dir = cache_dir or None
+        self.from_cache = False
+        self.workers = workers if workers > 0 else os.cpu_count() or 1
+        self._index: Dict[Tuple[int, int], int] | None = None
+        with PROFILER.span('map.load'):
+            if self.cache_dir is None or not self._load_cache():
+                self._load_map()
+                if self.cache_dir is not None:
+                    self._store_cache()
+            self._load_delta()
+        # The seed in the map file, to tell when the header needs rewriting
+        self._saved_seed: int | None = self.seed
+
+    @property
+    def delta_file(self) -> str:
+        '''Get the path of the delta log for this map.'''
+        return self.map_file + DELTA_SUFFIX
 
     def _validate_map(self) -> None:
         '''Validate the map data.'''
 
+    @property
+    def cache_file(self) -> str:
+        '''Get the path of the parsed-map cache for this map.'''
+        assert self.cache_dir is not None
+        key = hashlib.sha1(os.path.abspath(self.map_file).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f'{key}.mapcache')
+
+    def _file_hash(self) -> str:
+        '''Hash the contents of the map file.'''
+        with open(self.map_file, 'rb') as file:
+            return hashlib.file_digest(file, 'blake2b').hexdigest()
+
+    def _load_cache(self) -> bool:
+        '''
+        Load the map data from the cache if it matches the map file.
+
+        The cache holds a small header followed by the data, so a stale entry is rejected
+        without unpickling the tiles. A matching mtime and size is trusted as is; otherwise the
+        file is hashed, which still skips parsing when a map was only touched or copied.
+
+            Returns:
+                bool: True if the map was loaded from the cache.
+        '''
+        try:
+            stat = os.stat(self.map_file)
+            with open(self.cache_file, 'rb') as file:
+                header = pickle.load(file)
+                if (header.get('version') != CACHE_VERSION or
+                        header.get('path') != os.path.abspath(self.map_file)):
+                    return False
+                refresh = False
+                if header['mtime'] != stat.st_mtime_ns or header['size'] != stat.st_size:
+                    if header['size'] != stat.st_size or header['hash'] != self._file_hash():
+                        return False
+                    refresh = True
+                flat, seed, generation, map_data = pickle.load(file)
+        # A missing, truncated or otherwise corrupt cache just means a full parse
+        except Exception:  # pylint: disable=broad-exception-caught
+            return False
+        self.flat = flat
+        self.seed = seed
+        self.generation = generation
+        self.map_data = map_data
+        self.from_cache = True
+        if refresh:
+            self._store_cache()
+        return True
+
+    def _store_cache(self) -> None:
+        '''Write the parsed map data to the cache. Failing to cache is not an error.'''
+        try:
+            stat = os.stat(self.map_file)
+            header = {'version': CACHE_VERSION,
+                      'path': os.path.abspath(self.map_file),
+                      'mtime': stat.st_mtime_ns,
+                      'size': stat.st_size,
+                      'hash': self._file_hash()}
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.cache_file), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as file:
+                    pickle.dump(header, file, protocol=pickle.HIGHEST_PROTOCOL)
+                    pickle.dump((self.flat, self.seed, self.generation, self.map_data), file,
+                                protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self.cache_file)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError:
+            pass
+
     def _load_map(self) -> None:
         '''Load and validate the map data.'''
         try:
-            with open(self.map_file, 'r', encoding='utf-8') as file:
-                # the first line is the orientation of the map
-                lines = file.readlines()
+            if self.workers > 1 and os.path.getsize(self.map_file) >= PARALLEL_MIN_BYTES:
+                self._load_map_parallel()
+            else:
+                self._load_map_serial()
+        except FileNotFoundError as e:
+            raise FileNotFoundError(f'Error loading map file {self.map_file}: {e}') from e
+        except AssertionError as e:
+            raise ValueError(f'Error loading map file {self.map_file}: {e}') from e
+        except json.JSONDecodeError as e:
+            raise ValueError(f'Error loading map file {self.map_file}: {e}') from e
 
-                if len(lines) < 2:
-                    raise ValueError('Map file is missing orientation and data')
+    def _read_config(self, line: str) -> None:
+        '''Validate the header line of the map and apply it.'''
+        config: dict = json.loads(line)
+        validate_config(config)
 
-                jsonschema.validate(json.loads(lines[0]), MAP_CONFIG_SCHEMA)
+        orientation = config.get('orientation', None)
+        if orientation is None:
+            raise ValueError('Map file is missing orientation')
 
-                config: dict = json.loads(lines[0])
+        self.flat = orientation
+        # The schema lets 5.0 through as an integer, which SeedSequence rejects
+        seed = config.get('seed')
+        self.seed = int(seed) if seed is not None else None
+        generation = config.get('generation')
+        self.generation = int(generation) if generation is not None else None
 
-                orientation = config.get('orientation', None)
-                if orientation is None:
-                    raise ValueError('Map file is missing orientation')
+    def _load_map_serial(self) -> None:
+        '''Load and validate the map data in this process.'''
+        with open(self.map_file, 'r', encoding='utf-8') as file:
+            # the first line is the orientation of the map
+            lines = file.readlines()
 
-                self.flat = orientation
+            if len(lines) < 2:
+                raise ValueError('Map file is missing orientation and data')
 
-                tiles = [json.loads(line) for line in lines[1:]]
+            self._read_config(lines[0])
 
-                for tile in tiles:
-                    jsonschema.validate(tile, MAP_DATA_SCHEMA)
-                    mdata: TileData = {
-                        'coordinates': (0, 0),
-                        'layers': [],
-                        'features': [],
-                        'border': 0,
-                        'color': (255, 255, 255, 255)
-                    }
+            tiles = [json.loads(line) for line in lines[1:]]
 
-                    mdata['coordinates'] = tuple(tile['coordinates'])
-                    mdata['layers'] = tile.get('layers', [])
-                    mdata['features'] = tile.get('features', [])
-                    mdata['border'] = tile.get('border', 0)
-                    mdata['color'] = hex_to_rgba(tile.get('color', '#ffffff'))
+            for tile in tiles:
+                validate_tile(tile)
+                self.map_data.append(parse_tile(tile))
 
-                    self.map_data.append(mdata)
-        except FileNotFoundError as e:
-            raise FileNotFoundError(f'Error loading map file {self.map_file}: {e}') from e
-        except AssertionError as e:
-            raise ValueError(f'Error loading map file {self.map_file}: {e}') from e
+    def _load_map_parallel(self) -> None:
+        '''
+        Load and validate the map data in a pool of worker processes.
+
+        The tile lines are split into byte ranges that end on line boundaries, so each worker
+        reads, parses and validates its own part of the file. Each chunk comes back sorted by
+        coordinates and the chunks are merged in coordinate order. Duplicate coordinates are
+        kept side by side for TileMap to reject.
+        '''
+        with open(self.map_file, 'rb') as file:
+            header = file.readline()
+            ranges = _split_lines(file, len(header), os.fstat(file.fileno()).st_size,
+                                  self.workers * CHUNKS_PER_WORKER)
+        if not ranges:
+            raise ValueError('Map file is missing orientation and data')
+        self._read_config(header.decode('utf-8'))
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            chunks = list(executor.map(_parse_chunk, itertools.repeat(self.map_file),
+                                       *zip(*ranges)))
+        self.map_data = list(heapq.merge(*chunks, key=operator.itemgetter('coordinates')))
+
+    def _load_delta(self) -> None:
+        '''Replay the delta log, if there is one, over the loaded map data.'''
+        try:
+            with open(self.delta_file, 'r', encoding='utf-8') as file:
+                lines = file.readlines()
+        except FileNotFoundError:
+            return
+        # A crash while appending can leave a partial last record; everything before it
+        # was fsynced and is still good.
+        if lines and not lines[-1].endswith('\n'):
+            lines.pop()
+        try:
+            records = [json.loads(line) for line in lines if line.strip()]
         except json.JSONDecodeError as e:
-            raise ValueError(f'Error loading map file {self.map_file}: {e}') from e
+            raise ValueError(f'Error loading delta file {self.delta_file}: {e}') from e
+        for record in records:
+            validate_tile(record)
+        # Records from before the last full save would undo edits made since
+        records = [record for record in records
+                   if record.get('generation') == self.generation]
+        self._merge(parse_tile(record) for record in records)
+        self.delta_records = len(records)
+
+    def _merge(self, tiles: Iterable[TileData]) -> None:
+        '''Replace the stored data of each tile by coordinates, appending new tiles.'''
+        if self._index is None:
+            self._index = {tile['coordinates']: i for i, tile in enumerate(self.map_data)}
+        for tile in tiles:
+            position = self._index.get(tile['coordinates'])
+            if position is None:
+                self._index[tile['coordinates']] = len(self.map_data)
+                self.map_data.append(tile)
+            else:
+                self.map_data[position] = tile
 
     def is_flat(self) -> bool:
         '''Check if the map is flat.'''
         return self.flat
 
-    def save_map(self) -> None:
-        '''Save the map data.'''
-        # Write to a CSV file
-        with open(self.map_file, 'w', encoding='utf-8') as file:
-            writer = csv.DictWriter(file, fieldnames=['coordinates', 'terrain', 'features'])
-            writer.writeheader()
-            for row in self.map_data:
-                writer.writerow(row)
+    @PROFILER.timed('map.save')
+    def save_map(self, tiles: Iterable[TileData] | None = None) -> None:
+        '''
+        Atomically write the whole map and drop the delta log it supersedes. The new file has
+        the next generation, so if the delta log outlives it after a crash, it is ignored.
+
+            Args:
+                tiles: Iterable[TileData] | None: The tiles to write. They are streamed to
+                    disk one line at a time, and become the loaded map data, so a later
+                    compaction writes them rather than the data they replaced. Defaults to
+                    the loaded map data.
+
+            Returns:
+                None
+        '''
+        written: List[TileData] = []
+        # Only taken on once the new file is in place, so a failed save changes nothing
+        generation = (self.generation or 0) + 1
+        seed = self.seed
+
+        def encode_lines() -> Iterator[str]:
+            yield encode_config(self.flat, seed, generation)
+            if tiles is None:
+                yield from map(encode_tile, self.map_data)
+                return
+            for tile in tiles:
+                written.append(tile)
+                yield encode_tile(tile)
+
+        write_lines_atomic(self.map_file, encode_lines())
+        self.generation = generation
+        self._saved_seed = seed
+        if tiles is not None:
+            self.map_data = written
+            self._index = None
+        if os.path.exists(self.delta_file):
+            os.unlink(self.delta_file)
+        self.delta_records = 0
+
+    @PROFILER.timed('map.append_delta')
+    def append_delta(self, tiles: Iterable[TileData]) -> int:
+        '''
+        Append changed tiles to the delta log, so a save costs time proportional to the edits.
+
+            Args:
+                tiles: Iterable[TileData]: The changed tiles.
+
+            Returns:
+                int: The number of records appended.
+        '''
+        tiles = list(tiles)
+        if not tiles:
+            return 0
+        with open(self.delta_file, 'a', encoding='utf-8', newline='\n') as file:
+            file.write(''.join(encode_tile(tile, self.generation) + '\n' for tile in tiles))
+            file.flush()
+            os.fsync(file.fileno())
+        self._merge(tiles)
+        self.delta_records += len(tiles)
+        return len(tiles)
+
+    @property
+    def header_changed(self) -> bool:
+        '''
+        Check if the header has changed since the map file was written. The delta log only
+        holds tiles, so only a full save keeps the change.
+        '''
+        return self.seed != self._saved_seed
+
+    def needs_compaction(self) -> bool:
+        '''Check if the delta log has grown enough to be folded into the map file.'''
+        return self.delta_records > max(COMPACT_MIN_RECORDS, len(self.map_data) * COMPACT_RATIO)
+
+    def compact(self) -> None:
+        '''Fold the delta log into the map file.'''
+        self.save_map()
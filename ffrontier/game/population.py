@@ -0,0 +1,114 @@
+'''
+Population growth, and the residents who become the city's thinkers and wizards.
+
+Every district's draws for a turn are made together, as one NumPy call per kind of draw
+over the columns of the district component in the city's entity-component store. The random
+generator for a turn is seeded from the game's seed and the turn number, so a turn's outcome
+depends only on the seed, the turn and the districts going into it, however many turns were
+played before. The seed is saved with the map, but the turn and the districts aren't saved yet,
+so a reloaded game doesn't replay the same way.
+'''
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+from ffrontier.game.economy import Economy
+from ffrontier.utils.profiling import PROFILER
+
+
+# Constants
+# Expected births per resident per turn
+BIRTH_RATE = 0.01
+# Chance of each resident, thinker or wizard dying per turn
+DEATH_RATE = 0.008
+# Chance of each ordinary resident becoming a thinker in a turn, at full education
+THINKER_RATE = 0.004
+# Expected new wizards per ordinary resident per turn, at full education. Magic talent is rarer
+WIZARD_RATE = 0.001
+
+
+@dataclass
+class PopulationReport:
+    '''
+    What one turn of population draws did, per district in the order of the district
+    component's rows, which is the order of Economy.districts.active_entities. thinkers and
+    wizards are how many each district has after the turn, new_thinkers and new_wizards how
+    many residents became one this turn.
+    '''
+    births: npt.NDArray[np.int64]
+    deaths: npt.NDArray[np.int64]
+    new_thinkers: npt.NDArray[np.int64]
+    new_wizards: npt.NDArray[np.int64]
+    thinkers: npt.NDArray[np.int64]
+    wizards: npt.NDArray[np.int64]
+
+    @property
+    def total_thinkers(self) -> int:
+        '''Get the thinkers over every district.'''
+        return int(self.thinkers.sum())
+
+    @property
+    def total_wizards(self) -> int:
+        '''Get the wizards over every district.'''
+        return int(self.wizards.sum())
+
+
+class Population:
+    '''Makes each turn's population draws for the districts of an economy.'''
+    seed: int
+
+    def __init__(self, seed: int):
+        '''
+        Initialize the Population class.
+
+            Args:
+                seed (int): The game's seed, saved with the game.
+        '''
+        self.seed = seed
+
+    def generator(self, turn: int) -> np.random.Generator:
+        '''Get the random generator for a turn.'''
+        return np.random.Generator(np.random.PCG64(np.random.SeedSequence([self.seed, turn])))
+
+    @PROFILER.timed('population.resolve')
+    def resolve_turn(self, economy: Economy, turn: int) -> PopulationReport:
+        '''
+        Grow or shrink every district's population and turn some of its residents into
+        thinkers and wizards, who stay until they die.
+
+            Args:
+                economy (Economy): Holds the districts. Their population, thinkers and
+                    wizards are updated.
+                turn (int): The turn being resolved, which picks the random stream.
+
+            Returns:
+                PopulationReport: The births, deaths, thinkers and wizards per district.
+        '''
+        rng = self.generator(turn)
+        # Every row of the component is a district that exists
+        districts = economy.districts
+        population = districts.view('population').astype(np.int64)
+        education = np.clip(districts.view('education'), 0.0, 1.0).astype(np.float64)
+        # Researchers are residents, so there can't be more of them than people
+        thinkers = np.minimum(districts.view('thinkers'), population)
+        wizards = np.minimum(districts.view('wizards'), population - thinkers)
+        residents = population - thinkers - wizards
+
+        # Always draw in the same order, so the same state gives the same numbers
+        births = rng.poisson(population * BIRTH_RATE)
+        resident_deaths = rng.binomial(residents, DEATH_RATE)
+        thinker_deaths = rng.binomial(thinkers, DEATH_RATE)
+        wizard_deaths = rng.binomial(wizards, DEATH_RATE)
+        residents = residents - resident_deaths
+        new_thinkers = rng.binomial(residents, THINKER_RATE * education)
+        new_wizards = np.minimum(rng.poisson(residents * WIZARD_RATE * education),
+                                 residents - new_thinkers)
+
+        deaths = resident_deaths + thinker_deaths + wizard_deaths
+        thinkers = thinkers - thinker_deaths + new_thinkers
+        wizards = wizards - wizard_deaths + new_wizards
+        districts.view('population')[:] = population + births - deaths
+        districts.view('thinkers')[:] = thinkers
+        districts.view('wizards')[:] = wizards
+        return PopulationReport(births, deaths, new_thinkers, new_wizards, thinkers, wizards)
@@ -0,0 +1,240 @@
+'''
+The Tech and Magic research trees and the city's progress through them.
+
+A tree is loaded once from JSON. Topics are numbered in topological order, so a topic's
+prerequisites always have lower numbers, and every set of topics is an int used as a bitset,
+with bit i for topic i. The transitive prerequisites of every topic are worked out when the
+tree is loaded, so "what can be researched now", "what does this unlock" and "what is the
+path to this" are a few bitwise operations rather than walks over the graph.
+'''
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Set, Tuple
+import json
+
+from ffrontier.utils.validation import compile_schema
+
+
+# Constants
+TREES = ('tech', 'magic')
+# Research points each thinker (tech) or wizard (magic) adds per turn
+THINKER_POINTS = 1.0
+WIZARD_POINTS = 1.0
+
+RESEARCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "topics": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "title": {"type": "string"},
+                    "tree": {"type": "string"},
+                    "tier": {"type": "integer", "minimum": 1},
+                    "cost": {"type": "number", "minimum": 0},
+                    "requires": {"type": "array", "items": {"type": "string"}}
+                },
+                "required": ["name", "tree", "cost"]
+            }
+        }
+    },
+    "required": ["topics"]
+}
+
+
+@dataclass(frozen=True)
+class Topic:
+    '''Something that can be researched.'''
+    name: str
+    title: str
+    tree: str
+    tier: int
+    cost: float
+    requires: Tuple[str, ...]
+
+
+def bits(mask: int) -> Iterator[int]:
+    '''Get the numbers of the set bits of a mask, lowest first.'''
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class ResearchTree:
+    '''
+    The topics of every research tree, with their prerequisites as bitsets.
+
+    prerequisites[i] is the topics topic i directly requires, closures[i] everything it
+    requires directly or indirectly, and dependents[i] the topics that directly require it.
+    '''
+    topics: List[Topic]
+    index: Dict[str, int]
+    prerequisites: List[int]
+    closures: List[int]
+    dependents: List[int]
+    tree_masks: Dict[str, int]
+
+    def __init__(self, topics: List[Topic]):
+        self.topics = _topological_order(topics)
+        self.index = {topic.name: i for i, topic in enumerate(self.topics)}
+        self.prerequisites = [sum(1 << self.index[name] for name in set(topic.requires))
+                              for topic in self.topics]
+        self.closures = []
+        self.dependents = [0] * len(self.topics)
+        for i, direct in enumerate(self.prerequisites):
+            closure = direct
+            for prerequisite in bits(direct):
+                # Earlier topics' closures are already complete
+                closure |= self.closures[prerequisite]
+                self.dependents[prerequisite] |= 1 << i
+            self.closures.append(closure)
+        self.tree_masks = {tree: 0 for tree in TREES}
+        for i, topic in enumerate(self.topics):
+            self.tree_masks[topic.tree] |= 1 << i
+        self._available: Dict[int, int] = {}
+
+    @staticmethod
+    def load(research_file: str) -> 'ResearchTree':
+        '''Load the research trees from a JSON file.'''
+        with open(research_file, encoding='utf-8') as file:
+            data: Dict[str, Any] = json.load(file)
+        compile_schema(RESEARCH_SCHEMA)(data)
+        return ResearchTree([Topic(topic['name'], topic.get('title', topic['name']),
+                                   topic['tree'], topic.get('tier', 1), topic['cost'],
+                                   tuple(topic.get('requires', [])))
+                             for topic in data['topics']])
+
+    def mask(self, names: List[str]) -> int:
+        '''Get the bitset of named topics.'''
+        return sum(1 << self.index[name] for name in set(names))
+
+    def names(self, mask: int) -> List[str]:
+        '''Get the names of the topics in a bitset, in topological order.'''
+        return [self.topics[i].name for i in bits(mask)]
+
+    def available(self, done: int) -> int:
+        '''
+        Get the topics that aren't done but whose prerequisites all are. Remembered per set
+        of finished topics, since that only changes when research completes.
+        '''
+        available = self._available.get(done)
+        if available is None:
+            available = 0
+            for i, prerequisites in enumerate(self.prerequisites):
+                if prerequisites & ~done == 0:
+                    available |= 1 << i
+            available &= ~done
+            self._available[done] = available
+        return available
+
+    def unlocks(self, topic: int, done: int) -> int:
+        '''Get the topics that finishing a topic would make available.'''
+        after = done | 1 << topic
+        return self.dependents[topic] & self.available(after) & ~self.available(done)
+
+    def path_to(self, topic: int, done: int) -> int:
+        '''Get every topic still to research to reach a topic, including itself.'''
+        return (self.closures[topic] | 1 << topic) & ~done
+
+
+class Research:
+    '''The city's finished research and progress, with a research queue for each tree.'''
+    tree: ResearchTree
+    done: int
+    progress: Dict[int, float]
+    queues: Dict[str, List[int]]
+    stored: Dict[str, float]
+
+    def __init__(self, tree: ResearchTree):
+        self.tree = tree
+        self.done = 0
+        self.progress = {}
+        self.queues = {name: [] for name in TREES}
+        # Points earned while nothing was queued, spent once something is
+        self.stored = {name: 0.0 for name in TREES}
+
+    @property
+    def available(self) -> int:
+        '''Get the topics that can be researched now.'''
+        return self.tree.available(self.done)
+
+    def is_done(self, name: str) -> bool:
+        '''Check if a topic has been researched.'''
+        return bool(self.done >> self.tree.index[name] & 1)
+
+    def set_goal(self, name: str) -> List[str]:
+        '''
+        Queue everything still needed to research a topic, in order. Prerequisites from the
+        other tree replace that tree's queue too.
+
+            Returns:
+                List[str]: The topics on the way, including the goal.
+        '''
+        path = self.tree.path_to(self.tree.index[name], self.done)
+        for tree, mask in self.tree.tree_masks.items():
+            if path & mask:
+                self.queues[tree] = list(bits(path & mask))
+        return self.tree.names(path)
+
+    def complete(self, topic: int) -> None:
+        '''Mark a topic as researched and take it out of the queues.'''
+        self.done |= 1 << topic
+        self.progress.pop(topic, None)
+        for tree, queue in self.queues.items():
+            if topic in queue:
+                self.queues[tree] = [queued for queued in queue if queued != topic]
+
+    def accumulate(self, thinkers: int, wizards: int) -> List[str]:
+        '''
+        Add a turn of research: thinkers' points go to the tech queue and wizards' to the
+        magic queue, finishing as many queued topics as the points pay for.
+
+            Returns:
+                List[str]: The topics that were finished.
+        '''
+        finished = []
+        for tree, points in (('tech', thinkers * THINKER_POINTS),
+                             ('magic', wizards * WIZARD_POINTS)):
+            points += self.stored[tree]
+            queue = self.queues[tree]
+            # A topic waiting on the other tree doesn't take points until it is available
+            while queue and points > 0 and self.available >> queue[0] & 1:
+                topic = queue[0]
+                remaining = self.tree.topics[topic].cost - self.progress.get(topic, 0.0)
+                if points < remaining:
+                    self.progress[topic] = self.progress.get(topic, 0.0) + points
+                    points = 0.0
+                    break
+                points -= remaining
+                self.complete(topic)
+                queue = self.queues[tree]
+                finished.append(self.tree.topics[topic].name)
+            self.stored[tree] = points
+        return finished
+
+
+def _topological_order(topics: List[Topic]) -> List[Topic]:
+    '''Order topics so each comes after its prerequisites, keeping file order otherwise.'''
+    by_name = {topic.name: topic for topic in topics}
+    if len(by_name) != len(topics):
+        raise ValueError('Research topics must have unique names')
+    for topic in topics:
+        if topic.tree not in TREES:
+            raise ValueError(f'Research topic {topic.name} is in unknown tree {topic.tree}')
+        for name in topic.requires:
+            if name not in by_name:
+                raise ValueError(f'Research topic {topic.name} requires unknown topic {name}')
+    ordered: List[Topic] = []
+    placed: Set[str] = set()
+    remaining = list(topics)
+    while remaining:
+        ready = [topic for topic in remaining if placed.issuperset(topic.requires)]
+        if not ready:
+            names = ', '.join(topic.name for topic in remaining)
+            raise ValueError(f'Research topics have circular prerequisites: {names}')
+        ordered.extend(ready)
+        placed.update(topic.name for topic in ready)
+        remaining = [topic for topic in remaining if topic.name not in placed]
+    return ordered
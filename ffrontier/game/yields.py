@@ -0,0 +1,90 @@
+'''What each tile of the city yields, kept up to date incrementally as tiles change.'''
+from typing import Dict, Iterable, Tuple
+import operator
+
+from ffrontier.game.dependency import Derived, Input, SumNode
+from ffrontier.hex import hexgrid
+from ffrontier.hex.journal import TileChange
+from ffrontier.hex.tileutils import TileMap
+
+
+# Constants
+# What a tile yields for each feature on it
+FEATURE_YIELD: Dict[str, float] = {
+    'farm': 3.0,
+    'tree': 1.0,
+    'rock': 0.5
+}
+# Extra yield a tile with the first feature gets for each neighbour with the second
+ADJACENCY_BONUS: Dict[Tuple[str, str], float] = {
+    ('farm', 'farm'): 0.5,
+    ('farm', 'tree'): -0.25,
+    ('tree', 'tree'): 0.25
+}
+
+
+def feature_yield(features: Tuple[str, ...]) -> float:
+    '''Get what a tile's own features yield.'''
+    return sum((FEATURE_YIELD.get(feature, 0.0) for feature in features), 0.0)
+
+
+def adjacency_bonus(features: Tuple[str, ...], *neighbours: Tuple[str, ...]) -> float:
+    '''Get the bonus a tile's features get from its neighbours' features.'''
+    bonus = 0.0
+    for feature in features:
+        for neighbour in neighbours:
+            for other in neighbour:
+                bonus += ADJACENCY_BONUS.get((feature, other), 0.0)
+    return bonus
+
+
+class CityYields:
+    '''
+    The yield of every tile in a TileMap and their total, as a dependency graph.
+
+    Each tile has an input holding its features, its own yield and its adjacency bonus
+    derived from its and its neighbours' features, and its total yield. Feature changes
+    are picked up from the tile map's change journal, so changing one tile only makes that
+    tile, its neighbours and the city total recompute, and only when they are next read.
+    '''
+    tilemap: TileMap
+    features: Dict[Tuple[int, int], Input]
+    yields: Dict[Tuple[int, int], Derived]
+    total: SumNode
+    _journal_name: str
+
+    def __init__(self, tilemap: TileMap):
+        self.tilemap = tilemap
+        self._journal_name = tilemap.journal.subscribe_unique('yields')
+        self.features = {coordinates: Input(tuple(tile.features))
+                         for coordinates, tile in tilemap.tiles.items()}
+        self.yields = {}
+        for coordinates, features in self.features.items():
+            neighbours = [self.features[neighbour]
+                          for neighbour in hexgrid.neighbors(*coordinates)
+                          if neighbour in self.features]
+            own = Derived(feature_yield, [features])
+            bonus = Derived(adjacency_bonus, [features, *neighbours])
+            self.yields[coordinates] = Derived(operator.add, [own, bonus])
+        self.total = SumNode(list(self.yields.values()), 0.0)
+
+    def sync(self) -> None:
+        '''Pick up feature changes from the tile map.'''
+        for coordinates, change in self.tilemap.journal.drain(self._journal_name).items():
+            if change & TileChange.FEATURES:
+                self.features[coordinates].set(tuple(self.tilemap.tiles[coordinates].features))
+
+    def tile_yield(self, coordinates: Tuple[int, int]) -> float:
+        '''Get what a tile yields.'''
+        self.sync()
+        return self.yields[coordinates].get()
+
+    def tile_yields(self, coordinates: Iterable[Tuple[int, int]]) -> Dict[Tuple[int, int], float]:
+        '''Get what several tiles yield.'''
+        self.sync()
+        return {coord: self.yields[coord].get() for coord in coordinates}
+
+    def total_yield(self) -> float:
+        '''Get what the whole city yields.'''
+        self.sync()
+        return self.total.get()
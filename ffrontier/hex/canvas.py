@@ -1,11 +1,29 @@
 '''A canvas to display a grid of hexes'''
-from typing import Tuple
-from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+from dataclasses import dataclass, field
+import math
 
 import pygame
 
-from ffrontier.hex import tileutils
-from ffrontier.managers.asset_manager import AssetManager
+from ffrontier.hex import hexgrid, tileutils
+from ffrontier.managers.asset_manager import AssetManager, SCALE_STEP
+from ffrontier.managers.input_manager import CAMERA_MOVES
+from ffrontier.utils.profiling import PROFILER
+
+
+# Levels of detail, from most to least expensive
+LOD_FULL = 0
+LOD_FLAT = 1
+LOD_BLOCKS = 2
+
+# Below this scale tiles are drawn as flat hexes of their dominant color, without images
+DETAIL_SCALE = 40
+# At or below this scale, blocks of tiles are merged into one shape of their average color
+BLOCK_SCALE = 20
+# Width of a block in tiles along each axial axis
+BLOCK_SIZE = 4
+# How long zoom input has to stop for before the map is drawn at the new scale
+ZOOM_SETTLE_MS = 150
 
 
 @dataclass
@@ -16,6 +34,26 @@ class CanvasState:
     vp_pos: Tuple[int, int]
     highlighted_tile: Tuple[int, int] | None
     is_dragging: bool
+    needs_redraw: bool = True
+    dirty_tiles: Set[Tuple[int, int]] = field(default_factory=set)
+    # Where the viewport was when the surface was last brought up to date
+    rendered_vp_pos: Tuple[int, int] | None = None
+    # The scale a zoom in progress is heading for, shown as a preview until input settles
+    target_scale: int | None = None
+    # When the last zoom step arrived
+    zoom_time: int = 0
+    # The last hovered position while zooming, hit-tested once the new scale is drawn
+    hover_pos: Tuple[int, int] | None = None
+
+
+@dataclass
+class ZoomPreview:
+    '''The last properly rendered viewport, scaled to preview a zoom in progress'''
+    surface: pygame.Surface
+    scale: int
+    origin: Tuple[int, int]
+    # The target scale and origin the preview was last drawn for
+    drawn: Tuple[int, Tuple[int, int]] | None = None
 
 
 class HexCanvas:
@@ -23,11 +61,30 @@ class HexCanvas:
     assets: AssetManager
     tilemap: tileutils.TileMap
     canvas_state: CanvasState
+    # Average colors of the blocks drawn at LOD_BLOCKS, by block coordinates
+    block_colors: Dict[Tuple[int, int], Tuple[int, int, int]]
+    # The asset version the block colors were worked out for
+    _color_version: int
+    # The canvas's subscriber in the tile map's change journal
+    _journal_name: str
+    # Corners of a hex relative to its center, by radius and orientation
+    _corner_offsets: Dict[Tuple[int, bool], List[Tuple[float, float]]]
+    zoom_preview: ZoomPreview | None
+    show_outline: bool
+    # Draw at this level of detail whatever the scale, for renders that always want the art
+    fixed_lod: int | None
 
-    def __init__(self, assets: AssetManager, tilemap: tileutils.TileMap):
+    def __init__(self, assets: AssetManager, tilemap: tileutils.TileMap,
+                 zoom_settle_ms: int = ZOOM_SETTLE_MS,
+                 time_source: Callable[[], int] = pygame.time.get_ticks):
         '''Initialize the HexCanvas'''
         self.assets = assets
         self.tilemap = tilemap
+        self.zoom_settle_ms = zoom_settle_ms
+        self.time_source = time_source
+        self.zoom_preview = None
+        self.show_outline = True
+        self.fixed_lod = None
         max_size = tilemap.get_map_size()
         max_size = (max_size[0] * tilemap.max_tile_size, max_size[1] * tilemap.max_tile_size)
         # Multiply the max size by the size of the hex to get the width and height,
@@ -37,6 +94,11 @@ class HexCanvas:
                                         vp_pos=(max_size[0] // 2, max_size[1] // 2),
                                         highlighted_tile=None,
                                         is_dragging=False)
+        # There can be more than one canvas on a map, such as a preview next to the main view
+        self._journal_name = self.tilemap.journal.subscribe_unique('canvas')
+        self.block_colors = {}
+        self._color_version = assets.version
+        self._corner_offsets = {}
 
     # Make some accessors for the canvas state
     @property
@@ -66,7 +128,13 @@ class HexCanvas:
 
     @highlighted_tile.setter
     def highlighted_tile(self, tile: Tuple[int, int] | None):
-        '''Set the highlighted tile'''
+        '''Set the highlighted tile, marking the old and new tiles for redrawing'''
+        self.canvas_state.hover_pos = None
+        if tile == self.canvas_state.highlighted_tile:
+            return
+        for coord in (self.canvas_state.highlighted_tile, tile):
+            if coord is not None:
+                self.canvas_state.dirty_tiles.add(coord)
         self.canvas_state.highlighted_tile = tile
 
     @property
@@ -79,50 +147,365 @@ class HexCanvas:
         '''Set the dragging state'''
         self.canvas_state.is_dragging = dragging
 
+    @property
+    def has_tile_changes(self) -> bool:
+        '''Check if tiles were changed on the map since the last draw'''
+        return self.tilemap.journal.has_changes(self._journal_name)
+
+    @property
+    def needs_redraw(self) -> bool:
+        '''Check if the whole canvas is out of date and has to be drawn again'''
+        return self.canvas_state.needs_redraw
+
+    @property
+    def has_updates(self) -> bool:
+        '''Check if any part of the canvas has to be drawn again'''
+        return (self.canvas_state.needs_redraw or bool(self.canvas_state.dirty_tiles) or
+                self.canvas_state.rendered_vp_pos != self.vp_pos or self.has_tile_changes or
+                self.zoom_pending)
+
+    @property
+    def zoom_pending(self) -> bool:
+        '''Check if a zoom is being previewed and has not been drawn at its new scale yet'''
+        return self.canvas_state.target_scale is not None
+
+    @property
+    def target_scale(self) -> int:
+        '''Get the scale the canvas is zooming to, or the current scale if it isn't zooming'''
+        if self.canvas_state.target_scale is not None:
+            return self.canvas_state.target_scale
+        return self.assets.scale
+
+    def invalidate(self) -> None:
+        '''Mark the canvas as needing to be drawn again'''
+        self.canvas_state.needs_redraw = True
+
+    @property
+    def lod(self) -> int:
+        '''Get the level of detail tiles are drawn with at the current scale'''
+        if self.fixed_lod is not None:
+            return self.fixed_lod
+        if self.assets.scale <= BLOCK_SCALE:
+            return LOD_BLOCKS
+        if self.assets.scale < DETAIL_SCALE:
+            return LOD_FLAT
+        return LOD_FULL
+
+    @property
+    def origin(self) -> Tuple[int, int]:
+        '''Get the position of tile (0, 0) on the viewport surface'''
+        return self.offset[0] + self.vp_pos[0], self.offset[1] + self.vp_pos[1]
+
+    @PROFILER.timed('canvas.draw')
     def draw(self, surface: pygame.Surface, rect_size: Tuple[int, int]):
         '''Draw the hex canvas'''
+        # A full draw picks up every pending tile change
+        self._drain_changes()
+        self.canvas_state.needs_redraw = False
+        self.canvas_state.dirty_tiles.clear()
+        self.canvas_state.rendered_vp_pos = self.vp_pos
+        self._draw_region(surface, pygame.Rect((0, 0), rect_size).clip(surface.get_rect()))
+
+    @PROFILER.timed('canvas.render')
+    def render(self, surface: pygame.Surface, rect_size: Tuple[int, int]) -> List[pygame.Rect]:
+        '''
+        Bring the viewport surface up to date, drawing only what changed where possible.
+
+        When the viewport has only been panned, the pixels already on the surface are scrolled
+        into place and just the newly exposed strips are drawn, so a drag costs about the
+        perimeter of the viewport rather than its area. While zoom input keeps arriving, the
+        last rendered frame is scaled instead, and the map is only drawn at the new scale once
+        the input has settled.
+
+            Args:
+                surface: pygame.Surface: The viewport surface.
+                rect_size: Tuple[int, int]: The size of the visible area.
+
+            Returns:
+                List[pygame.Rect]: The areas of the viewport surface that were redrawn.
+        '''
+        if self.zoom_pending:
+            if self.time_source() - self.canvas_state.zoom_time < self.zoom_settle_ms:
+                return self._draw_zoom_preview(surface, rect_size)
+            self._finish_zoom()
+        rendered = self.canvas_state.rendered_vp_pos
+        if self.canvas_state.needs_redraw or rendered is None:
+            self.draw(surface, rect_size)
+            return [surface.get_rect()]
+        rects = []
+        if rendered != self.vp_pos:
+            delta = (self.vp_pos[0] - rendered[0], self.vp_pos[1] - rendered[1])
+            if abs(delta[0]) >= rect_size[0] or abs(delta[1]) >= rect_size[1]:
+                self.draw(surface, rect_size)
+                return [surface.get_rect()]
+            self._scroll(surface, delta, rect_size)
+            rects.append(surface.get_rect())
+        self.canvas_state.dirty_tiles.update(self._drain_changes())
+        if self.canvas_state.dirty_tiles:
+            rects.extend(self.redraw_tiles(surface, self.canvas_state.dirty_tiles))
+            self.canvas_state.dirty_tiles.clear()
+        return rects
+
+    def _draw_zoom_preview(self, surface: pygame.Surface,
+                           rect_size: Tuple[int, int]) -> List[pygame.Rect]:
+        '''Scale the last rendered frame about the map's origin to preview the target scale'''
+        origin = self.origin
+        if self.zoom_preview is None:
+            # The surface still holds the frame rendered at rendered_vp_pos
+            rendered = self.canvas_state.rendered_vp_pos
+            self.zoom_preview = ZoomPreview(surface.copy(), self.assets.scale,
+                                            (self.offset[0] + rendered[0],
+                                             self.offset[1] + rendered[1]))
+        preview = self.zoom_preview
+        if preview.drawn == (self.target_scale, origin):
+            return []
+        preview.drawn = (self.target_scale, origin)
+
+        factor = self.target_scale / preview.scale
+        # Where the preview surface's top left corner lands on the viewport
+        left = origin[0] - preview.origin[0] * factor
+        top = origin[1] - preview.origin[1] * factor
+        # Only scale the part of the old frame that ends up in view, so zooming far in doesn't
+        # build a huge surface
+        source = pygame.Rect(math.floor(-left / factor), math.floor(-top / factor),
+                             math.ceil(rect_size[0] / factor) + 2,
+                             math.ceil(rect_size[1] / factor) + 2)
+        source = source.clip(preview.surface.get_rect())
+        surface.fill((0, 0, 0, 0))
+        if source:
+            scaled = pygame.transform.smoothscale(
+                preview.surface.subsurface(source),
+                (max(1, round(source.width * factor)), max(1, round(source.height * factor))))
+            surface.blit(scaled, (round(left + source.x * factor), round(top + source.y * factor)))
+        return [surface.get_rect()]
+
+    def _finish_zoom(self) -> None:
+        '''Switch to the target scale once zoom input has settled'''
+        self.assets.set_scale(self.target_scale)
+        self.canvas_state.target_scale = None
+        self.zoom_preview = None
+        self.invalidate()
+        if self.canvas_state.hover_pos is not None:
+            self.hover(self.canvas_state.hover_pos)
+
+    def _drain_changes(self) -> Set[Tuple[int, int]]:
+        '''Take the tiles changed since the last render and forget the blocks they are in'''
+        changed = set(self.tilemap.journal.drain(self._journal_name))
+        for coord in changed:
+            self.block_colors.pop(self._block_of(coord), None)
+        return changed
+
+    def _scroll(self, surface: pygame.Surface, delta: Tuple[int, int],
+                rect_size: Tuple[int, int]) -> None:
+        '''Shift the rendered viewport by delta and draw the strips it exposes'''
+        surface.scroll(delta[0], delta[1])
+        self.canvas_state.rendered_vp_pos = self.vp_pos
+        width, height = rect_size
+        if delta[0] > 0:
+            self._draw_region(surface, pygame.Rect(0, 0, delta[0], height))
+        elif delta[0] < 0:
+            self._draw_region(surface, pygame.Rect(width + delta[0], 0, -delta[0], height))
+        if delta[1] > 0:
+            self._draw_region(surface, pygame.Rect(0, 0, width, delta[1]))
+        elif delta[1] < 0:
+            self._draw_region(surface, pygame.Rect(0, height + delta[1], width, -delta[1]))
+        # The canvas outline is only one pixel wide, so it is cheaper to draw it again than to
+        # work out which parts of it moved into view
+        self._draw_outline(surface)
+
+    def tile_rect(self, coordinates: Tuple[int, int]) -> pygame.Rect:
+        '''Get the area of the viewport surface a tile can draw to'''
+        tile = self.tilemap.tiles[coordinates]
+        radius = tile.radius
+        center = hexgrid.axial_to_pixel(tile.hex_info, radius, self.origin)
+        # Pad by a pixel for rounding in the image placement and polygon edges
+        return pygame.Rect(center[0] - radius - 1, center[1] - radius - 1,
+                           radius * 2 + 3, radius * 2 + 3)
+
+    def redraw_tiles(self, surface: pygame.Surface,
+                     coordinates: Iterable[Tuple[int, int]]) -> List[pygame.Rect]:
+        '''
+        Redraw the area around each of the given tiles.
+
+            Returns:
+                List[pygame.Rect]: The areas of the viewport surface that were redrawn.
+        '''
+        rects = []
+        for coord in coordinates:
+            if coord not in self.tilemap.tiles:
+                continue
+            rect = self.tile_rect(coord)
+            if self.lod == LOD_BLOCKS:
+                # A changed tile changes the color of its whole block
+                rect = rect.union(self.block_rect(self._block_of(coord)))
+            rect = rect.clip(surface.get_rect())
+            if rect:
+                self._draw_region(surface, rect)
+                rects.append(rect)
+        return rects
+
+    def _draw_region(self, surface: pygame.Surface, rect: pygame.Rect) -> None:
+        '''
+        Clear an area of the viewport surface and draw every tile touching it, clipped to it.
+
+        Hexes overlap their neighbours' bounding boxes, so tiles are always drawn in the map's
+        original order. That way redrawing any area gives the same pixels as a full draw.
+        '''
+        if not rect:
+            return
+        clip = surface.get_clip()
+        surface.set_clip(rect)
         surface.fill((0, 0, 0, 0))
-        for tile in self.tilemap.tiles.values():
-            # Don't draw tiles outside the rectangle
-            tcenter = tile.center
-            tcenter = (tcenter[0] + self.offset[0] + self.vp_pos[0],
-                       tcenter[1] + self.offset[1] + self.vp_pos[1])
-            if ((0 > tcenter[0] + tile.radius) or (tcenter[0] - tile.radius > rect_size[0]) or
-                    (0 > tcenter[1] + tile.radius) or (tcenter[1] - tile.radius > rect_size[1])):
+        origin = self.origin
+        coordinates = self.tilemap.tiles_in_rect(rect, origin)
+        PROFILER.count('tiles.drawn', len(coordinates))
+        lod = self.lod
+        if lod == LOD_BLOCKS:
+            self._draw_blocks(surface, coordinates)
+        for coord in coordinates:
+            tile = self.tilemap.tiles[coord]
+            if lod == LOD_FULL:
+                tile.draw(surface, origin, tile.hex_info.color)
+            elif lod == LOD_FLAT:
+                pygame.draw.polygon(surface, tile.dominant_color(), self._hex_points(tile))
+            if coord != self.highlighted_tile:
                 continue
-            tile.draw(surface, self.offset, tile.hex_info.color)
-            if (self.highlighted_tile and
-                    (tile.hex_info.q, tile.hex_info.r) == self.highlighted_tile):
-                tile.draw(surface, self.offset, (0, 0, 255, 128), 0)
-        # Draw a white line around the edge of the entire canvas
+            if lod == LOD_FULL:
+                tile.draw(surface, origin, (0, 0, 255, 128), 0)
+            else:
+                # Just the highlight, as the tile's art isn't drawn at this level of detail
+                pygame.draw.polygon(surface, (0, 0, 255, 128), self._hex_points(tile))
+        self._draw_outline(surface)
+        surface.set_clip(clip)
+
+    def _hex_points(self, tile: tileutils.Tile) -> List[Tuple[float, float]]:
+        '''Get the corners of a tile on the viewport surface'''
+        radius = self.assets.scale // 2
+        key = (radius, tile.hex_info.flat)
+        if key not in self._corner_offsets:
+            self._corner_offsets[key] = hexgrid.calc_points((0, 0), radius, tile.hex_info.flat)
+        center = hexgrid.axial_to_pixel(tile.hex_info, radius, self.origin)
+        return [(center[0] + x, center[1] + y) for x, y in self._corner_offsets[key]]
+
+    @staticmethod
+    def _block_of(coordinates: Tuple[int, int]) -> Tuple[int, int]:
+        '''Get the block a tile belongs to'''
+        return coordinates[0] // BLOCK_SIZE, coordinates[1] // BLOCK_SIZE
+
+    def _block_points(self, block: Tuple[int, int]) -> List[Tuple[float, float]]:
+        '''
+        Get the corners of a block on the viewport surface. A block covers the parallelogram
+        of axial space its tiles sit in, so neighbouring blocks meet without gaps.
+        '''
+        radius = self.assets.scale // 2
+        flat = next(iter(self.tilemap.tiles.values())).hex_info.flat
+        origin = self.origin
+        low_q, low_r = block[0] * BLOCK_SIZE - 0.5, block[1] * BLOCK_SIZE - 0.5
+        points = []
+        for q, r in ((low_q, low_r), (low_q + BLOCK_SIZE, low_r),
+                     (low_q + BLOCK_SIZE, low_r + BLOCK_SIZE), (low_q, low_r + BLOCK_SIZE)):
+            if flat:
+                points.append((origin[0] + radius * 1.5 * q,
+                               origin[1] + radius * math.sqrt(3) * (r + q / 2)))
+            else:
+                points.append((origin[0] + radius * math.sqrt(3) * (q + r / 2),
+                               origin[1] + radius * 1.5 * r))
+        return points
+
+    def block_rect(self, block: Tuple[int, int]) -> pygame.Rect:
+        '''Get the area of the viewport surface a block can draw to'''
+        points = self._block_points(block)
+        left = math.floor(min(x for x, _ in points)) - 1
+        top = math.floor(min(y for _, y in points)) - 1
+        right = math.ceil(max(x for x, _ in points)) + 2
+        bottom = math.ceil(max(y for _, y in points)) + 2
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def block_color(self, block: Tuple[int, int]) -> Tuple[int, int, int]:
+        '''Get the average dominant color of the tiles in a block'''
+        if self._color_version != self.assets.version:
+            # Reloaded images change the colors of the tiles using them
+            self.block_colors.clear()
+            self._color_version = self.assets.version
+        if block in self.block_colors:
+            PROFILER.count('canvas.block_colors.hit')
+        else:
+            PROFILER.count('canvas.block_colors.miss')
+            colors = [self.tilemap.tiles[(q, r)].dominant_color()
+                      for q in range(block[0] * BLOCK_SIZE, (block[0] + 1) * BLOCK_SIZE)
+                      for r in range(block[1] * BLOCK_SIZE, (block[1] + 1) * BLOCK_SIZE)
+                      if (q, r) in self.tilemap.tiles]
+            self.block_colors[block] = tuple(
+                round(sum(channel) / len(colors)) for channel in zip(*colors))
+        return self.block_colors[block]
+
+    def _draw_blocks(self, surface: pygame.Surface,
+                     coordinates: Iterable[Tuple[int, int]]) -> None:
+        '''Draw the blocks of the given tiles, in a fixed order so regions redraw exactly'''
+        for block in sorted({self._block_of(coord) for coord in coordinates}):
+            pygame.draw.polygon(surface, self.block_color(block), self._block_points(block))
+
+    def _draw_outline(self, surface: pygame.Surface) -> None:
+        '''Draw a white line around the edge of the entire canvas'''
+        if not self.show_outline:
+            return
         pygame.draw.rect(surface, (255, 255, 255),
-                         (1, 1, self.max_size[0] - 1, self.max_size[1] - 1), 1)
+                         (self.vp_pos[0] + 1, self.vp_pos[1] + 1,
+                          self.max_size[0] - 1, self.max_size[1] - 1), 1)
 
     def get_tile(self, x: int, y: int):
         '''Get the tile at the specified coordinates'''
         return self.tilemap.tiles[(x, y)]
 
-    def handle_command(self, command: str, surface: pygame.Surface, rect_size: Tuple[int, int]):
+    def handle_command(self, command: str, rect_size: Tuple[int, int]):
         '''Handle a preprocessed(probably mapped) command'''
         if command == 'zoom_in':
-            if self.assets.scale == self.assets.max_scale:
-                return
-            self.assets.scale_up()
+            self.zoom(1)
         elif command == 'zoom_out':
-            if self.assets.scale == self.assets.min_scale:
-                return
-            self.assets.scale_down()
-        elif command == 'camera_up':
-            self.vp_pos = (self.vp_pos[0], self.vp_pos[1] + 10)
-        elif command == 'camera_down':
-            self.vp_pos = (self.vp_pos[0], self.vp_pos[1] - 10)
-        elif command == 'camera_left':
-            self.vp_pos = (self.vp_pos[0] + 10, self.vp_pos[1])
-        elif command == 'camera_right':
-            self.vp_pos = (self.vp_pos[0] - 10, self.vp_pos[1])
+            self.zoom(-1)
+        elif command in CAMERA_MOVES:
+            self.pan(CAMERA_MOVES[command], rect_size)
+
+    def pan(self, delta: Tuple[int, int], rect_size: Tuple[int, int]) -> None:
+        '''Move the viewport by an offset, clamped to the edges of the canvas'''
+        if delta == (0, 0):
+            return
+        # render() notices the move and scrolls the existing pixels
+        self.vp_pos = (self.vp_pos[0] + delta[0], self.vp_pos[1] + delta[1])
+        self._clamp_vp_pos(rect_size)
+
+    def zoom(self, steps: int) -> None:
+        '''
+        Zoom in (positive) or out (negative) by a number of steps.
+
+        Steps only move the target scale. render() previews it by scaling the last frame and
+        rescales the assets once, after the input settles, instead of once per step.
+        '''
+        target = max(self.assets.min_scale,
+                     min(self.target_scale + steps * SCALE_STEP, self.assets.max_scale))
+        if target == self.target_scale:
+            return
+        if self.canvas_state.rendered_vp_pos is None:
+            # Nothing has been rendered to preview with
+            self.assets.set_scale(target)
+            self.invalidate()
+            return
+        self.canvas_state.target_scale = target
+        self.canvas_state.zoom_time = self.time_source()
 
+    def center_on(self, point: Tuple[float, float], rect_size: Tuple[int, int]) -> None:
+        '''Move the viewport so a point on the map, in pixels from tile (0, 0), is in its middle'''
+        self.vp_pos = (round(rect_size[0] / 2 - point[0]) - self.offset[0],
+                       round(rect_size[1] / 2 - point[1]) - self.offset[1])
         self._clamp_vp_pos(rect_size)
-        self.draw(surface, rect_size)
+
+    def hover(self, pos: Tuple[int, int]) -> None:
+        '''Highlight the tile under a position relative to the viewport'''
+        if self.zoom_pending:
+            # Tiles can't be hit-tested until they are laid out at the new scale
+            self.canvas_state.hover_pos = pos
+            return
+        self.highlighted_tile = self.tilemap.check_collision(pos, self.origin)
 
     def _clamp_vp_pos(self, rect_size: Tuple[int, int]) -> None:
         '''Clamp the viewport position to the edges of the viewport rect'''
@@ -142,43 +525,19 @@ class HexCanvas:
 
         self.vp_pos = (vp_x, vp_y)
 
-    # pylint: disable=too-many-branches
-    def handle_event(self, event: pygame.event.Event,
-                     surface: pygame.Surface,
-                     rect_size: Tuple[int, int]):
+    def handle_event(self, event: pygame.event.Event, rect_size: Tuple[int, int]):
         '''Handle events for the hex canvas'''
         # highlight the tile that the mouse is over
         if event.type == pygame.MOUSEMOTION:
             if self.canvas_state.is_dragging:
-                self.vp_pos = (self.vp_pos[0] + event.rel[0],
-                               self.vp_pos[1] + event.rel[1])
-
-                self._clamp_vp_pos(rect_size)
-                self.draw(surface, rect_size)
+                self.pan(event.rel, rect_size)
             else:
-                highlighted_tile = self.tilemap.check_collision(event.pos,
-                                                                (self.offset[0] +
-                                                                 self.vp_pos[0],
-                                                                 self.offset[1] +
-                                                                 self.vp_pos[1]))
-                if highlighted_tile != self.highlighted_tile:
-                    self.highlighted_tile = highlighted_tile
-                    self.draw(surface, rect_size)
+                self.hover(event.pos)
             return
 
         if event.type == pygame.MOUSEWHEEL:
             # zoom in and out
-            if event.y > 0:
-                # Assets already has a check to limit zoom, but check again here to prevent
-                # unneeded rendering.
-                if self.assets.scale == self.assets.max_scale:
-                    return
-                self.assets.scale_up()
-            else:
-                if self.assets.scale == self.assets.min_scale:
-                    return
-                self.assets.scale_down()
-            self.draw(surface, rect_size)
+            self.zoom(1 if event.y > 0 else -1)
             return
 
         if event.type == pygame.MOUSEBUTTONDOWN:
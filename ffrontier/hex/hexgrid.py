@@ -1,6 +1,6 @@
 '''Handles all hex grid related operations'''
 from dataclasses import dataclass
-from typing import Tuple, List
+from typing import Iterator, Tuple, List
 import math
 
 import pygame
@@ -84,6 +84,59 @@ def get_cube_distance(cube1: Tuple[int, int, int], cube2: Tuple[int, int, int])
     return (abs(cube1[0] - cube2[0]) + abs(cube1[1] - cube2[1]) + abs(cube1[2] - cube2[2])) // 2
 
 
+# Axial offsets of the six neighbours of a hex
+NEIGHBOR_OFFSETS = ((1, 0), (1, -1), (0, -1), (-1, 0), (-1, 1), (0, 1))
+
+
+def neighbors(q: int, r: int) -> List[Tuple[int, int]]:
+    '''Get the axial coordinates of the six neighbours of a hex'''
+    return [(q + dq, r + dr) for dq, dr in NEIGHBOR_OFFSETS]
+
+
+def hexagon_coordinates(radius: int) -> Iterator[Tuple[int, int]]:
+    '''Iterate over the axial coordinates of a hexagon-shaped map of the given radius'''
+    for q in range(-radius, radius + 1):
+        for r in range(max(-radius, -q - radius), min(radius, -q + radius) + 1):
+            yield q, r
+
+
+# pylint: disable=too-many-arguments, too-many-positional-arguments
+def hexes_in_rect(left: int, top: int, right: int, bottom: int, radius: int, flat: bool,
+                  offset: Tuple[int, int] = (0, 0)) -> Iterator[Tuple[int, int]]:
+    '''
+    Iterate over the axial coordinates of every hex whose bounding box may overlap a pixel
+    rectangle, without looking at any hex outside it. Allows a row of slack on each side
+    for rounding, so callers should still clip.
+
+        Args:
+            left, top, right, bottom: int: The rectangle, right and bottom exclusive.
+            radius: int: The radius of the hexes.
+            flat: bool: Whether the hexes are flat-topped.
+            offset: Tuple[int, int]: The pixel position of hex (0, 0).
+
+        Returns:
+            Iterator[Tuple[int, int]]: The axial coordinates.
+    '''
+    if radius <= 0:
+        return
+    # Flat-topped hexes are laid out in columns of q, pointy-topped ones in rows of r, so
+    # swap the axes for pointy hexes and swap the coordinates back at the end
+    if not flat:
+        left, top, right, bottom = top, left, bottom, right
+        offset = (offset[1], offset[0])
+    step = radius * 3 / 2
+    height = radius * math.sqrt(3)
+    # A hex image can be a pixel wider than twice the radius
+    extent = radius + 1
+    first = math.floor((left - extent - offset[0]) / step) - 1
+    last = math.ceil((right + extent - offset[0]) / step) + 1
+    for major in range(first, last + 1):
+        low = math.floor((top - extent - offset[1]) / height - major / 2) - 1
+        high = math.ceil((bottom + extent - offset[1]) / height - major / 2) + 1
+        for minor in range(low, high + 1):
+            yield (major, minor) if flat else (minor, major)
+
+
 def calc_points(center: Tuple[int, int], radius: int, flat: bool) -> List[Tuple[float, float]]:
     '''Calculate the points of a hexagon'''
     return [
@@ -0,0 +1,93 @@
+'''Change journal that records which tiles were modified since each subscriber last looked.'''
+from enum import IntFlag
+from typing import Dict, Iterable, Iterator, Tuple
+import itertools
+
+
+class TileChange(IntFlag):
+    '''Kinds of change that can be recorded against a tile.'''
+    NONE = 0
+    LAYERS = 1
+    COLOR = 2
+    BORDER = 4
+    FEATURES = 8
+    ALL = LAYERS | COLOR | BORDER | FEATURES
+
+
+class ChangeJournal:
+    '''
+    Records tile changes for every subscriber until that subscriber drains them.
+
+    Each subscriber (render cache, minimap, saver, ...) gets its own pending set, so a slow
+    consumer like the autosaver never hides changes from a fast one like the canvas.
+    Repeated changes to the same tile are merged, which keeps the journal bounded by the
+    number of tiles rather than the number of edits.
+    '''
+    pending: Dict[str, Dict[Tuple[int, int], TileChange]]
+    # Numbers the subscribers registered with subscribe_unique
+    _ids: Iterator[int]
+
+    def __init__(self):
+        self.pending = {}
+        self._ids = itertools.count(1)
+
+    def subscribe(self, name: str) -> None:
+        '''Register a subscriber. Only changes recorded after this call are reported to it.'''
+        if name in self.pending:
+            raise ValueError(f'Subscriber {name} already exists')
+        self.pending[name] = {}
+
+    def subscribe_unique(self, prefix: str) -> str:
+        '''
+        Register a subscriber under a new name starting with prefix, for consumers that can
+        have more than one instance on the same map.
+
+            Returns:
+                str: The name to drain the subscriber's changes with.
+        '''
+        name = f'{prefix}-{next(self._ids)}'
+        while name in self.pending:
+            name = f'{prefix}-{next(self._ids)}'
+        self.subscribe(name)
+        return name
+
+    def unsubscribe(self, name: str) -> None:
+        '''Remove a subscriber and discard its pending changes.'''
+        self.pending.pop(name, None)
+
+    def is_subscribed(self, name: str) -> bool:
+        '''Check if a subscriber is registered.'''
+        return name in self.pending
+
+    def record(self, coordinates: Tuple[int, int], change: TileChange) -> None:
+        '''Record a change to a tile for every subscriber.'''
+        for changes in self.pending.values():
+            changes[coordinates] = changes.get(coordinates, TileChange.NONE) | change
+
+    def record_all(self, coordinates: Iterable[Tuple[int, int]],
+                   change: TileChange = TileChange.ALL) -> None:
+        '''Record the same change against many tiles.'''
+        for coord in coordinates:
+            self.record(coord, change)
+
+    def has_changes(self, name: str) -> bool:
+        '''Check if a subscriber has changes waiting.'''
+        return bool(self._changes(name))
+
+    def drain(self, name: str) -> Dict[Tuple[int, int], TileChange]:
+        '''Return and clear the pending changes for a subscriber.'''
+        changes = self._changes(name)
+        self.pending[name] = {}
+        return changes
+
+    def restore(self, name: str, changes: Dict[Tuple[int, int], TileChange]) -> None:
+        '''Put drained changes back for a subscriber that failed to handle them.'''
+        pending = self._changes(name)
+        for coordinates, change in changes.items():
+            pending[coordinates] = pending.get(coordinates, TileChange.NONE) | change
+
+    def _changes(self, name: str) -> Dict[Tuple[int, int], TileChange]:
+        '''Get the pending changes of a registered subscriber.'''
+        if name not in self.pending:
+            raise ValueError(f'Subscriber {name} not found in journal')
+        return self.pending[name]
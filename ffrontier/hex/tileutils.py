@@ -1,15 +1,20 @@
 '''Tile-related classes and functions'''
-from typing import Dict, Tuple, List
+from typing import Dict, Iterator, Tuple, List
+import math
 
 import pygame
 
 from ffrontier.hex import hexgrid
-from ffrontier.game.maphandler import MapHandler
+from ffrontier.hex.journal import ChangeJournal, TileChange
+from ffrontier.game.maphandler import MapHandler, TileData
 import ffrontier.managers.asset_manager as am
+from ffrontier.utils.profiling import PROFILER
 
 
 # Constants
 MAX_SIZE = 100
+# Fraction of a square image covered by the hex masked into it
+HEX_COVERAGE = 3 * math.sqrt(3) / 8
 
 
 # exceptions
@@ -37,6 +42,12 @@ class Layer:
         '''Create a Layer from a dictionary'''
         return Layer(layer_data['image'], int(layer_data.get('alpha', 255)))
 
+    def to_dict(self) -> Dict[str, str | int]:
+        '''Convert the Layer to a dictionary, leaving out the default alpha'''
+        if self.alpha == 255:
+            return {'image': self.image}
+        return {'image': self.image, 'alpha': self.alpha}
+
     def blend(self, surface: pygame.Surface, assets: am.AssetManager):
         '''Blends the layer onto a surface'''
         image = assets.get_scaled_image(self.image)
@@ -49,13 +60,19 @@ class Tile:
     hex_info: hexgrid.HexInfo
     asset_manager: am.AssetManager
     images: List[Layer]
+    features: List[str]
 
     def __init__(self, hex_info: hexgrid.HexInfo,
                  images: List[Layer],
-                 asset_manager: am.AssetManager):
+                 asset_manager: am.AssetManager,
+                 features: List[str] | None = None):
         self.hex_info = hex_info
         self.asset_manager = asset_manager
         self.images = images
+        self.features = features if features is not None else []
+        self._dominant_color: Tuple[int, int, int] | None = None
+        # The asset version the dominant color was worked out for
+        self._color_version = 0
 
     @property
     def center(self) -> Tuple[int, int]:
@@ -67,6 +84,7 @@ class Tile:
         '''Get the radius of the tile'''
         return self.asset_manager.scale // 2
 
+    @PROFILER.timed('tile.draw')
     def draw(self, surface: pygame.Surface,
              offset: Tuple[int, int] = (0, 0),
              color: Tuple[int, int, int, int] = (255, 255, 255, 255),
@@ -79,6 +97,7 @@ class Tile:
             image = pygame.Surface((self.asset_manager.scale,
                                     self.asset_manager.scale),
                                    pygame.SRCALPHA)
+            PROFILER.count('surfaces.allocated')
 
             for layer in self.images:
                 layer.blend(image, self.asset_manager)
@@ -94,6 +113,40 @@ class Tile:
                          radius, offset, color,
                          border if border is not None else self.hex_info.border)
 
+    def dominant_color(self) -> Tuple[int, int, int]:
+        '''Get the color the tile looks like from far away, for low detail rendering'''
+        # Average colors come from the unscaled images, so only a reload changes them
+        if self._dominant_color is None or self._color_version != self.asset_manager.version:
+            PROFILER.count('tile.dominant_color.miss')
+            self._dominant_color = self._blend_color()
+            self._color_version = self.asset_manager.version
+        else:
+            PROFILER.count('tile.dominant_color.hit')
+        return self._dominant_color
+
+    def invalidate(self) -> None:
+        '''Forget anything cached about how the tile looks'''
+        self._dominant_color = None
+
+    def _blend_color(self) -> Tuple[int, int, int]:
+        '''Approximate the color of a fully drawn tile from the average colors of its layers'''
+        # Layers are blended with BLEND_RGBA_MAX, so take the brightest of each channel
+        color = (0, 0, 0)
+        for layer in self.images:
+            r, g, b, a = self.asset_manager.get_average_color(layer.image)
+            weight = min(1.0, a / 255 / HEX_COVERAGE) * layer.alpha / 255
+            color = (max(color[0], round(r * weight)), max(color[1], round(g * weight)),
+                     max(color[2], round(b * weight)))
+        # A filled hex is drawn over the layers. With no layers an outline is all there is
+        # to see, so use its color.
+        if self.hex_info.border == 0 or not self.images:
+            r, g, b, a = self.hex_info.color
+            alpha = a / 255 if self.hex_info.border == 0 else 1.0
+            color = (round(r * alpha + color[0] * (1 - alpha)),
+                     round(g * alpha + color[1] * (1 - alpha)),
+                     round(b * alpha + color[2] * (1 - alpha)))
+        return color
+
     @property
     def coordinates(self) -> Tuple[int, int]:
         '''Get the coordinates of the tile'''
@@ -113,14 +166,23 @@ class TileMap:
     '''Map of tiles'''
     tiles: Dict[Tuple[int, int], Tile]
     offset: Tuple[int, int]
+    journal: ChangeJournal
+    map_handler: MapHandler
+    order: Dict[Tuple[int, int], int]
 
     def __init__(self,
                  asset_manager: am.AssetManager,
-                 map_file: str):
+                 map_file: str,
+                 **handler_options):
+        '''Load a map. Extra keyword arguments, like cache_dir, are passed to MapHandler.'''
         self.tiles = {}
+        self.order = {}
         self.asset_manager = asset_manager
+        self.journal = ChangeJournal()
+        self.journal.subscribe('saver')
         # load the map data and construct tiles
-        map_handler = MapHandler(map_file)
+        map_handler = MapHandler(map_file, **handler_options)
+        self.map_handler = map_handler
         for tile_data in map_handler.map_data:
             info = hexgrid.HexInfo(int(tile_data['coordinates'][0]),
                                    int(tile_data['coordinates'][1]),
@@ -132,7 +194,8 @@ class TileMap:
 
             tile = Tile(info,
                         layer_list,
-                        asset_manager)
+                        asset_manager,
+                        list(tile_data.get('features', [])))
             self.add_tile(tile)
         self._validate_map()
 
@@ -155,6 +218,73 @@ class TileMap:
         if (tile.hex_info.q, tile.hex_info.r) in self.tiles:
             raise DuplicateTileError(f'Tile ({tile.hex_info.q}, {tile.hex_info.r}) already exists')
         self.tiles[(tile.hex_info.q, tile.hex_info.r)] = tile
+        # Overlapping edges depend on draw order, so partial redraws need the original order
+        self.order[(tile.hex_info.q, tile.hex_info.r)] = len(self.order)
+
+    def set_layers(self, coordinates: Tuple[int, int], layers: List[Layer]) -> None:
+        '''Replace the image layers of a tile'''
+        self.tiles[coordinates].images = list(layers)
+        self.tiles[coordinates].invalidate()
+        self.journal.record(coordinates, TileChange.LAYERS)
+
+    def set_color(self, coordinates: Tuple[int, int], color: Tuple[int, int, int, int]) -> None:
+        '''Set the hex color of a tile'''
+        self.tiles[coordinates].hex_info.color = color
+        self.tiles[coordinates].invalidate()
+        self.journal.record(coordinates, TileChange.COLOR)
+
+    def set_border(self, coordinates: Tuple[int, int], border: int) -> None:
+        '''Set the border width of a tile'''
+        self.tiles[coordinates].hex_info.border = border
+        self.tiles[coordinates].invalidate()
+        self.journal.record(coordinates, TileChange.BORDER)
+
+    def set_features(self, coordinates: Tuple[int, int], features: List[str]) -> None:
+        '''Replace the features of a tile'''
+        self.tiles[coordinates].features = list(features)
+        self.journal.record(coordinates, TileChange.FEATURES)
+
+    def tile_data(self, coordinates: Tuple[int, int]) -> TileData:
+        '''Get the map file representation of a tile'''
+        tile = self.tiles[coordinates]
+        return {
+            'coordinates': coordinates,
+            'layers': [layer.to_dict() for layer in tile.images],
+            'features': list(tile.features),
+            'border': tile.hex_info.border,
+            'color': tile.hex_info.color
+        }
+
+    def iter_tile_data(self) -> Iterator[TileData]:
+        '''Iterate over the map file representation of every tile'''
+        for coordinates in self.tiles:
+            yield self.tile_data(coordinates)
+
+    def save(self, full: bool = False) -> None:
+        '''
+        Save the map. By default only the tiles changed since the last save are appended to
+        the map's delta log, and the log is folded into the map file once it grows large.
+
+            Args:
+                full: bool: Rewrite the whole map file instead. This is also done when the
+                    map's header has changed.
+
+            Returns:
+                None
+        '''
+        changed = self.journal.drain('saver')
+        try:
+            # A new header, such as a new game's seed, can only be written by a full save
+            if full or self.map_handler.header_changed:
+                self.map_handler.save_map(self.iter_tile_data())
+                return
+            self.map_handler.append_delta(self.tile_data(coord) for coord in changed)
+            if self.map_handler.needs_compaction():
+                self.map_handler.save_map(self.iter_tile_data())
+        except BaseException:
+            # Keep the changes for the next save rather than losing them with this one
+            self.journal.restore('saver', changed)
+            raise
 
     def draw(self, surface: pygame.Surface):
         '''Draw the map'''
@@ -165,12 +295,29 @@ class TileMap:
         '''Get a tile by its coordinates'''
         return self.tiles[coordinates]
 
+    def tiles_in_rect(self, rect: pygame.Rect,
+                      offset: Tuple[int, int] = (0, 0)) -> List[Tuple[int, int]]:
+        '''
+        Get the coordinates of the tiles that may overlap a pixel rectangle, in draw order.
+        Only the hexes under the rectangle are looked at, not the whole map.
+        '''
+        if not self.tiles:
+            return []
+        flat = next(iter(self.tiles.values())).hex_info.flat
+        radius = self.asset_manager.scale // 2
+        found = [coord for coord in hexgrid.hexes_in_rect(rect.left, rect.top, rect.right,
+                                                          rect.bottom, radius, flat, offset)
+                 if coord in self.tiles]
+        found.sort(key=self.order.__getitem__)
+        return found
+
     def check_collision(self, point: Tuple[int, int],
                         offset: Tuple[int, int] = (0, 0)) -> Tuple[int, int] | None:
         '''Check if a point collides with a tile'''
-        for tile in self.tiles.values():
-            if tile.hex_info.collides(point[0], point[1], self.asset_manager.scale // 2, offset):
-                return tile.coordinates
+        for coord in self.tiles_in_rect(pygame.Rect(point, (1, 1)), offset):
+            if self.tiles[coord].hex_info.collides(point[0], point[1],
+                                                   self.asset_manager.scale // 2, offset):
+                return coord
         return None
 
     def _validate_map(self):
@@ -182,10 +329,7 @@ class TileMap:
         for q, r in self.tiles.keys():  # pylint: disable=consider-iterating-dictionary
             radius = max(radius, hexgrid.get_cube_distance((0, 0, 0), (q, -q - r, r)))
         # Generate all expected coordinates based on the bounds
-        expected_coords = set()
-        for q in range(-radius, radius + 1):
-            for r in range(max(-radius, -q - radius), min(radius, -q + radius) + 1):
-                expected_coords.add((q, r))
+        expected_coords = set(hexgrid.hexagon_coordinates(radius))
 
         # Find missing coordinates
         missing_coords = expected_coords - self.tiles.keys()
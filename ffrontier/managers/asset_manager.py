@@ -1,24 +1,30 @@
 '''Definition and details of the AssetManager class.'''
-from typing import Any, Callable, Dict, Set, Optional
+from typing import Any, Callable, Dict, Set, Optional, Tuple
 import json
 
 # 3rd party modules
 import pygame
-import jsonschema
 
 # Local modules
 from ffrontier.hex import hexgrid
+from ffrontier.utils.profiling import PROFILER
+from ffrontier.utils.validation import compile_schema
 
 
 # Constants
 MAX_SCALE = 400
 MIN_SCALE = 20
+# How much one zoom step changes the scale
+SCALE_STEP = 5
 
 
 class AssetManager:
     '''Class to manage assets like images, sounds, and fonts.'''
     images: Dict[str, pygame.Surface]
     scaled_images: Dict[str, pygame.Surface]
+    average_colors: Dict[str, Tuple[int, int, int, int]]
+    # Counts image loads, so colors worked out from the images know when to be recomputed
+    version: int
     sounds: Dict[str, pygame.mixer.Sound]
     fonts: Dict[str, pygame.font.Font]
     scale: int
@@ -29,6 +35,8 @@ class AssetManager:
         '''Initialize the AssetManager class.'''
         self.images = {}
         self.scaled_images = {}
+        self.average_colors = {}
+        self.version = 0
         self.sounds = {}
         self.fonts = {}
         self.scale = scale
@@ -51,7 +59,7 @@ class AssetManager:
         '''Loads the list of assets from the assets.json file and puts them into the manager.'''
         with open(asset_file, encoding='utf-8') as file:
             asset_data: Dict[str, Any] = json.load(file)
-            jsonschema.validate(asset_data, asset_schema)
+            compile_schema(asset_schema)(asset_data)
             # override mask if it is given
             if 'orientation' in asset_data:
                 if mask is None:
@@ -66,6 +74,7 @@ class AssetManager:
             for font in asset_data['fonts']:
                 self.fonts[font['name']] = pygame.font.Font(font['path'], 16)
 
+    @PROFILER.timed('assets.load_image')
     def load_image(self, path: str, name: str, scale: Optional[int] = None,
                    mask: Optional[Callable[[pygame.Surface], pygame.Surface]] = None):
         '''
@@ -86,6 +95,8 @@ class AssetManager:
                 None
 
         '''
+        self.average_colors.pop(name, None)
+        self.version += 1
         try:
             self.images[name] = pygame.image.load(path)
         except FileNotFoundError as e:
@@ -100,6 +111,7 @@ class AssetManager:
         '''Rescale a specific image in the scaled_images dictionary.'''
         self.scaled_images[name] = pygame.transform.scale(self.images[name], (scale, scale))
 
+    @PROFILER.timed('assets.rescale')
     def rescale_images(self, scale=None):
         '''Rescale all images in the scaled_images dictionary.'''
         if scale:
@@ -109,6 +121,7 @@ class AssetManager:
         for name in self.in_use:
             self.scaled_images[name] = pygame.transform.scale(self.images[name],
                                                               (self.scale, self.scale))
+        PROFILER.count('surfaces.allocated', len(self.in_use))
 
     def load_sound(self, path, name):
         '''Load a sound from a file and store it in the sounds dictionary.'''
@@ -118,6 +131,27 @@ class AssetManager:
         '''Return an image from the images dictionary.'''
         return self.images[name]
 
+    def get_average_color(self, name: str) -> Tuple[int, int, int, int]:
+        '''
+        Return the average color of an image's pixels weighted by their alpha, along with its
+        mean alpha. Transparent pixels, like the corners of a masked hex, don't darken it.
+        '''
+        if name not in self.average_colors:
+            if name not in self.images:
+                raise ValueError(f'Image {name} does not exist')
+            image = self.images[name]
+            if image.get_flags() & pygame.SRCALPHA:
+                # Averaging premultiplied pixels and dividing by the mean alpha gives the
+                # alpha-weighted average
+                r, g, b, a = pygame.transform.average_color(image.premul_alpha())
+                if a:
+                    r, g, b = (min(255, round(c * 255 / a)) for c in (r, g, b))
+                self.average_colors[name] = (r, g, b, a)
+            else:
+                r, g, b, _ = pygame.transform.average_color(image)
+                self.average_colors[name] = (r, g, b, 255)
+        return self.average_colors[name]
+
     def get_scaled_image(self, name: str) -> pygame.Surface:
         '''Return a scaled image from the scaled_images dictionary.'''
         # Check if the image exists
@@ -126,11 +160,15 @@ class AssetManager:
             raise ValueError(f'Image {name} does not exist')
         if name not in self.scaled_images:
             # Scale the image if it has not been scaled
+            PROFILER.count('assets.scaled_images.miss')
             self.rescale_image(name, self.scale)
-        self.in_use.add(name)
         # if the image is not the correct size, rescale it
-        if self.scaled_images[name].get_width() != self.scale:
+        elif self.scaled_images[name].get_width() != self.scale:
+            PROFILER.count('assets.scaled_images.miss')
             self.rescale_image(name, self.scale)
+        else:
+            PROFILER.count('assets.scaled_images.hit')
+        self.in_use.add(name)
         return self.scaled_images[name]
 
     def reset_in_use(self):
@@ -138,17 +176,24 @@ class AssetManager:
         self.in_use.clear()
 
     def scale_up(self):
-        '''Scale up the images by 5.'''
-        self.scale += 5
+        '''Scale up the images by SCALE_STEP.'''
+        self.scale += SCALE_STEP
         self.scale = min(self.scale, MAX_SCALE)
         self.rescale_images()
 
     def scale_down(self):
-        '''Scale down the images by 5.'''
-        self.scale -= 5
+        '''Scale down the images by SCALE_STEP.'''
+        self.scale -= SCALE_STEP
         self.scale = max(self.scale, MIN_SCALE)
         self.rescale_images()
 
+    def set_scale(self, scale: int):
+        '''Jump straight to a scale, rescaling the images once. The scale is clamped.'''
+        scale = max(MIN_SCALE, min(scale, MAX_SCALE))
+        if scale != self.scale:
+            self.scale = scale
+            self.rescale_images()
+
 
 asset_schema = {
     "$schema": "https://json-schema.org/draft/2020-12/schema",
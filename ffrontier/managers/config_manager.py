@@ -1,14 +1,16 @@
 '''Handles configuration file loading, saving, and management.'''
 import configparser
+from dataclasses import fields, make_dataclass
 from enum import Enum
-from typing import Dict
-from pathlib import Path
+from typing import Any, Callable, Dict, List, Set, Tuple
 import logging
+import os
+import time
 
 # 3rd party modules
 
 # Local modules
-from ffrontier.managers.log_manager import LogManager
+from ffrontier.managers.log_manager import LogManager, OVERFLOW_POLICIES
 
 
 # Constants
@@ -21,23 +23,64 @@ class ConfigType(Enum):
     BOOL = 3
 
 
+PYTHON_TYPES = {
+    ConfigType.STRING: str,
+    ConfigType.INT: int,
+    ConfigType.FLOAT: float,
+    ConfigType.BOOL: bool
+}
+
+# A changed option, as (section, option)
+ConfigKey = Tuple[str, str]
+# Called with the new snapshot and the keys that changed
+ConfigCallback = Callable[[Any, Set[ConfigKey]], None]
+
+
 class ConfigManager:
-    '''Class to manage configuration files.'''
+    '''
+    Class to manage configuration files.
+
+    The typed values are parsed once into a frozen snapshot, settings, with a field for each
+    section and an attribute for each option, so reading one is a plain attribute lookup:
+
+        cfg.settings.base.fps
+
+    poll_reload() rebuilds the snapshot when the file changes on disk and tells subscribers
+    which options changed.
+    '''
     config: configparser.ConfigParser
     config_file: str
     defaults: Dict[str, Dict[str, str]]
     types: Dict[str, Dict[str, ConfigType]]
     log_manager: LogManager
+    settings: Any
+    reload_interval: float
+
+    def __init__(self, config_file: str, reload_interval: float = 1.0):
+        '''
+        Initialize the ConfigManager class.
 
-    def __init__(self, config_file: str):
-        '''Initialize the ConfigManager class.'''
+            Args:
+                config_file (str): The path of the configuration file.
+                reload_interval (float): The least seconds between checks of the file's
+                    modification time in poll_reload.
+        '''
         self.config = configparser.ConfigParser()
         self.config_file = config_file
         self.defaults = {}
         self.types = {}
-        self.log_manager = LogManager()
+        self.reload_interval = reload_interval
+        self._subscribers: List[Tuple[ConfigCallback, Set[ConfigKey] | None]] = []
+        self._section_classes: Dict[str, type] = {}
+        self._last_poll = time.monotonic()
+        self._mtime = self._file_mtime()
         self.load_config()
         self.validate_config()
+        self.settings = self.build_snapshot()
+        self.log_manager = LogManager(int(self.get('logging', 'queuesize')),
+                                      str(self.get('logging', 'overflow')),
+                                      int(self.get('logging', 'ringbuffer')),
+                                      flush_interval=float(self.get('logging', 'flushinterval')))
         self.setup_logging()
 
     def load_config(self):
@@ -48,11 +91,22 @@ class ConfigManager:
         '''Save the configuration file.'''
         with open(self.config_file, 'w', encoding='utf-8') as configfile:
             self.config.write(configfile)
+        # Don't reload what was just written
+        self._mtime = self._file_mtime()
+
+    def _file_mtime(self) -> int | None:
+        '''Get the modification time of the configuration file, or None if it is missing.'''
+        try:
+            return os.stat(self.config_file).st_mtime_ns
+        except OSError:
+            return None
 
     def validate_config(self):
         '''Validate the configuration file and assign types and defaults.'''
         self.validate_base_config()
         self.validate_logging_config()
+        self.validate_maps_config()
+        self.validate_profiling_config()
 
     def validate_base_config(self) -> bool:
         '''Validates the base configuration.'''
@@ -64,14 +118,18 @@ class ConfigManager:
             'width': '800',
             'height': '600',
             'title': 'FFrontier',
-            'fps': '60'
+            'fps': '60',
+            'idlefps': '10',
+            'zoomsettlems': '150'
         }
 
         self.types['base'] = {
             'width': ConfigType.INT,
             'height': ConfigType.INT,
             'title': ConfigType.STRING,
-            'fps': ConfigType.INT
+            'fps': ConfigType.INT,
+            'idlefps': ConfigType.INT,
+            'zoomsettlems': ConfigType.INT
         }
 
         cfg = self.config['base']
@@ -85,6 +143,10 @@ class ConfigManager:
             cfg['title'] = 'FFrontier'
         if 'fps' not in cfg:
             cfg['fps'] = '60'
+        if 'idlefps' not in cfg:
+            cfg['idlefps'] = '10'
+        if 'zoomsettlems' not in cfg:
+            cfg['zoomsettlems'] = '150'
 
         return True
 
@@ -101,7 +163,11 @@ class ConfigManager:
             'ailog': 'logs/ai.log',
             'ailoglevel': 'INFO',
             'guilog': 'logs/gui.log',
-            'guiloglevel': 'INFO'
+            'guiloglevel': 'INFO',
+            'queuesize': '10000',
+            'overflow': 'drop_newest',
+            'ringbuffer': '0',
+            'flushinterval': '0.5'
         }
 
         self.types['logging'] = {
@@ -111,7 +177,11 @@ class ConfigManager:
             'ailog': ConfigType.STRING,
             'ailoglevel': ConfigType.STRING,
             'guilog': ConfigType.STRING,
-            'guiloglevel': ConfigType.STRING
+            'guiloglevel': ConfigType.STRING,
+            'queuesize': ConfigType.INT,
+            'overflow': ConfigType.STRING,
+            'ringbuffer': ConfigType.INT,
+            'flushinterval': ConfigType.FLOAT
         }
 
         cfg = self.config['logging']
@@ -120,31 +190,90 @@ class ConfigManager:
         if 'loglevel' not in cfg:
             cfg['loglevel'] = 'INFO'
 
-        # Set up the game logger
+        # Set up the game logger. The log directories are made when the first record is
+        # written, so nothing is created on disk during startup.
         if 'gamelog' not in cfg:
             cfg['gamelog'] = 'logs/game.log'
-        if Path(cfg['gamelog']).parent.is_dir() is False:
-            # Create the directory if it doesn't exist
-            Path(cfg['gamelog']).parent.mkdir(parents=True, exist_ok=True)
         if 'gameloglevel' not in cfg:
             cfg['gameloglevel'] = 'INFO'
 
         # Set up the AI logger
         if 'ailog' not in cfg:
             cfg['ailog'] = 'logs/ai.log'
-        if Path(cfg['ailog']).parent.is_dir() is False:
-            Path(cfg['ailog']).parent.mkdir(parents=True, exist_ok=True)
         if 'ailoglevel' not in cfg:
             cfg['ailoglevel'] = 'INFO'
 
         # Set up the GUI logger
         if 'guilog' not in cfg:
             cfg['guilog'] = 'logs/gui.log'
-        if Path(cfg['guilog']).parent.is_dir() is False:
-            Path(cfg['guilog']).parent.mkdir(parents=True, exist_ok=True)
         if 'guiloglevel' not in cfg:
             cfg['guiloglevel'] = 'INFO'
 
+        # Records wait on a bounded queue for a background thread to write them. overflow is
+        # drop_newest, drop_oldest or block, for when the queue is full.
+        if 'queuesize' not in cfg:
+            cfg['queuesize'] = '10000'
+        if cfg.get('overflow') not in OVERFLOW_POLICIES:
+            cfg['overflow'] = 'drop_newest'
+        if 'ringbuffer' not in cfg:
+            cfg['ringbuffer'] = '0'
+        if 'flushinterval' not in cfg:
+            cfg['flushinterval'] = '0.5'
+
+        return True
+
+    def validate_maps_config(self) -> bool:
+        '''Validates the map loading configuration.'''
+        if 'maps' not in self.config:
+            self.config['maps'] = configparser.SectionProxy(self.config, 'maps')
+
+        # An empty cachedir turns the parsed-map cache off, and 0 loadworkers uses every core
+        self.defaults['maps'] = {
+            'cachedir': 'cache/maps',
+            'loadworkers': '1'
+        }
+
+        self.types['maps'] = {
+            'cachedir': ConfigType.STRING,
+            'loadworkers': ConfigType.INT
+        }
+
+        cfg = self.config['maps']
+
+        if 'cachedir' not in cfg:
+            cfg['cachedir'] = 'cache/maps'
+        if 'loadworkers' not in cfg:
+            cfg['loadworkers'] = '1'
+
+        return True
+
+    def validate_profiling_config(self) -> bool:
+        '''Validates the profiling configuration.'''
+        if 'profiling' not in self.config:
+            self.config['profiling'] = configparser.SectionProxy(self.config, 'profiling')
+
+        # trace records a Chrome trace from startup. F4 toggles recording in game either way.
+        self.defaults['profiling'] = {
+            'trace': 'false',
+            'tracedir': 'logs',
+            'tracebuffer': '200000'
+        }
+
+        self.types['profiling'] = {
+            'trace': ConfigType.BOOL,
+            'tracedir': ConfigType.STRING,
+            'tracebuffer': ConfigType.INT
+        }
+
+        cfg = self.config['profiling']
+
+        if 'trace' not in cfg:
+            cfg['trace'] = 'false'
+        if 'tracedir' not in cfg:
+            cfg['tracedir'] = 'logs'
+        if 'tracebuffer' not in cfg:
+            cfg['tracebuffer'] = '200000'
+
         return True
 
     def get(self, section: str, option: str) -> str | int | float | bool:
@@ -154,6 +283,10 @@ class ConfigManager:
             raise ValueError(f'Section "{section}" not defined.')
         if option not in self.types[section]:
             raise ValueError(f'Option "{option}" not defined in section "{section}".')
+        return getattr(getattr(self.settings, section), option)
+
+    def _parse(self, section: str, option: str) -> str | int | float | bool:
+        '''Parse an option from the configuration file as its type.'''
         # get the option type
         option_type = self.types[section][option]
         # return the correct type depending on the option type
@@ -165,6 +298,114 @@ class ConfigManager:
             return self.config.getboolean(section, option, fallback=self.defaults[section][option])
         return self.config.get(section, option, fallback=self.defaults[section][option])
 
+    def _section_class(self, section: str) -> type:
+        '''Get the frozen dataclass holding a section's options.'''
+        if section not in self._section_classes:
+            self._section_classes[section] = make_dataclass(
+                f'{section.capitalize()}Config',
+                [(option, PYTHON_TYPES[option_type])
+                 for option, option_type in self.types[section].items()],
+                frozen=True, slots=True)
+        return self._section_classes[section]
+
+    def build_snapshot(self) -> Any:
+        '''Parse every option into a new frozen snapshot of the configuration.'''
+        if 'Settings' not in self._section_classes:
+            self._section_classes['Settings'] = make_dataclass(
+                'Settings', [(section, self._section_class(section)) for section in self.types],
+                frozen=True, slots=True)
+        return self._section_classes['Settings'](**{
+            section: self._section_class(section)(**{
+                option: self._parse(section, option) for option in options})
+            for section, options in self.types.items()})
+
+    @staticmethod
+    def changed_keys(old: Any, new: Any) -> Set[ConfigKey]:
+        '''Get the options whose values differ between two snapshots.'''
+        changed = set()
+        for section_field in fields(old):
+            old_section = getattr(old, section_field.name)
+            new_section = getattr(new, section_field.name)
+            for option_field in fields(old_section):
+                if (getattr(old_section, option_field.name) !=
+                        getattr(new_section, option_field.name)):
+                    changed.add((section_field.name, option_field.name))
+        return changed
+
+    def subscribe(self, callback: ConfigCallback,
+                  keys: List[ConfigKey] | None = None) -> None:
+        '''
+        Call back when a reload changes options.
+
+            Args:
+                callback (ConfigCallback): Called with the new snapshot and the changed keys.
+                keys (List[ConfigKey] | None): Only call back for changes to these options, and
+                    only pass these. None is every option.
+        '''
+        self._subscribers.append((callback, set(keys) if keys is not None else None))
+
+    def poll_reload(self) -> Set[ConfigKey]:
+        '''
+        Reload the configuration if the file changed since it was last read. Checks at most
+        once every reload_interval seconds, so it can be called every frame. While the file is
+        missing, such as part way through an editor saving it, the current configuration is
+        kept, and the file is read again once it is back.
+
+            Returns:
+                Set[ConfigKey]: The options that changed.
+        '''
+        now = time.monotonic()
+        if now - self._last_poll < self.reload_interval:
+            return set()
+        self._last_poll = now
+        mtime = self._file_mtime()
+        if mtime is None or mtime == self._mtime:
+            return set()
+        self._mtime = mtime
+        return self.reload()
+
+    def reload(self) -> Set[ConfigKey]:
+        '''
+        Read the configuration file again, swap in a new snapshot and notify subscribers.
+        If the file has an invalid value, the current configuration is kept.
+
+            Returns:
+                Set[ConfigKey]: The options that changed.
+        '''
+        old_config = self.config
+        self.config = configparser.ConfigParser()
+        try:
+            self.load_config()
+            self.validate_config()
+            settings = self.build_snapshot()
+        except (configparser.Error, ValueError) as error:
+            self.config = old_config
+            self.get_logger('game').warning('Not reloading %s: %s', self.config_file, error)
+            return set()
+        changed = self.changed_keys(self.settings, settings)
+        self.settings = settings
+        if not changed:
+            return changed
+        self.get_logger('game').info('Reloaded %s: %s changed', self.config_file,
+                                     ', '.join(sorted(f'{s}.{o}' for s, o in changed)))
+        self._apply_log_levels(changed)
+        for callback, keys in self._subscribers:
+            relevant = changed if keys is None else changed & keys
+            if relevant:
+                callback(settings, relevant)
+        return changed
+
+    def _apply_log_levels(self, changed: Set[ConfigKey]) -> None:
+        '''Set the levels of loggers whose level option changed.'''
+        for name in ('game', 'ai', 'gui'):
+            if ('logging', f'{name}loglevel') not in changed:
+                continue
+            level = getattr(self.settings.logging, f'{name}loglevel')
+            try:
+                self.get_logger(name).setLevel(level)
+            except ValueError:
+                self.get_logger('game').warning('Unknown log level %s for %s', level, name)
+
     def setup_logging(self):
         '''Set up logging based on the configuration.'''
         self.log_manager.setup_logger('game',
@@ -0,0 +1,97 @@
+'''Collects a tick's worth of input events into a single per-frame summary.'''
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Tuple
+
+import pygame
+
+from ffrontier.managers.controls_manager import ControlsManager
+
+
+# Camera commands and how far each one moves the viewport
+CAMERA_MOVES: Dict[str, Tuple[int, int]] = {
+    'camera_up': (0, 10),
+    'camera_down': (0, -10),
+    'camera_left': (10, 0),
+    'camera_right': (-10, 0)
+}
+
+ZOOM_STEPS: Dict[str, int] = {
+    'zoom_in': 1,
+    'zoom_out': -1
+}
+
+
+@dataclass
+class FrameInput:
+    '''Everything that happened to the input devices during one tick'''
+    # The last mouse motion event, with its final position
+    motion: pygame.event.Event | None = None
+    # Summed relative mouse movement while the left button was held
+    drag: Tuple[int, int] = (0, 0)
+    # Summed camera movement from commands
+    camera: Tuple[int, int] = (0, 0)
+    # Net zoom steps from commands
+    zoom: int = 0
+    # Net zoom steps from the mouse wheel, which only apply under the mouse
+    wheel: int = 0
+    # Events that are not coalesced, in the order they arrived
+    events: List[pygame.event.Event] = field(default_factory=list)
+    # Commands other than camera and zoom commands, in the order they arrived
+    commands: List[str] = field(default_factory=list)
+    quit: bool = False
+
+    @property
+    def mouse_pos(self) -> Tuple[int, int] | None:
+        '''Get the final mouse position, if the mouse moved'''
+        return self.motion.pos if self.motion is not None else None
+
+    @property
+    def is_empty(self) -> bool:
+        '''Check if nothing happened this tick'''
+        return self.motion is None and not self.events and not self.commands and not self.quit
+
+
+class InputCoalescer:
+    '''
+    Merges the events of a tick so the game reacts to them once per frame.
+
+    Mouse motion collapses into the final position plus the summed drag, camera commands and
+    zoom steps are summed, and everything else passes through in order. Mouse wheel events
+    pass through for the GUI as well as being counted as zoom steps. A burst of queued
+    motion or key repeat events then costs one hit-test and at most one redraw.
+    '''
+    controls: ControlsManager
+
+    def __init__(self, controls: ControlsManager):
+        self.controls = controls
+
+    def collect(self, events: Iterable[pygame.event.Event]) -> FrameInput:
+        '''Coalesce a tick's events into a FrameInput.'''
+        frame = FrameInput()
+        drag_x, drag_y = 0, 0
+        camera_x, camera_y = 0, 0
+        for event in events:
+            if (event.type == pygame.QUIT or
+                    (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE)):
+                frame.quit = True
+            if event.type == pygame.MOUSEMOTION:
+                frame.motion = event
+                if event.buttons and event.buttons[0]:
+                    drag_x += event.rel[0]
+                    drag_y += event.rel[1]
+                continue
+            frame.events.append(event)
+            if event.type == pygame.MOUSEWHEEL:
+                frame.wheel += 1 if event.y > 0 else -1
+            if event.type in (pygame.KEYDOWN, pygame.KEYUP):
+                command = self.controls.process_event(event)
+                if command in CAMERA_MOVES:
+                    camera_x += CAMERA_MOVES[command][0]
+                    camera_y += CAMERA_MOVES[command][1]
+                elif command in ZOOM_STEPS:
+                    frame.zoom += ZOOM_STEPS[command]
+                elif command is not None:
+                    frame.commands.append(command)
+        frame.drag = (drag_x, drag_y)
+        frame.camera = (camera_x, camera_y)
+        return frame
@@ -1,11 +1,247 @@
 '''Manager that handles setup and retrieval of loggers.'''
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener
+from typing import Deque, Dict, List
+import atexit
 import logging
+import os
+import queue
+import threading
+import time
+import weakref
 
 
-class LogManager:
-    '''Manager that handles setup and retrieval of loggers.'''
+# What to do with a record when the queue is full
+DROP_NEWEST = 'drop_newest'
+DROP_OLDEST = 'drop_oldest'
+BLOCK = 'block'
+OVERFLOW_POLICIES = (DROP_NEWEST, DROP_OLDEST, BLOCK)
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class OverflowQueueHandler(QueueHandler):
+    '''
+    A QueueHandler for a bounded queue that drops records instead of raising when the queue
+    is full, or waits for room if the policy is BLOCK.
+    '''
+    policy: str
+    dropped: int
+    # Records already queued, so one propagating through several set up loggers is queued once
+    queued: 'weakref.WeakSet[logging.LogRecord]'
+
+    def __init__(self, log_queue: queue.Queue, policy: str = DROP_NEWEST):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f'Unknown overflow policy: {policy}')
+        super().__init__(log_queue)
+        self.policy = policy
+        self.dropped = 0
+        self.queued = weakref.WeakSet()
+        self._drop_lock = threading.Lock()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        '''Queue a record, unless it already was on its way up from a child logger.'''
+        # Every set up logger shares this handler, so a record propagating from one logger
+        # to another set up above it reaches here once per logger. The caller holds the
+        # record until propagation ends, and handle() runs emit under the handler's lock
+        if record in self.queued:
+            return
+        self.queued.add(record)
+        super().emit(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        '''Put a record on the queue, applying the overflow policy if it is full.'''
+        if self.policy == BLOCK:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        with self._drop_lock:
+            self.dropped += 1
+            if self.policy == DROP_OLDEST:
+                try:
+                    self.queue.get_nowait()
+                    self.queue.put_nowait(record)
+                except (queue.Empty, queue.Full):
+                    pass
+
+
+class BatchedFileHandler(logging.FileHandler):
+    '''
+    A FileHandler that lets writes collect in the file buffer and flushes every
+    flush_records records, when flush_interval seconds have passed, or when told to.
+
+    The file, and its directory, are only created when the first record is written, which
+    happens on the listener thread rather than during startup.
+    '''
+    flush_records: int
+    flush_interval: float
+
+    def __init__(self, filename: str, flush_records: int = 100, flush_interval: float = 0.5):
+        super().__init__(filename, delay=True)
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def _open(self):
+        '''Open the file, creating its directory if it doesn't exist.'''
+        directory = os.path.dirname(self.baseFilename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return super()._open()
+
+    def flush(self) -> None:
+        '''Called by emit after every record, so only flush once a batch is ready.'''
+        self._pending += 1
+        if (self._pending >= self.flush_records or
+                time.monotonic() - self._last_flush >= self.flush_interval):
+            self.force_flush()
+
+    def force_flush(self) -> None:
+        '''Write out anything buffered.'''
+        if self._pending:
+            super().flush()
+            self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        '''Flush the last batch and close the file.'''
+        self.force_flush()
+        super().close()
+
+
+class RingBufferHandler(logging.Handler):
+    '''Keeps the last capacity formatted records in memory.'''
+    records: Deque[str]
+
+    def __init__(self, capacity: int):
+        super().__init__()
+        self.records = deque(maxlen=capacity)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(self.format(record))
+
+
+class _RoutingHandler(logging.Handler):
+    '''
+    Sends each record to the handlers of its logger and of the set up loggers above it, as
+    propagation would have, and to the shared ones.
+    '''
+
     def __init__(self):
+        super().__init__()
+        self.routes: Dict[str, List[logging.Handler]] = {}
+        self.shared: List[logging.Handler] = []
+        self._resolved: Dict[str, List[logging.Handler]] = {}
+
+    def add_route(self, name: str, handler: logging.Handler) -> None:
+        '''Send the records of a logger and its children to a handler.'''
+        self.routes.setdefault(name, []).append(handler)
+        self._resolved = {}
+
+    def handlers_for(self, name: str) -> List[logging.Handler]:
+        '''Get the handlers a logger's records go to, walking up its dotted name.'''
+        resolved = self._resolved
+        handlers = resolved.get(name)
+        if handlers is None:
+            handlers = []
+            current = name
+            while current:
+                if current in self.routes:
+                    handlers.extend(self.routes[current])
+                    if not logging.getLogger(current).propagate:
+                        break
+                current = current.rpartition('.')[0]
+            resolved[name] = handlers
+        return handlers
+
+    def emit(self, record: logging.LogRecord) -> None:
+        for handler in self.handlers_for(record.name) + self.shared:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def force_flush(self) -> None:
+        '''Flush every batched handler.'''
+        for handlers in self.routes.values():
+            for handler in handlers:
+                if isinstance(handler, BatchedFileHandler):
+                    handler.force_flush()
+
+
+class _FlushingListener(QueueListener):
+    '''A QueueListener that flushes batched handlers whenever the queue goes quiet.'''
+
+    def __init__(self, log_queue: queue.Queue, router: _RoutingHandler, idle_flush: float):
+        super().__init__(log_queue, router)
+        self.router = router
+        self.idle_flush = idle_flush
+
+    def enqueue_sentinel(self) -> None:
+        # Wait for room, since a full queue must not stop the listener from stopping
+        self.queue.put(self._sentinel)
+
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        while True:
+            try:
+                return self.queue.get(block, self.idle_flush if block else None)
+            except queue.Empty:
+                if not block:
+                    raise
+                self.router.force_flush()
+
+
+class LogManager:
+    '''
+    Manager that handles setup and retrieval of loggers.
+
+    Loggers only put records on a bounded queue, so logging never does file I/O on the
+    thread that called it. A background listener routes each record to its logger's file,
+    where writes are flushed in batches. When the queue is full, records are dropped
+    according to the overflow policy rather than stalling the game, unless it is BLOCK.
+    '''
+    loggers: Dict[str, logging.Logger]
+    queue: queue.Queue
+    queue_handler: OverflowQueueHandler
+    ring_buffer: RingBufferHandler | None
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def __init__(self, queue_size: int = 10000, overflow: str = DROP_NEWEST,
+                 ring_size: int = 0, flush_records: int = 100, flush_interval: float = 0.5):
+        '''
+        Initialize the LogManager class.
+
+            Args:
+                queue_size (int): How many records can wait to be written.
+                overflow (str): DROP_NEWEST, DROP_OLDEST or BLOCK, for when the queue is full.
+                ring_size (int): Keep this many recent records in memory. 0 keeps none.
+                flush_records (int): Flush a log file after this many records.
+                flush_interval (float): Flush a log file after this many seconds.
+        '''
         self.loggers = {}
+        self.queue = queue.Queue(queue_size)
+        self.queue_handler = OverflowQueueHandler(self.queue, overflow)
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self._router = _RoutingHandler()
+        self.ring_buffer = None
+        if ring_size > 0:
+            self.ring_buffer = RingBufferHandler(ring_size)
+            self.ring_buffer.setFormatter(logging.Formatter(LOG_FORMAT))
+            self._router.shared.append(self.ring_buffer)
+        self._listener: _FlushingListener | None = None
+
+    @property
+    def dropped(self) -> int:
+        '''Get how many records were dropped because the queue was full.'''
+        return self.queue_handler.dropped
+
+    def recent(self) -> List[str]:
+        '''Get the records in the ring buffer, oldest first.'''
+        return list(self.ring_buffer.records) if self.ring_buffer is not None else []
 
     def get_logger(self, name: str) -> logging.Logger:
         '''Get a logger by name.'''
@@ -19,8 +255,28 @@ class LogManager:
             raise ValueError(f'Logger {name} already exists')
         logger = logging.getLogger(name)
         logger.setLevel(level)
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        file_handler = logging.FileHandler(log_file)
+        formatter = logging.Formatter(LOG_FORMAT)
+        file_handler = BatchedFileHandler(log_file, self.flush_records, self.flush_interval)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        self._router.add_route(name, file_handler)
+        logger.addHandler(self.queue_handler)
         self.loggers[name] = logger
+        self._start()
+
+    def _start(self) -> None:
+        '''Start the background listener if it isn't running.'''
+        if self._listener is None:
+            self._listener = _FlushingListener(self.queue, self._router, self.flush_interval)
+            self._listener.start()
+            atexit.register(self.stop)
+
+    def stop(self) -> None:
+        '''Write out every queued record, stop the listener and close the log files.'''
+        if self._listener is None:
+            return
+        self._listener.stop()
+        self._listener = None
+        atexit.unregister(self.stop)
+        for handlers in self._router.routes.values():
+            for handler in handlers:
+                handler.close()
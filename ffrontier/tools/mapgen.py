@@ -0,0 +1,234 @@
+'''
+Procedural map generator, mainly for producing maps of any size to benchmark against.
+
+Run it as a script to write a map file:
+
+    python -m ffrontier.tools.mapgen out.ffm --radius 500 --seed 42
+'''
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+
+from ffrontier.game.maphandler import encode_config, write_lines_atomic
+from ffrontier.hex import hexgrid
+from ffrontier.utils.parsing import hex_to_rgba, rgba_to_hex
+from ffrontier.utils.validation import compile_schema
+
+
+# Constants
+SHAPES = ('hexagon', 'parallelogram')
+
+# Uses the images from the city asset config so generated maps can be rendered
+DEFAULT_DISTRIBUTION: Dict[str, Any] = {
+    'terrains': [
+        {'layers': [{'image': 'grasslands'}], 'color': '#ffffff', 'weight': 6},
+        {'layers': [{'image': 'grasslands'}, {'image': 'smiley', 'alpha': 160}],
+         'color': '#ffffff', 'weight': 1},
+        {'layers': [], 'color': '#ff000041', 'weight': 2},
+        {'layers': [{'image': 'smiley'}], 'color': '#ff0000', 'weight': 1}
+    ],
+    'borders': [
+        {'border': 0, 'weight': 3},
+        {'border': 1, 'weight': 1}
+    ],
+    'features': [
+        {'name': 'tree', 'chance': 0.3},
+        {'name': 'rock', 'chance': 0.1},
+        {'name': 'farm', 'chance': 0.05}
+    ]
+}
+
+DISTRIBUTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "terrains": {
+            "type": "array",
+            "minItems": 1,
+            "items": {
+                "type": "object",
+                "properties": {
+                    "layers": {
+                        "type": "array",
+                        "items": {"type": "object",
+                                  "properties": {"image": {"type": "string"},
+                                                 "alpha": {"type": "integer"}},
+                                  "required": ["image"]}
+                    },
+                    "color": {"type": "string"},
+                    "weight": {"type": "number"}
+                },
+                "required": ["weight"]
+            }
+        },
+        "borders": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"border": {"type": "integer"}, "weight": {"type": "number"}},
+                "required": ["border", "weight"]
+            }
+        },
+        "features": {
+            "type": "array",
+            "maxItems": 12,
+            "items": {
+                "type": "object",
+                "properties": {"name": {"type": "string"}, "chance": {"type": "number"}},
+                "required": ["name", "chance"]
+            }
+        }
+    },
+    "required": ["terrains"]
+}
+
+
+def shape_coordinates(shape: str, radius: int = 0,
+                      width: int = 0, height: int = 0) -> List[Tuple[int, int]]:
+    '''
+    Get the axial coordinates of a map shape.
+
+        Args:
+            shape: str: 'hexagon' (uses radius) or 'parallelogram' (uses width and height).
+                TileMap only accepts complete hexagons; other shapes are for exercising the
+                loaders on their own.
+            radius: int: The radius of a hexagon.
+            width: int: The number of columns of a parallelogram.
+            height: int: The number of rows of a parallelogram.
+
+        Returns:
+            List[Tuple[int, int]]: The coordinates.
+    '''
+    if shape == 'hexagon':
+        return list(hexgrid.hexagon_coordinates(radius))
+    if shape == 'parallelogram':
+        return list(itertools.product(range(width), range(height)))
+    raise ValueError(f'Unknown map shape: {shape}')
+
+
+def _terrain_fragments(distribution: Dict[str, Any]) -> List[str]:
+    '''Pre-encode the layers and color of each terrain, since they are shared by many tiles.'''
+    fragments = []
+    for terrain in distribution['terrains']:
+        # Round trip the color so invalid colors fail here instead of when loading the map
+        color = rgba_to_hex(hex_to_rgba(terrain.get('color', '#ffffff')))
+        fragments.append(f'"layers": {json.dumps(terrain.get("layers", []))}, '
+                         f'"color": "{color}"')
+    return fragments
+
+
+def _feature_combinations(distribution: Dict[str, Any]) -> Tuple[List[str], List[float]]:
+    '''
+    Turn independent feature chances into the encoded feature list of every combination and
+    its probability, so each tile needs one weighted draw instead of one per feature.
+    '''
+    features = distribution.get('features', [])
+    combos = []
+    weights = []
+    for present in itertools.product((False, True), repeat=len(features)):
+        weight = 1.0
+        names = []
+        for feature, has in zip(features, present):
+            weight *= feature['chance'] if has else 1.0 - feature['chance']
+            if has:
+                names.append(feature['name'])
+        combos.append(json.dumps(names))
+        weights.append(weight)
+    return combos, weights
+
+
+def generate_lines(coordinates: List[Tuple[int, int]],
+                   distribution: Dict[str, Any] | None = None,
+                   seed: int = 0) -> Iterator[str]:
+    '''
+    Generate the tile lines of a map in the .ffm format.
+
+        Args:
+            coordinates: List[Tuple[int, int]]: The tiles to generate.
+            distribution: Dict[str, Any] | None: Weights for terrains (layers and color) and
+                borders, and independent chances for features. See DEFAULT_DISTRIBUTION.
+            seed: int: The random seed. The same seed and inputs give the same map.
+
+        Returns:
+            Iterator[str]: One encoded tile per line.
+    '''
+    if distribution is None:
+        distribution = DEFAULT_DISTRIBUTION
+    compile_schema(DISTRIBUTION_SCHEMA)(distribution)
+    rng = random.Random(seed)
+    count = len(coordinates)
+
+    terrains = rng.choices(_terrain_fragments(distribution),
+                           [terrain['weight'] for terrain in distribution['terrains']], k=count)
+    borders_config = distribution.get('borders') or [{'border': 0, 'weight': 1}]
+    borders = rng.choices([str(border['border']) for border in borders_config],
+                          [border['weight'] for border in borders_config], k=count)
+    combos, weights = _feature_combinations(distribution)
+    features = rng.choices(combos, weights, k=count)
+
+    for (q, r), terrain, border, feature in zip(coordinates, terrains, borders, features):
+        yield (f'{{"coordinates": [{q}, {r}], {terrain}, '
+               f'"features": {feature}, "border": {border}}}')
+
+
+def _write_ffm(path: str, flat: bool, lines: Iterable[str]) -> None:
+    '''Write generated tile lines as an .ffm map.'''
+    write_lines_atomic(path, itertools.chain([encode_config(flat)], lines))
+
+
+# Writers by file extension
+FORMATS: Dict[str, Callable[[str, bool, Iterable[str]], None]] = {
+    '.ffm': _write_ffm
+}
+
+
+# pylint: disable=too-many-arguments
+def generate_map(path: str, shape: str = 'hexagon', radius: int = 10,
+                 width: int = 0, height: int = 0, *, seed: int = 0, flat: bool = True,
+                 distribution: Dict[str, Any] | None = None) -> int:
+    '''
+    Generate a map and write it to path, in the format given by its extension.
+
+        Returns:
+            int: The number of tiles written.
+    '''
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f'Unsupported map format: {extension}')
+    coordinates = shape_coordinates(shape, radius, width, height)
+    FORMATS[extension](path, flat, generate_lines(coordinates, distribution, seed))
+    return len(coordinates)
+
+
+def main(argv: List[str] | None = None) -> int:
+    '''Command line entry point.'''
+    parser = argparse.ArgumentParser(description='Generate a procedural map.')
+    parser.add_argument('output', help='The map file to write (' + ', '.join(FORMATS) + ')')
+    parser.add_argument('--shape', choices=SHAPES, default='hexagon')
+    parser.add_argument('--radius', type=int, default=10, help='Radius of a hexagon map')
+    parser.add_argument('--width', type=int, default=10, help='Width of a parallelogram map')
+    parser.add_argument('--height', type=int, default=10, help='Height of a parallelogram map')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--pointy', action='store_true', help='Use pointy-topped hexes')
+    parser.add_argument('--distribution', help='A JSON file of terrain, border and '
+                        'feature distributions, shaped like DEFAULT_DISTRIBUTION')
+    args = parser.parse_args(argv)
+
+    distribution = None
+    if args.distribution:
+        with open(args.distribution, encoding='utf-8') as file:
+            distribution = json.load(file)
+
+    start = time.perf_counter()
+    count = generate_map(args.output, args.shape, args.radius, args.width, args.height,
+                         seed=args.seed, flat=not args.pointy, distribution=distribution)
+    print(f'Wrote {count} tiles to {args.output} in {time.perf_counter() - start:.2f}s')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+'''
+Headless map renderer, for map previews and render benchmarks on machines without a display.
+
+Run it as a script to render thumbnails of a map, or of every map in a directory:
+
+    python -m ffrontier.tools.render maps/ thumbnails/ --size 256 --workers 4
+'''
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Tuple
+import argparse
+import os
+import sys
+import time
+
+import pygame
+
+from ffrontier.hex import hexgrid
+from ffrontier.hex.canvas import LOD_FULL, HexCanvas
+from ffrontier.hex.tileutils import TileMap
+from ffrontier.managers.asset_manager import AssetManager, MIN_SCALE
+
+
+# Constants
+DEFAULT_ASSETS = 'ffrontier/assets/configs/city_assets.json'
+MAP_EXTENSION = '.ffm'
+# Thumbnails of big maps are rendered in squares this size and shrunk one at a time, so
+# memory use doesn't grow with the map
+CHUNK_SIZE = 2048
+
+
+def init_headless() -> None:
+    '''Set up pygame to render to offscreen surfaces without a display.'''
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    if not pygame.display.get_init():
+        pygame.display.init()
+    if pygame.display.get_surface() is None:
+        # Some surface operations need a mode set, even if nothing is ever shown
+        pygame.display.set_mode((1, 1))
+
+
+def load_canvas(map_file: str, asset_file: str = DEFAULT_ASSETS,
+                scale: int = MIN_SCALE) -> HexCanvas:
+    '''
+    Build the assets, tile map and canvas for a map, ready to render at a scale. Tiles are
+    drawn with their images at any scale, since previews are small but should show the art.
+    '''
+    assets = AssetManager(asset_file, scale)
+    canvas = HexCanvas(assets, TileMap(assets, map_file))
+    # The canvas outline marks the edge of the scrollable area, which means nothing here
+    canvas.show_outline = False
+    canvas.fixed_lod = LOD_FULL
+    return canvas
+
+
+def map_bounds(canvas: HexCanvas) -> pygame.Rect:
+    '''Get the area covered by the map in pixels, relative to the center of tile (0, 0).'''
+    radius = canvas.assets.scale // 2
+    centers = [hexgrid.axial_to_pixel(tile.hex_info, radius)
+               for tile in canvas.tilemap.tiles.values()]
+    left = min(x for x, _ in centers) - radius - 1
+    top = min(y for _, y in centers) - radius - 1
+    right = max(x for x, _ in centers) + radius + 2
+    bottom = max(y for _, y in centers) + radius + 2
+    return pygame.Rect(left, top, right - left, bottom - top)
+
+
+def render_map(canvas: HexCanvas, region: pygame.Rect | None = None) -> pygame.Surface:
+    '''
+    Render a map, or part of it, to a new surface at the canvas's current scale.
+
+        Args:
+            canvas: HexCanvas: The canvas of the map to render.
+            region: pygame.Rect | None: The area to render, in pixels relative to the center
+                of tile (0, 0). The whole map if not given.
+
+        Returns:
+            pygame.Surface: The rendered area.
+    '''
+    if region is None:
+        region = map_bounds(canvas)
+    surface = pygame.Surface(region.size)
+    canvas.vp_pos = (-region.x - canvas.offset[0], -region.y - canvas.offset[1])
+    canvas.draw(surface, region.size)
+    return surface
+
+
+def _chunks(bounds: pygame.Rect) -> Iterator[pygame.Rect]:
+    '''Split an area into squares of at most CHUNK_SIZE.'''
+    for top in range(bounds.top, bounds.bottom, CHUNK_SIZE):
+        for left in range(bounds.left, bounds.right, CHUNK_SIZE):
+            yield pygame.Rect(left, top, min(CHUNK_SIZE, bounds.right - left),
+                              min(CHUNK_SIZE, bounds.bottom - top))
+
+
+def render_thumbnail(canvas: HexCanvas, size: int) -> pygame.Surface:
+    '''Render a whole map shrunk so its longest side is at most size pixels.'''
+    bounds = map_bounds(canvas)
+    factor = size / max(bounds.width, bounds.height)
+    if factor >= 1:
+        return render_map(canvas, bounds)
+    thumbnail = pygame.Surface((max(1, round(bounds.width * factor)),
+                                max(1, round(bounds.height * factor))))
+    for chunk in _chunks(bounds):
+        # Round both edges rather than the size, so neighbouring chunks meet exactly
+        left = round((chunk.left - bounds.left) * factor)
+        top = round((chunk.top - bounds.top) * factor)
+        right = round((chunk.right - bounds.left) * factor)
+        bottom = round((chunk.bottom - bounds.top) * factor)
+        if right > left and bottom > top:
+            thumbnail.blit(pygame.transform.smoothscale(render_map(canvas, chunk),
+                                                        (right - left, bottom - top)),
+                           (left, top))
+    return thumbnail
+
+
+def render_thumbnail_file(job: Tuple[str, str, str, int, int]) -> str:
+    '''Render the thumbnail of one map to a PNG. Runs in a worker process.'''
+    map_file, output, asset_file, scale, size = job
+    init_headless()
+    canvas = load_canvas(map_file, asset_file, scale)
+    pygame.image.save(render_thumbnail(canvas, size), output)
+    return output
+
+
+def find_maps(path: str) -> List[str]:
+    '''Get a map file, or the map files in a directory.'''
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, name) for name in os.listdir(path)
+                      if name.endswith(MAP_EXTENSION))
+    return [path]
+
+
+def main(argv: List[str] | None = None) -> int:
+    '''Command line entry point.'''
+    parser = argparse.ArgumentParser(description='Render map thumbnails without a display.')
+    parser.add_argument('maps', help='A map file or a directory of ' + MAP_EXTENSION + ' maps')
+    parser.add_argument('output', help='The directory to write the PNGs to')
+    parser.add_argument('--assets', default=DEFAULT_ASSETS, help='The asset config to use')
+    parser.add_argument('--scale', type=int, default=MIN_SCALE, help='The scale to render at')
+    parser.add_argument('--size', type=int, default=256,
+                        help='The longest side of a thumbnail in pixels')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Processes to render with, 0 for one per CPU')
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output, exist_ok=True)
+    jobs = [(map_file,
+             os.path.join(args.output, os.path.splitext(os.path.basename(map_file))[0] + '.png'),
+             args.assets, args.scale, args.size)
+            for map_file in find_maps(args.maps)]
+    workers = args.workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    if workers == 1 or len(jobs) <= 1:
+        outputs = [render_thumbnail_file(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(min(workers, len(jobs))) as executor:
+            outputs = list(executor.map(render_thumbnail_file, jobs))
+    for output in outputs:
+        print(output)
+    print(f'Rendered {len(outputs)} thumbnails in {time.perf_counter() - start:.2f}s')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
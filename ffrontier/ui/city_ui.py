@@ -1,11 +1,22 @@
 '''This file contains the necessary classes to manage the UI in city management mode.'''
-from typing import Dict
+from typing import TYPE_CHECKING, Dict, List
 import pygame
 import pygame_gui
 
 from ffrontier.managers.ui_manager import UIVariableManager
-from ffrontier.game.gamestate import GameState
 from ffrontier.hex.canvas import HexCanvas
+from ffrontier.managers.input_manager import FrameInput
+from ffrontier.ui.minimap import Minimap
+from ffrontier.utils.profiling import PROFILER
+
+if TYPE_CHECKING:
+    # Only for annotations. The game state pulls in NumPy, which isn't needed to draw the UI
+    from ffrontier.game.gamestate import GameState
+
+
+# Keep pushing the panel to the display for this many frames after it was interacted with,
+# so pygame_gui's hover transitions finish drawing
+PANEL_SETTLE_FRAMES = 30
 
 
 class CityUIPanel:
@@ -14,14 +25,22 @@ class CityUIPanel:
     panel: pygame_gui.elements.UIPanel
     buttons: Dict[str, pygame_gui.elements.UIButton]
     info_panel: pygame_gui.elements.UITextBox
+    info_text: str
+    minimap_rect: pygame.Rect
 
     def __init__(self, manager: pygame_gui.UIManager, panel_rect: pygame.Rect):
         self.manager = manager
+        self.info_text = 'Info Panel'
         self.panel = pygame_gui.elements.UIPanel(relative_rect=panel_rect, manager=self.manager)
         self.buttons = {}
+        # The minimap takes the bottom of the panel, relative to the panel
+        minimap_size = min(panel_rect.width - 20, panel_rect.height // 3)
+        self.minimap_rect = pygame.Rect((10, panel_rect.height - 10 - minimap_size),
+                                        (panel_rect.width - 20, minimap_size))
         self.info_panel = pygame_gui.elements.UITextBox(
-            html_text='Info Panel',
-            relative_rect=pygame.Rect((10, 70), (panel_rect.width - 20, panel_rect.height - 80)),
+            html_text=self.info_text,
+            relative_rect=pygame.Rect((10, 70), (panel_rect.width - 20,
+                                                 self.minimap_rect.top - 80)),
             manager=self.manager,
             container=self.panel
         )
@@ -38,9 +57,14 @@ class CityUIPanel:
         )
         self.buttons['button'] = button
 
-    def update_info_panel(self, text: str) -> None:
-        '''Update the info panel with new text.'''
+    def update_info_panel(self, text: str) -> bool:
+        '''Update the info panel with new text. Returns True if the text changed.'''
+        # Setting the text re-lays out the whole text box, so skip it when nothing changed
+        if text == self.info_text:
+            return False
+        self.info_text = text
         self.info_panel.set_text(text)
+        return True
 
     def handle_event(self, event: pygame.event.Event) -> None:
         '''Handle events related to the panel.'''
@@ -59,6 +83,7 @@ class CityUI:
     viewport: pygame.Surface
     ui_panel: CityUIPanel
     canvas: HexCanvas
+    minimap: Minimap
 
     def __init__(self, manager: pygame_gui.UIManager,
                  ui_manager: UIVariableManager,
@@ -72,39 +97,121 @@ class CityUI:
                                           self.ui_manager.screen_size[1]))
         self.ui_panel = CityUIPanel(manager=self.manager, panel_rect=self.ui_panel_rect)
         self.canvas = canvas
-        self.viewport = pygame.Surface(canvas.max_size)
-        self.canvas.vp_pos = (self.viewport_rect.width // 2 - self.viewport.get_width() // 2,
-                              self.viewport_rect.height // 2 - self.viewport.get_height() // 2)
-
-    def handle_event(self, event: pygame.event.Event,
-                     game_state: GameState) -> None:
-        '''Handle events for the city management UI.'''
-        game_state.handle_event(event)
-        self.ui_panel.handle_event(event)
-
-        # rel = pygame.mouse.get_rel()
-        # adj_pos = (pygame.mouse.get_pos()[0] + rel[0],
-        #            pygame.mouse.get_pos()[1] + rel[1])
-
-        if self.viewport_rect.collidepoint(pygame.mouse.get_pos()):
-            self.canvas.handle_event(event, self.viewport, self.viewport_rect.size)
-        else:
-            self.canvas.highlighted_tile = None
-            self.canvas.is_dragging = False
-
-    def handle_command(self, command: str, game_state: GameState) -> None:
+        # The canvas draws the visible part of the map straight onto a viewport-sized surface
+        self.viewport = pygame.Surface(self.viewport_rect.size)
+        self.canvas.vp_pos = (self.viewport_rect.width // 2 - canvas.max_size[0] // 2,
+                              self.viewport_rect.height // 2 - canvas.max_size[1] // 2)
+        self.minimap = Minimap(canvas, self.ui_panel.minimap_rect.move(self.ui_panel_rect.topleft),
+                               self.viewport_rect.size)
+        # Nothing is on the screen yet, so the first frame updates all of it
+        self.full_redraw = True
+        self.panel_frames = 0
+
+    def apply_input(self, frame: FrameInput, game_state: 'GameState') -> None:
+        '''
+        Apply a tick's coalesced input: pass-through events in order, then one combined camera
+        move, one zoom and one hit-test for the final mouse position.
+        '''
+        for event in frame.events:
+            game_state.handle_event(event)
+            self.ui_panel.handle_event(event)
+            self._track_screen_event(event)
+            if self.minimap.handle_event(event):
+                continue
+            if (event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP) and
+                    self.viewport_rect.collidepoint(event.pos)):
+                self.canvas.handle_event(event, self.viewport_rect.size)
+        for command in frame.commands:
+            self.handle_command(command, game_state)
+
+        size = self.viewport_rect.size
+        delta = frame.camera
+        if self.canvas.is_dragging:
+            delta = (delta[0] + frame.drag[0], delta[1] + frame.drag[1])
+        self.canvas.pan(delta, size)
+        zoom = frame.zoom
+        mouse_pos = frame.mouse_pos if frame.mouse_pos is not None else pygame.mouse.get_pos()
+        if self.viewport_rect.collidepoint(mouse_pos):
+            zoom += frame.wheel
+        self.canvas.zoom(zoom)
+
+        if frame.motion is not None:
+            self._track_screen_event(frame.motion)
+            self.minimap.handle_event(frame.motion)
+            if not self.viewport_rect.collidepoint(mouse_pos):
+                self.canvas.highlighted_tile = None
+                self.canvas.is_dragging = False
+            elif not self.canvas.is_dragging:
+                self.canvas.hover(mouse_pos)
+
+    def handle_command(self, command: str, game_state: 'GameState') -> None:
         '''Handle commands for the city management UI.'''
-        self.canvas.handle_command(command, self.viewport, self.viewport_rect.size)
+        self.canvas.handle_command(command, self.viewport_rect.size)
         game_state.get_turn()  # This is just a placeholder for now
 
-    def draw(self, surface: pygame.Surface):
-        '''Draw the city management UI.'''
-        surface.fill((0, 0, 0, 0), self.viewport_rect)
-        self.canvas.draw(self.viewport, self.viewport_rect.size)
-        # Place the viewport surface centered on the rect
-        surface.blit(self.viewport, self.canvas.vp_pos)
+    def _track_screen_event(self, event: pygame.event.Event) -> None:
+        '''Note events that mean more of the screen has to be pushed to the display.'''
+        if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED):
+            self.full_redraw = True
+        if self._touches_panel(event):
+            self.panel_frames = PANEL_SETTLE_FRAMES
+
+    def _touches_panel(self, event: pygame.event.Event) -> bool:
+        '''Check if an event could change how the panel looks.'''
+        if hasattr(event, 'ui_element'):
+            return True
+        if not hasattr(event, 'pos'):
+            return False
+        if self.ui_panel_rect.collidepoint(event.pos):
+            return True
+        # Leaving the panel un-hovers its buttons
+        rel = getattr(event, 'rel', (0, 0))
+        return self.ui_panel_rect.collidepoint(event.pos[0] - rel[0], event.pos[1] - rel[1])
+
+    @property
+    def needs_redraw(self) -> bool:
+        '''Check if the city view has changed since it was last drawn.'''
+        return (self.full_redraw or self.panel_frames > 0 or self.canvas.has_updates or
+                self.minimap.has_updates)
+
+    def draw(self, surface: pygame.Surface) -> List[pygame.Rect]:
+        '''
+        Draw the city management UI.
+
+            Args:
+                surface (pygame.Surface): The screen surface.
+
+            Returns:
+                List[pygame.Rect]: The areas of the screen that changed, for
+                pygame.display.update.
+        '''
+        rects = []
+        canvas_rects = self.canvas.render(self.viewport, self.viewport_rect.size)
+        if self.full_redraw:
+            canvas_rects = [self.viewport.get_rect()]
+        for rect in canvas_rects:
+            screen_rect = rect.move(self.viewport_rect.topleft)
+            surface.blit(self.viewport, screen_rect.topleft, rect)
+            rects.append(screen_rect)
+
         if self.canvas.highlighted_tile is not None:
-            self.ui_panel.update_info_panel(str(self.canvas.highlighted_tile))
+            text = str(self.canvas.highlighted_tile)
         else:
-            self.ui_panel.update_info_panel('No tile selected')
-        self.manager.draw_ui(surface)
+            text = 'No tile selected'
+        if self.ui_panel.update_info_panel(text):
+            # The text box finishes rebuilding on the next manager update
+            self.panel_frames = max(self.panel_frames, 2)
+        if self.panel_frames > 0:
+            self.panel_frames -= 1
+            rects.append(self.ui_panel_rect.copy())
+        if self.minimap.update():
+            rects.append(self.minimap.rect.copy())
+        with PROFILER.span('gui.draw'):
+            self.manager.draw_ui(surface)
+        # The panel is drawn over the whole side of the screen, so the minimap goes on top
+        self.minimap.draw(surface)
+
+        if self.full_redraw:
+            self.full_redraw = False
+            return [surface.get_rect()]
+        return rects
@@ -0,0 +1,159 @@
+'''A small overview of the whole map, kept up to date from the tile change journal.'''
+from typing import Tuple
+import math
+
+import pygame
+
+from ffrontier.hex.canvas import HexCanvas
+
+
+# The largest a hex is drawn on the minimap, in pixels
+MAX_CELL = 4
+VIEW_COLOR = (255, 255, 255)
+
+
+class Minimap:
+    '''
+    Shows every tile of the map as a small block of its dominant color, with the area
+    visible in the viewport outlined.
+
+    Tiles are laid out in offset rows and columns, so a tile is one rectangle on the
+    minimap. The image is drawn once and then only the tiles the change journal reports are
+    painted again, so keeping it current costs the same on any size of map. On maps too big
+    for one pixel per hex, several tiles share a pixel and the last one drawn shows.
+    '''
+    canvas: HexCanvas
+    rect: pygame.Rect
+    view_size: Tuple[int, int]
+    image: pygame.Surface
+    cell: float
+    flat: bool
+    min_col: int
+    min_row: int
+    view_rect: pygame.Rect | None
+    dragging: bool
+    _journal_name: str
+
+    def __init__(self, canvas: HexCanvas, rect: pygame.Rect, view_size: Tuple[int, int]):
+        '''
+        Initialize the Minimap class.
+
+            Args:
+                canvas (HexCanvas): The canvas showing the map.
+                rect (pygame.Rect): Where the minimap goes on the screen.
+                view_size (Tuple[int, int]): The size of the viewport the canvas is shown in.
+        '''
+        self.canvas = canvas
+        self.rect = rect
+        self.view_size = view_size
+        tiles = canvas.tilemap.tiles
+        self.flat = next(iter(tiles.values())).hex_info.flat
+        cols, rows = zip(*(self._offset(coord) for coord in tiles))
+        self.min_col, self.min_row = min(cols), min(rows)
+        self.cell = min(MAX_CELL, rect.width / (max(cols) - self.min_col + 1),
+                        rect.height / (max(rows) - self.min_row + 1))
+        self.image = pygame.Surface(rect.size)
+        self.view_rect = None
+        self.dragging = False
+        self._journal_name = canvas.tilemap.journal.subscribe_unique('minimap')
+        for coord in canvas.tilemap.tiles:
+            self._draw_tile(coord)
+
+    def _offset(self, coordinates: Tuple[int, int]) -> Tuple[int, int]:
+        '''Convert axial coordinates to offset columns and rows'''
+        q, r = coordinates
+        if self.flat:
+            return q, r + (q - (q & 1)) // 2
+        return q + (r - (r & 1)) // 2, r
+
+    def _draw_tile(self, coordinates: Tuple[int, int]) -> None:
+        '''Paint one tile onto the minimap image'''
+        col, row = self._offset(coordinates)
+        left = math.floor((col - self.min_col) * self.cell)
+        top = math.floor((row - self.min_row) * self.cell)
+        right = max(left + 1, math.floor((col - self.min_col + 1) * self.cell))
+        bottom = max(top + 1, math.floor((row - self.min_row + 1) * self.cell))
+        self.image.fill(self.canvas.tilemap.tiles[coordinates].dominant_color(),
+                        (left, top, right - left, bottom - top))
+
+    def _unit(self) -> Tuple[float, float]:
+        '''Get the distance in canvas pixels between neighbouring columns and rows'''
+        radius = self.canvas.assets.scale // 2
+        if self.flat:
+            return radius * 1.5, radius * math.sqrt(3)
+        return radius * math.sqrt(3), radius * 1.5
+
+    def to_minimap(self, point: Tuple[float, float]) -> Tuple[float, float]:
+        '''Convert a point on the map, in pixels from the center of tile (0, 0), to the minimap'''
+        unit_x, unit_y = self._unit()
+        return ((point[0] / unit_x - self.min_col + 0.5) * self.cell,
+                (point[1] / unit_y - self.min_row + 0.5) * self.cell)
+
+    def to_map(self, point: Tuple[float, float]) -> Tuple[float, float]:
+        '''Convert a point on the minimap to the map, in pixels from the center of tile (0, 0)'''
+        unit_x, unit_y = self._unit()
+        return ((point[0] / self.cell + self.min_col - 0.5) * unit_x,
+                (point[1] / self.cell + self.min_row - 0.5) * unit_y)
+
+    def _visible_rect(self) -> pygame.Rect:
+        '''Get the area of the minimap shown in the viewport'''
+        origin = self.canvas.origin
+        size = self.view_size
+        left, top = self.to_minimap((-origin[0], -origin[1]))
+        right, bottom = self.to_minimap((size[0] - origin[0], size[1] - origin[1]))
+        return pygame.Rect(round(left), round(top),
+                           max(1, round(right - left)), max(1, round(bottom - top)))
+
+    @property
+    def has_updates(self) -> bool:
+        '''Check if the minimap looks different than when it was last updated'''
+        return (self.canvas.tilemap.journal.has_changes(self._journal_name) or
+                self._visible_rect() != self.view_rect)
+
+    def update(self) -> bool:
+        '''Repaint changed tiles and move the view outline. Returns True if anything changed.'''
+        changed = False
+        for coord in self.canvas.tilemap.journal.drain(self._journal_name):
+            if coord in self.canvas.tilemap.tiles:
+                self._draw_tile(coord)
+                changed = True
+        view_rect = self._visible_rect()
+        if view_rect != self.view_rect:
+            self.view_rect = view_rect
+            changed = True
+        return changed
+
+    def draw(self, surface: pygame.Surface) -> None:
+        '''Draw the minimap and the view outline onto the screen'''
+        surface.blit(self.image, self.rect.topleft)
+        if self.view_rect is not None:
+            clip = surface.get_clip()
+            surface.set_clip(self.rect)
+            pygame.draw.rect(surface, VIEW_COLOR, self.view_rect.move(self.rect.topleft), 1)
+            surface.set_clip(clip)
+
+    def jump_to(self, pos: Tuple[int, int]) -> None:
+        '''Center the viewport on the map under a screen position on the minimap'''
+        self.canvas.center_on(self.to_map((pos[0] - self.rect.x, pos[1] - self.rect.y)),
+                              self.view_size)
+
+    def handle_event(self, event: pygame.event.Event) -> bool:
+        '''
+        Jump the camera on clicks and drags on the minimap.
+
+            Returns:
+                bool: True if the minimap used the event.
+        '''
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            if self.rect.collidepoint(event.pos):
+                self.dragging = True
+                self.jump_to(event.pos)
+                return True
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+            was_dragging = self.dragging
+            self.dragging = False
+            return was_dragging
+        elif event.type == pygame.MOUSEMOTION and self.dragging:
+            self.jump_to(event.pos)
+            return True
+        return False
@@ -0,0 +1,77 @@
+'''An in-game overlay showing what the profiler has measured.'''
+from typing import List
+
+import pygame
+
+from ffrontier.utils.profiling import Profiler
+
+
+# How often the overlay text is rebuilt, so reading it doesn't cost a frame's worth of fonts
+REFRESH_MS = 250
+PADDING = 4
+TEXT_COLOR = (255, 255, 255)
+# Opaque, since the screen under the overlay isn't redrawn every frame
+BACKGROUND = (0, 0, 0)
+
+
+class ProfilerOverlay:
+    '''
+    Shows frame time percentiles, timers, counters and cache hit rates in the corner of the
+    screen. Showing it switches the profiler on and hiding it switches it back off.
+    '''
+    profiler: Profiler
+    visible: bool
+    position: pygame.Vector2
+    image: pygame.Surface | None
+    rect: pygame.Rect
+
+    def __init__(self, profiler: Profiler, position=(4, 4),
+                 font: pygame.font.Font | None = None):
+        self.profiler = profiler
+        self.visible = False
+        self.position = pygame.Vector2(position)
+        self.font = font
+        self.image = None
+        self.rect = pygame.Rect(position, (0, 0))
+        self._refreshed = -REFRESH_MS
+
+    def toggle(self) -> None:
+        '''Show or hide the overlay, switching the profiler with it.'''
+        self.visible = not self.visible
+        self.profiler.set_enabled(self.visible)
+        self.image = None
+        self.rect = pygame.Rect(self.rect.topleft, (0, 0))
+
+    def _render(self) -> pygame.Surface:
+        '''Draw the profiler summary onto a new surface.'''
+        if self.font is None:
+            self.font = pygame.font.Font(None, 18)
+        lines: List[pygame.Surface] = [
+            self.font.render(f'{label}: {value}', True, TEXT_COLOR)
+            for label, value in self.profiler.summary()]
+        # Never shrink while shown, so the last frame's overlay is always covered
+        width = max(max(line.get_width() for line in lines) + PADDING * 2, self.rect.width)
+        height = max(sum(line.get_height() for line in lines) + PADDING * 2, self.rect.height)
+        image = pygame.Surface((width, height))
+        image.fill(BACKGROUND)
+        y = PADDING
+        for line in lines:
+            image.blit(line, (PADDING, y))
+            y += line.get_height()
+        return image
+
+    def draw(self, surface: pygame.Surface, now: int | None = None) -> List[pygame.Rect]:
+        '''
+        Draw the overlay onto the screen.
+
+            Returns:
+                List[pygame.Rect]: The area of the screen the overlay covered.
+        '''
+        if not self.visible:
+            return []
+        now = pygame.time.get_ticks() if now is None else now
+        if self.image is None or now - self._refreshed >= REFRESH_MS:
+            self.image = self._render()
+            self._refreshed = now
+        self.rect = surface.blit(self.image, self.position)
+        return [self.rect.copy()]
@@ -0,0 +1,81 @@
+'''Decides when the main loop needs to render a frame and how fast it should tick.'''
+from typing import Callable, Set
+
+import pygame
+
+
+# Invalidation sources
+INPUT = 'input'
+ZOOM = 'zoom'
+SIMULATION = 'simulation'
+UI = 'ui'
+CANVAS = 'canvas'
+
+
+class FrameScheduler:
+    '''
+    Tracks what has invalidated the screen and throttles the main loop when nothing has.
+
+    Something being invalidated marks the next frame dirty and keeps the loop at the full
+    frame rate for a short settle period afterwards, so hover effects and other follow-up
+    changes in pygame_gui still get drawn. Once that has passed with nothing new, the loop
+    drops to the idle rate and stops rendering.
+    '''
+    fps: int
+    idle_fps: int
+    settle_ms: int
+    dirty: Set[str]
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def __init__(self, fps: int = 60, idle_fps: int = 10, settle_ms: int = 250,
+                 clock: pygame.time.Clock | None = None,
+                 time_source: Callable[[], int] = pygame.time.get_ticks):
+        '''
+        Initialize the FrameScheduler class.
+
+            Args:
+                fps (int): The frame rate while something is changing.
+                idle_fps (int): The rate at which the loop polls for events when idle.
+                settle_ms (int): How long to stay at the full frame rate after a change.
+                clock (pygame.time.Clock | None): The clock to tick. Created if not given.
+                time_source (Callable[[], int]): Returns the current time in milliseconds.
+        '''
+        self.fps = fps
+        self.idle_fps = idle_fps
+        self.settle_ms = settle_ms
+        self.clock = clock if clock is not None else pygame.time.Clock()
+        self.time_source = time_source
+        # Start dirty so the first frame is drawn
+        self.dirty = {UI}
+        self._last_change = time_source()
+
+    def invalidate(self, source: str = UI) -> None:
+        '''Mark the screen as needing a redraw because of the given source.'''
+        self.dirty.add(source)
+        self._last_change = self.time_source()
+
+    @property
+    def is_active(self) -> bool:
+        '''Check if something changed recently enough to run at the full frame rate.'''
+        return bool(self.dirty) or self.time_source() - self._last_change < self.settle_ms
+
+    def should_render(self) -> bool:
+        '''Check if a frame should be rendered this tick.'''
+        return self.is_active
+
+    def consume(self) -> Set[str]:
+        '''Return the sources that invalidated this frame and clear them.'''
+        dirty = self.dirty
+        self.dirty = set()
+        return dirty
+
+    def set_rates(self, fps: int | None = None, idle_fps: int | None = None) -> None:
+        '''Change the active and idle frame rates.'''
+        if fps is not None:
+            self.fps = fps
+        if idle_fps is not None:
+            self.idle_fps = idle_fps
+
+    def tick(self) -> float:
+        '''Wait for the next tick and return the seconds since the previous one.'''
+        return self.clock.tick(self.fps if self.is_active else self.idle_fps) / 1000.0
@@ -19,3 +19,12 @@ def hex_to_rgba(hex_color: str) -> Tuple[int, int, int, int]:
     else:
         r, g, b, a = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4, 6))
     return (r, g, b, a)
+
+
+def rgba_to_hex(color: Tuple[int, int, int, int]) -> str:
+    '''Convert an RGBA color to a hex string, leaving off the alpha when it is opaque.'''
+    if len(color) not in (3, 4) or not all(0 <= c <= 255 for c in color):
+        raise ValueError(f'Invalid RGBA color: {color}')
+    if len(color) == 3 or color[3] == 255:
+        return '#{:02x}{:02x}{:02x}'.format(*color[:3])
+    return '#{:02x}{:02x}{:02x}{:02x}'.format(*color)
@@ -0,0 +1,277 @@
+'''
+Timers and counters for finding where a frame's time goes.
+
+Instrumented code uses the shared PROFILER:
+
+    with PROFILER.span('canvas.draw'):
+        ...
+    PROFILER.count('tiles.drawn')
+
+While the profiler is disabled, span() hands back a shared do-nothing context manager and
+count() returns straight away, so instrumentation can stay in hot paths.
+
+Spans can also be recorded to a Chrome trace event file, which chrome://tracing or Perfetto
+can show as a timeline.
+'''
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Tuple, TypeVar
+import functools
+import json
+import os
+import threading
+import time
+
+
+# How many frames the statistics cover
+DEFAULT_WINDOW = 120
+# How many spans a trace keeps before dropping the oldest
+DEFAULT_TRACE_SIZE = 200_000
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+
+class _NullSpan:
+    '''A span that records nothing, used while the profiler is off'''
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    '''Times a block and adds it to the profiler'''
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler: 'Profiler', name: str):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.profiler.record(self.name, self.start, time.perf_counter_ns())
+
+
+class Profiler:
+    '''
+    Collects timers and counters per frame, and keeps a window of recent frames to report
+    averages and frame time percentiles over.
+
+    Timers are the total time spent in spans of a name during a frame. Counters named
+    '<cache>.hit' and '<cache>.miss' are reported together as a hit rate.
+
+    Collecting statistics and tracing are switched separately, and the profiler is enabled
+    while either is on. A trace is a bounded buffer of spans, so a long session keeps its
+    most recent stretch instead of growing without limit.
+    '''
+    enabled: bool
+    collecting: bool
+    tracing: bool
+    trace: Deque[Tuple[str, int, int, int]]
+    window: int
+    frame_times: Deque[float]
+    frame_timers: Deque[Dict[str, float]]
+    frame_counters: Deque[Dict[str, int]]
+    timers: Dict[str, float]
+    counters: Dict[str, int]
+
+    def __init__(self, window: int = DEFAULT_WINDOW, trace_size: int = DEFAULT_TRACE_SIZE):
+        self.enabled = False
+        self.collecting = False
+        self.tracing = False
+        self.trace = deque(maxlen=trace_size)
+        self.window = window
+        self.frame_times = deque(maxlen=window)
+        self.frame_timers = deque(maxlen=window)
+        self.frame_counters = deque(maxlen=window)
+        self.timers = {}
+        self.counters = {}
+        self._frame_start: int | None = None
+
+    def set_enabled(self, enabled: bool) -> None:
+        '''Switch collecting statistics on or off. Switching it on starts from empty.'''
+        if enabled and not self.collecting:
+            self.reset()
+        self.collecting = enabled
+        self.enabled = self.collecting or self.tracing
+
+    def start_trace(self, size: int | None = None) -> None:
+        '''Start recording spans for a trace, optionally with a new buffer size.'''
+        if size is not None and size != self.trace.maxlen:
+            self.trace = deque(maxlen=size)
+        self.trace.clear()
+        self.tracing = True
+        self.enabled = True
+
+    def stop_trace(self) -> None:
+        '''Stop recording spans. The recorded ones are kept until the next trace starts.'''
+        self.tracing = False
+        self.enabled = self.collecting
+
+    def export_trace(self, path: str) -> int:
+        '''
+        Write the recorded spans as Chrome trace events ("X" complete events).
+
+            Returns:
+                int: The number of events written.
+        '''
+        pid = os.getpid()
+        events = [{'name': name, 'cat': name.split('.', 1)[0], 'ph': 'X',
+                   'ts': start / 1000, 'dur': duration / 1000, 'pid': pid, 'tid': tid}
+                  for name, start, duration, tid in self.trace]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+        return len(events)
+
+    @staticmethod
+    def trace_file(directory: str) -> str:
+        '''
+        Get a timestamped path for a new trace in a directory. Traces saved within the same
+        millisecond, like a hotkey save followed by the one on exit, are numbered apart.
+        '''
+        now = time.time()
+        stem = os.path.join(directory, time.strftime('trace-%Y%m%d-%H%M%S', time.localtime(now)) +
+                            f'{int(now * 1000) % 1000:03d}')
+        path = stem + '.json'
+        number = 1
+        while os.path.exists(path):
+            path = f'{stem}-{number}.json'
+            number += 1
+        return path
+
+    def reset(self) -> None:
+        '''Forget everything collected so far.'''
+        self.frame_times.clear()
+        self.frame_timers.clear()
+        self.frame_counters.clear()
+        self.timers = {}
+        self.counters = {}
+        self._frame_start = None
+
+    def span(self, name: str) -> Any:
+        '''Get a context manager that times the block it wraps under name.'''
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def timed(self, name: str) -> Callable[[F], F]:
+        '''Decorate a function so every call is timed under name.'''
+        def decorator(func: F) -> F:
+            @functools.wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter_ns()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, start, time.perf_counter_ns())
+            return wrapper  # type: ignore[return-value]
+        return decorator
+
+    def count(self, name: str, amount: int = 1) -> None:
+        '''Add to a counter for the current frame.'''
+        if not self.collecting:
+            return
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record(self, name: str, start_ns: int, end_ns: int) -> None:
+        '''Add a finished span to the current frame's timers and the trace.'''
+        if self.collecting:
+            self.timers[name] = self.timers.get(name, 0.0) + (end_ns - start_ns) / 1e6
+        if self.tracing:
+            self.trace.append((name, start_ns, end_ns - start_ns, threading.get_ident()))
+
+    def begin_frame(self) -> None:
+        '''Mark the start of a frame's work.'''
+        if self.enabled:
+            self._frame_start = time.perf_counter_ns()
+
+    def end_frame(self) -> None:
+        '''Mark the end of a frame's work and move its timers and counters into the window.'''
+        if not self.enabled or self._frame_start is None:
+            return
+        end = time.perf_counter_ns()
+        if self.tracing:
+            self.trace.append(('frame', self._frame_start, end - self._frame_start,
+                               threading.get_ident()))
+        if self.collecting:
+            self.frame_times.append((end - self._frame_start) / 1e6)
+            self.frame_timers.append(self.timers)
+            self.frame_counters.append(self.counters)
+            self.timers = {}
+            self.counters = {}
+        self._frame_start = None
+
+    def percentiles(self, ranks: Iterable[int] = (50, 95, 99)) -> Dict[int, float]:
+        '''Get frame time percentiles in milliseconds, using the nearest rank.'''
+        times = sorted(self.frame_times)
+        if not times:
+            return {rank: 0.0 for rank in ranks}
+        return {rank: times[min(len(times) - 1, max(0, -(-rank * len(times) // 100) - 1))]
+                for rank in ranks}
+
+    def timer_averages(self) -> Dict[str, float]:
+        '''Get the average milliseconds per frame spent in each timer.'''
+        return _averages(self.frame_timers)
+
+    def counter_averages(self) -> Dict[str, float]:
+        '''Get the average of each counter per frame.'''
+        return _averages(self.frame_counters)
+
+    def hit_rates(self) -> Dict[str, float]:
+        '''Get the hit rate of every cache with hit and miss counters, over the window.'''
+        totals: Dict[str, int] = {}
+        for counters in self.frame_counters:
+            for name, value in counters.items():
+                totals[name] = totals.get(name, 0) + value
+        rates = {}
+        for name in totals:
+            if not name.endswith('.hit'):
+                continue
+            cache = name[:-len('.hit')]
+            lookups = totals[name] + totals.get(cache + '.miss', 0)
+            rates[cache] = totals[name] / lookups if lookups else 0.0
+        for name in totals:
+            cache = name[:-len('.miss')]
+            if name.endswith('.miss') and cache not in rates:
+                rates[cache] = 0.0
+        return rates
+
+    def summary(self) -> List[Tuple[str, str]]:
+        '''Get labelled lines describing the window, for display.'''
+        lines = [('frame ms', ' '.join(f'p{rank} {value:.1f}'
+                                       for rank, value in self.percentiles().items()))]
+        for name, value in sorted(self.timer_averages().items(), key=lambda item: -item[1]):
+            lines.append((name, f'{value:.2f} ms'))
+        hit_counters = {name for name in self.counter_averages()
+                        if name.endswith('.hit') or name.endswith('.miss')}
+        for name, value in sorted(self.counter_averages().items()):
+            if name not in hit_counters:
+                lines.append((name, f'{value:.0f}'))
+        for cache, rate in sorted(self.hit_rates().items()):
+            lines.append((cache, f'{rate:.0%} hits'))
+        return lines
+
+
+def _averages(frames: Deque[Dict[str, Any]]) -> Dict[str, float]:
+    '''Average values by name over a window of frames, counting frames without a name as 0.'''
+    totals: Dict[str, float] = {}
+    for frame in frames:
+        for name, value in frame.items():
+            totals[name] = totals.get(name, 0.0) + value
+    return {name: total / len(frames) for name, total in totals.items()} if frames else {}
+
+
+# The profiler the game is instrumented with
+PROFILER = Profiler()
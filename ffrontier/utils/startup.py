@@ -0,0 +1,49 @@
+'''Timings of the phases of starting the game, for --profile-startup.'''
+from typing import Iterator, List, TextIO, Tuple
+import contextlib
+import sys
+import time
+
+
+class StartupTimer:
+    '''
+    Records how long each named phase of startup took, measured from when the timer was
+    made, so the report also shows when the first frame reached the screen.
+    '''
+    started: float
+    phases: List[Tuple[str, float, float]]
+
+    def __init__(self, started: float | None = None):
+        self.started = time.perf_counter() if started is None else started
+        self.phases = []
+        self._last = self.started
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        '''Time the block it wraps as a phase.'''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(name, start, time.perf_counter())
+
+    def mark(self, name: str) -> None:
+        '''Record everything since the previous phase or mark as a phase.'''
+        self._add(name, self._last, time.perf_counter())
+
+    def _add(self, name: str, start: float, end: float) -> None:
+        self.phases.append((name, start - self.started, end - start))
+        self._last = end
+
+    @property
+    def elapsed(self) -> float:
+        '''Get the seconds since the timer was made.'''
+        return time.perf_counter() - self.started
+
+    def report(self, file: TextIO | None = None) -> None:
+        '''Print each phase with when it started and how long it took, in milliseconds.'''
+        file = sys.stdout if file is None else file
+        print(f'{"phase":<32} {"at ms":>9} {"took ms":>9}', file=file)
+        for name, offset, duration in self.phases:
+            print(f'{name:<32} {offset * 1000:9.1f} {duration * 1000:9.1f}', file=file)
+        print(f'{"total":<32} {"":>9} {self.elapsed * 1000:9.1f}', file=file)
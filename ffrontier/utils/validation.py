@@ -0,0 +1,192 @@
+'''
+JSON schema validators compiled once per schema and shared by the loaders.
+
+jsonschema.validate checks the schema itself and builds a new validator on every call,
+which costs far more than checking a small record. compile_schema instead generates a Python
+function specialised to the schema, so checking a record is a handful of isinstance and key
+lookups:
+
+    validate_tile = compile_schema(MAP_DATA_SCHEMA)
+    validate_tile(record)
+
+Only records that fail the generated check go through jsonschema, so errors are the same
+ValidationError with the same message as before. Schemas using keywords the generator
+doesn't handle are checked by a jsonschema validator built once instead. jsonschema is slow
+to import, so it isn't imported until one of those is needed.
+'''
+from typing import Any, Callable, Dict, List
+
+
+# Keywords that don't affect whether an instance is valid
+ANNOTATIONS = frozenset(('$schema', '$id', 'title', 'description', 'default', 'examples'))
+# Keywords the generated code checks
+COMPILED = frozenset(('type', 'properties', 'required', 'items', 'minItems', 'maxItems',
+                      'minimum', 'maximum'))
+
+# The check for each JSON type, matching jsonschema's default type checker
+TYPE_CHECKS = {
+    'object': 'isinstance({0}, dict)',
+    'array': 'isinstance({0}, list)',
+    'string': 'isinstance({0}, str)',
+    'boolean': 'isinstance({0}, bool)',
+    'null': '{0} is None',
+    'number': '(isinstance({0}, (int, float)) and not isinstance({0}, bool))',
+    'integer': '((isinstance({0}, int) and not isinstance({0}, bool)) or '
+               '(isinstance({0}, float) and {0}.is_integer()))'
+}
+
+
+class SchemaValidator:
+    '''
+    Validates instances against one schema, raising jsonschema's ValidationError.
+
+    check is the fast test: the generated function, or the prebuilt jsonschema validator's
+    is_valid when the schema can't be compiled. source is the generated code, for debugging.
+    '''
+    schema: Dict[str, Any]
+    source: str | None
+    check: Callable[[Any], bool]
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        self._validator: Any = None
+        self.source = generate_source(schema) if compilable(schema) else None
+        if self.source is None:
+            self.check = self.jsonschema_validator().is_valid
+        else:
+            namespace: Dict[str, Any] = {'_MISSING': object()}
+            exec(compile(self.source, '<schema>', 'exec'), namespace)  # pylint: disable=exec-used
+            self.check = namespace['check']
+
+    def jsonschema_validator(self) -> Any:
+        '''Get the jsonschema validator for the schema, checking the schema the first time.'''
+        if self._validator is None:
+            # pylint: disable=import-outside-toplevel
+            import jsonschema
+            validator_class = jsonschema.validators.validator_for(self.schema)
+            validator_class.check_schema(self.schema)
+            self._validator = validator_class(self.schema)
+        return self._validator
+
+    def __call__(self, instance: Any) -> None:
+        '''Raise ValidationError if the instance doesn't match the schema.'''
+        if self.check(instance):
+            return
+        # pylint: disable=import-outside-toplevel
+        from jsonschema.exceptions import best_match
+        error = best_match(self.jsonschema_validator().iter_errors(instance))
+        if error is not None:
+            raise error
+
+    def is_valid(self, instance: Any) -> bool:
+        '''Check if the instance matches the schema.'''
+        return self.check(instance)
+
+
+def compilable(schema: Any) -> bool:
+    '''Check if every keyword in a schema and its subschemas can be generated.'''
+    if not isinstance(schema, dict):
+        return False
+    for keyword, value in schema.items():
+        if keyword in ANNOTATIONS:
+            continue
+        if keyword not in COMPILED:
+            return False
+        if keyword == 'type' and not all(
+                name in TYPE_CHECKS for name in (value if isinstance(value, list) else [value])):
+            return False
+        if keyword == 'properties' and not all(compilable(sub) for sub in value.values()):
+            return False
+        if keyword == 'items' and not compilable(value):
+            return False
+    return True
+
+
+def generate_source(schema: Dict[str, Any]) -> str:
+    '''Generate the source of a check(instance) function returning whether it is valid.'''
+    lines = ['def check(instance):']
+    _emit(schema, 'instance', lines, 1, [0])
+    lines.append('    return True')
+    return '\n'.join(lines) + '\n'
+
+
+def _emit(schema: Dict[str, Any], var: str, lines: List[str], depth: int,
+          counter: List[int]) -> None:
+    '''Append the statements checking var against a schema, returning False on a mismatch.'''
+    pad = '    ' * depth
+    types = schema.get('type')
+    if types is not None:
+        names = types if isinstance(types, list) else [types]
+        test = ' or '.join(TYPE_CHECKS[name].format(var) for name in names)
+        lines.append(f'{pad}if not ({test}):')
+        lines.append(f'{pad}    return False')
+
+    def guarded(json_type: str, test: str) -> str:
+        '''Other keywords only apply to instances of their type, unless type already said so.'''
+        if types == json_type:
+            return test
+        return f'{TYPE_CHECKS[json_type].format(var)} and ({test})'
+
+    if 'required' in schema and schema['required']:
+        missing = ' or '.join(f'{name!r} not in {var}' for name in schema['required'])
+        lines.append(f'{pad}if {guarded("object", missing)}:')
+        lines.append(f'{pad}    return False')
+    for keyword, op in (('minItems', '<'), ('maxItems', '>')):
+        if keyword in schema:
+            lines.append(f'{pad}if {guarded("array", f"len({var}) {op} {schema[keyword]!r}")}:')
+            lines.append(f'{pad}    return False')
+    for keyword, op in (('minimum', '<'), ('maximum', '>')):
+        if keyword in schema:
+            lines.append(f'{pad}if {guarded("number", f"{var} {op} {schema[keyword]!r}")}:')
+            lines.append(f'{pad}    return False')
+
+    properties = {name: sub for name, sub in schema.get('properties', {}).items()
+                  if _has_checks(sub)}
+    if properties:
+        inner = pad
+        if types != 'object':
+            lines.append(f'{pad}if isinstance({var}, dict):')
+            inner = pad + '    '
+        for name, sub in properties.items():
+            counter[0] += 1
+            value = f'v{counter[0]}'
+            lines.append(f'{inner}{value} = {var}.get({name!r}, _MISSING)')
+            lines.append(f'{inner}if {value} is not _MISSING:')
+            _emit_block(sub, value, lines, len(inner) // 4 + 1, counter)
+    items = schema.get('items')
+    if items is not None and _has_checks(items):
+        inner = pad
+        if types != 'array':
+            lines.append(f'{pad}if isinstance({var}, list):')
+            inner = pad + '    '
+        counter[0] += 1
+        item = f'v{counter[0]}'
+        lines.append(f'{inner}for {item} in {var}:')
+        _emit_block(items, item, lines, len(inner) // 4 + 1, counter)
+
+
+def _emit_block(schema: Dict[str, Any], var: str, lines: List[str], depth: int,
+                counter: List[int]) -> None:
+    '''Emit the body of an if or for, which needs a statement even if nothing is checked.'''
+    start = len(lines)
+    _emit(schema, var, lines, depth, counter)
+    if len(lines) == start:
+        lines.append('    ' * depth + 'pass')
+
+
+def _has_checks(schema: Dict[str, Any]) -> bool:
+    '''Check if a subschema constrains anything, so empty ones generate no code.'''
+    return any(keyword not in ANNOTATIONS for keyword in schema)
+
+
+def compile_schema(schema: Dict[str, Any]) -> SchemaValidator:
+    '''Get the validator for a schema, compiling it the first time it is asked for.'''
+    key = id(schema)
+    validator = _CACHE.get(key)
+    if validator is None or validator.schema is not schema:
+        validator = SchemaValidator(schema)
+        _CACHE[key] = validator
+    return validator
+
+
+_CACHE: Dict[int, SchemaValidator] = {}
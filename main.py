@@ -1,54 +1,102 @@
 '''Main file for the game. This is where the game loop will be.'''
 # Importing built-in libraries
 from typing import Tuple
-
-# Importing third-party libraries
-import pygame
-import pygame_gui
+import argparse
 
 # Importing local files
-from ffrontier.managers.ui_manager import UIVariableManager
-from ffrontier.ui.city_ui import CityUI
-from ffrontier.game.gamestate import GameState
-from ffrontier.managers.config_manager import ConfigManager
-from ffrontier.hex.canvas import HexCanvas
-from ffrontier.managers.asset_manager import AssetManager
-from ffrontier.hex import tileutils
-from ffrontier.managers.controls_manager import ControlsManager
+from ffrontier.utils.startup import StartupTimer
 
 # Constants
+LOADING_BACKGROUND = (0, 0, 0)
+LOADING_TEXT = (255, 255, 255)
 
 
 # Check if the file is being run directly and not imported.
 # If it is being run directly, run the game loop.
 if __name__ == '__main__':
-    pygame.init()
+    startup = StartupTimer()
+    parser = argparse.ArgumentParser(description='Fantasy Frontier')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Print how long each phase of startup took and quit once the '
+                             'first frame of the game is on screen')
+    args = parser.parse_args()
+
+    # Imported here rather than at the top so their cost shows up in the startup profile.
+    # Only what is needed to open the window comes before the first frame.
+    with startup.phase('import pygame'):
+        import pygame
+        from ffrontier.managers.config_manager import ConfigManager
+
+    with startup.phase('pygame.init'):
+        pygame.init()
 
     # Load the configuration file
-    cfg = ConfigManager('config.ini')
-
-    resolution: Tuple[int, int] = (int(cfg.get("base", "width")),
-                                   int(cfg.get("base", "height")))
-
-    screen = pygame.display.set_mode(resolution)
-    pygame.display.set_caption('Fantasy Frontier')
-    clock = pygame.time.Clock()
-
-    # Initialize the UI manager
-    manager = pygame_gui.UIManager(resolution)
+    with startup.phase('config'):
+        cfg = ConfigManager('config.ini')
+    settings = cfg.settings
+    resolution: Tuple[int, int] = (settings.base.width, settings.base.height)
+
+    # Put something on screen straight away, before loading anything heavy
+    with startup.phase('window and first frame'):
+        screen = pygame.display.set_mode(resolution)
+        pygame.display.set_caption('Fantasy Frontier')
+        screen.fill(LOADING_BACKGROUND)
+        loading = pygame.font.Font(None, 32).render('Loading...', True, LOADING_TEXT)
+        screen.blit(loading, loading.get_rect(center=screen.get_rect().center))
+        pygame.display.flip()
 
-    # Initialize the UI variable manager
-    ui_manager = UIVariableManager(resolution, (resolution[0] - 200, resolution[1]))
+    with startup.phase('import pygame_gui'):
+        import pygame_gui
+    with startup.phase('import game modules'):
+        from ffrontier.managers.ui_manager import UIVariableManager
+        from ffrontier.ui.city_ui import CityUI
+        from ffrontier.ui import scheduler
+        from ffrontier.game.gamestate import GameState
+        from ffrontier.hex.canvas import HexCanvas
+        from ffrontier.managers.asset_manager import AssetManager
+        from ffrontier.hex import tileutils
+        from ffrontier.managers.controls_manager import ControlsManager
+        from ffrontier.managers.input_manager import InputCoalescer
+        from ffrontier.ui.profiler_overlay import ProfilerOverlay
+        from ffrontier.utils.profiling import PROFILER
+
+    trace_dir = settings.profiling.tracedir
+    trace_size = settings.profiling.tracebuffer
+    if settings.profiling.trace:
+        # Start before anything else is loaded so loading shows up in the trace
+        PROFILER.start_trace(trace_size)
+
+    frames = scheduler.FrameScheduler(settings.base.fps, settings.base.idlefps)
 
     # Assets
-    asset_manager = AssetManager('ffrontier/assets/configs/city_assets.json')
+    with startup.phase('assets'):
+        asset_manager = AssetManager('ffrontier/assets/configs/city_assets.json')
 
     # Load the map data
-    tilemap = tileutils.TileMap(asset_manager, 'ffrontier/assets/maps/city/basic1.ffm')
+    with startup.phase('map'):
+        tilemap = tileutils.TileMap(asset_manager, 'ffrontier/assets/maps/city/basic1.ffm',
+                                    cache_dir=settings.maps.cachedir,
+                                    workers=settings.maps.loadworkers)
 
     # Initialize the HexCanvas class
+    with startup.phase('canvas'):
+        canvas = HexCanvas(asset_manager, tilemap, zoom_settle_ms=settings.base.zoomsettlems)
+
+        # Pick up edits to config.ini while running. The window size still needs a restart.
+        cfg.subscribe(lambda new, _: frames.set_rates(new.base.fps, new.base.idlefps),
+                      [('base', 'fps'), ('base', 'idlefps')])
+        cfg.subscribe(lambda new, _: setattr(canvas, 'zoom_settle_ms', new.base.zoomsettlems),
+                      [('base', 'zoomsettlems')])
+
+    # Initialize the UI manager
+    with startup.phase('ui'):
+        manager = pygame_gui.UIManager(resolution)
+
+        # Initialize the UI variable manager
+        ui_manager = UIVariableManager(resolution, (resolution[0] - 200, resolution[1]))
 
-    canvas = HexCanvas(asset_manager, tilemap)
+        # Initialize the CityUI class
+        city_ui = CityUI(manager, ui_manager, canvas)
 
     # Initialize controls manager
     controls = ControlsManager()
@@ -62,39 +110,97 @@ if __name__ == '__main__':
     controls.add_mapping("city_ui", pygame.K_EQUALS, "zoom_in", pygame.KEYDOWN, pygame.KMOD_RSHIFT)
     controls.add_mapping("city_ui", pygame.K_EQUALS, "zoom_in", pygame.KEYDOWN, pygame.KMOD_LSHIFT)
     controls.add_mapping("city_ui", pygame.K_MINUS, "zoom_out", pygame.KEYDOWN)
+    controls.add_mapping("city_ui", pygame.K_F3, "toggle_profiler", pygame.KEYDOWN)
+    controls.add_mapping("city_ui", pygame.K_F4, "toggle_trace", pygame.KEYDOWN)
 
     controls.set_context("city_ui")
     assert controls.current_context is not None
+    coalescer = InputCoalescer(controls)
 
-    # Initialize the CityUI class
-    city_ui = CityUI(manager, ui_manager, canvas)
+    overlay = ProfilerOverlay(PROFILER)
 
     running = True
 
     # Initialize the game state
-    gstate = GameState(cfg)
+    # Continue from the seed saved with the map, so its turns play out the same way again
+    gstate = GameState(cfg, tilemap, 'ffrontier/assets/configs/research.json',
+                       seed=tilemap.map_handler.seed)
 
     # Set pygame key repeat
     pygame.key.set_repeat(200, 50)
 
+    last_turn = gstate.get_turn()
+    startup.mark('controls and game state')
+    first_frame_drawn = False
+
     while running:
-        time_delta = clock.tick(60) / 1000.0
-        for event in pygame.event.get():
-            if (event.type == pygame.QUIT or
-                    (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE)):
+        time_delta = frames.tick()
+        PROFILER.begin_frame()
+        cfg.poll_reload()
+        with PROFILER.span('events'):
+            frame_input = coalescer.collect(pygame.event.get())
+            if frame_input.quit:
                 running = False
-            command = None
-            if event.type == pygame.KEYDOWN:
-                command = controls.process_event(event)
-
-            manager.process_events(event)
-            city_ui.handle_event(event, gstate)
-            if command is not None:
-                city_ui.handle_command(command, gstate)
-
-        manager.update(time_delta)
-        city_ui.draw(screen)
-
-        pygame.display.flip()
-
+            if not frame_input.is_empty:
+                # Any event from the window can change what is on screen
+                frames.invalidate(scheduler.INPUT)
+            if frame_input.zoom or frame_input.wheel:
+                frames.invalidate(scheduler.ZOOM)
+            if 'toggle_profiler' in frame_input.commands:
+                overlay.toggle()
+                if not overlay.visible:
+                    # Uncover what was under it
+                    city_ui.full_redraw = True
+            if 'toggle_trace' in frame_input.commands:
+                if PROFILER.tracing:
+                    PROFILER.stop_trace()
+                    trace_file = PROFILER.trace_file(trace_dir)
+                    events = PROFILER.export_trace(trace_file)
+                    cfg.get_logger('game').info('Saved %d trace events to %s', events, trace_file)
+                else:
+                    PROFILER.start_trace(trace_size)
+            # The GUI only needs the final mouse position, not every motion event
+            gui_events = frame_input.events
+            if frame_input.motion is not None:
+                gui_events = [frame_input.motion, *gui_events]
+            for event in gui_events:
+                if manager.process_events(event):
+                    frames.invalidate(scheduler.UI)
+            city_ui.apply_input(frame_input, gstate)
+
+        if gstate.get_turn() != last_turn:
+            last_turn = gstate.get_turn()
+            frames.invalidate(scheduler.SIMULATION)
+        if city_ui.needs_redraw:
+            frames.invalidate(scheduler.CANVAS)
+        if overlay.visible:
+            # Keep rendering so there are frames to measure
+            frames.invalidate(scheduler.UI)
+
+        with PROFILER.span('gui.update'):
+            manager.update(time_delta)
+        if frames.should_render():
+            frames.consume()
+            dirty_rects = city_ui.draw(screen)
+            dirty_rects.extend(overlay.draw(screen))
+            if dirty_rects:
+                with PROFILER.span('display.update'):
+                    pygame.display.update(dirty_rects)
+            if not first_frame_drawn:
+                first_frame_drawn = True
+                startup.mark('first game frame')
+                if args.profile_startup:
+                    startup.report()
+                    running = False
+                else:
+                    # The economy and research need NumPy, which drawing doesn't, so they
+                    # are loaded once the game is on screen
+                    gstate.load()
+        PROFILER.end_frame()
+
+    if PROFILER.tracing:
+        PROFILER.stop_trace()
+        PROFILER.export_trace(PROFILER.trace_file(trace_dir))
+    # Write out whatever is still queued for the log files
+    cfg.log_manager.stop()
     pygame.quit()
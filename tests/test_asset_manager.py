@@ -122,3 +122,17 @@ def test_image_rescale_file_loading():
     am.load_image('tests/testing_assets/grasslands_scaled_masked.png', 'grasslands_scaled_masked')
     assert compare_images_fast(am.scaled_images['grasslands'],
                                am.images['grasslands_scaled_masked'])
+
+
+def test_average_color_ignores_transparency():
+    '''Transparent pixels lower the mean alpha but not the average color'''
+    am = asset_manager.AssetManager()
+    image = pygame.Surface((4, 4), pygame.SRCALPHA)
+    image.fill((0, 0, 0, 0))
+    image.fill((200, 100, 50, 255), (0, 0, 4, 2))
+    am.images['half'] = image
+    r, g, b, a = am.get_average_color('half')
+    assert all(abs(c - e) <= 1 for c, e in zip((r, g, b), (200, 100, 50)))
+    assert abs(a - 128) <= 1
+    with pytest.raises(ValueError):
+        am.get_average_color('missing')
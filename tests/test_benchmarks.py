@@ -0,0 +1,39 @@
+'''Tests for the benchmark harness'''
+import json
+
+from benchmarks import harness
+
+
+def test_cases_cover_every_parameter_combination():
+    '''A benchmark runs once per combination of its parameters'''
+    bench = harness.Benchmark('draw', lambda **_: None, {'size': ['a', 'b'], 'scale': [1, 2]})
+    names = [name for name, _ in bench.cases()]
+    assert names == ['draw[size=a,scale=1]', 'draw[size=a,scale=2]',
+                     'draw[size=b,scale=1]', 'draw[size=b,scale=2]']
+    assert [name for name, _ in harness.Benchmark('plain', lambda: None).cases()] == ['plain']
+
+
+def test_measure_calibrates_calls():
+    '''Quick functions are called enough times per repeat to be timed'''
+    calls = []
+    result = harness.measure(lambda: calls.append(1), 'quick', repeats=3, min_time=0.001)
+    assert result.repeats == 3
+    assert result.number > 1
+    assert len(calls) == 1 + 3 * result.number
+    assert result.min <= result.median
+
+
+def test_run_filters_and_compare_finds_regressions(tmp_path):
+    '''Results round trip through JSON and slowdowns past the threshold are reported'''
+    benchmarks = [harness.Benchmark('a', lambda: lambda: None),
+                  harness.Benchmark('b', lambda: lambda: None)]
+    results = harness.run(benchmarks, 'a', repeats=2)
+    assert [result.name for result in results] == ['a']
+
+    path = tmp_path / 'baseline.json'
+    path.write_text(json.dumps(harness.to_json(results)), encoding='utf-8')
+    baseline = harness.load_results(str(path))
+    slower = harness.Result('a', 2, 1, 1.0, baseline['a'].median * 1.5, 1.0, 0.0)
+    assert harness.compare([slower], baseline, 0.6) == []
+    assert [name for name, _ in harness.compare([slower], baseline, 0.2)] == ['a']
+    assert harness.compare([harness.Result('new', 2, 1, 1.0, 1.0, 1.0, 0.0)], baseline, 0.2) == []
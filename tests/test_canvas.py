@@ -0,0 +1,190 @@
+'''Tests for the hex canvas'''
+import pygame
+import pytest
+
+from ffrontier.hex.canvas import (HexCanvas, BLOCK_SCALE, DETAIL_SCALE, LOD_BLOCKS, LOD_FLAT,
+                                  LOD_FULL, ZOOM_SETTLE_MS)
+from ffrontier.hex.tileutils import TileMap
+from ffrontier.managers.asset_manager import AssetManager
+
+MAP_FILE = 'ffrontier/assets/maps/city/basic1.ffm'
+ASSET_FILE = 'ffrontier/assets/configs/city_assets.json'
+VIEW_SIZE = (400, 300)
+
+
+@pytest.fixture(name='canvas')
+def fixture_canvas():
+    '''A canvas on the basic city map, positioned so the map is in view'''
+    assets = AssetManager(ASSET_FILE)
+    canvas = HexCanvas(assets, TileMap(assets, MAP_FILE))
+    canvas.vp_pos = (VIEW_SIZE[0] // 2 - canvas.offset[0], VIEW_SIZE[1] // 2 - canvas.offset[1])
+    return canvas
+
+
+def _full_render(canvas: HexCanvas) -> pygame.Surface:
+    surface = pygame.Surface(VIEW_SIZE)
+    canvas.draw(surface, VIEW_SIZE)
+    return surface
+
+
+def _same(surface1: pygame.Surface, surface2: pygame.Surface) -> bool:
+    return bytes(surface1.get_view('2')) == bytes(surface2.get_view('2'))
+
+
+def test_render_full_then_nothing(canvas):
+    '''The first render draws everything and later renders draw nothing until something changes'''
+    surface = pygame.Surface(VIEW_SIZE)
+    assert canvas.render(surface, VIEW_SIZE) == [surface.get_rect()]
+    assert not canvas.has_updates
+    assert canvas.render(surface, VIEW_SIZE) == []
+
+
+def test_render_highlight_matches_full_draw(canvas):
+    '''Redrawing only the highlighted tiles gives the same pixels as a full draw'''
+    surface = pygame.Surface(VIEW_SIZE)
+    canvas.render(surface, VIEW_SIZE)
+    canvas.highlighted_tile = (1, 0)
+    rects = canvas.render(surface, VIEW_SIZE)
+    assert rects == [canvas.tile_rect((1, 0))]
+    assert _same(surface, _full_render(canvas))
+
+    canvas.highlighted_tile = (0, 1)
+    assert len(canvas.render(surface, VIEW_SIZE)) == 2
+    assert _same(surface, _full_render(canvas))
+
+
+def test_render_tile_changes(canvas):
+    '''Tiles changed through the TileMap are redrawn on their own'''
+    surface = pygame.Surface(VIEW_SIZE)
+    canvas.render(surface, VIEW_SIZE)
+    canvas.tilemap.set_color((-1, 1), (0, 255, 0, 255))
+    canvas.tilemap.set_border((-1, 1), 0)
+    assert canvas.has_updates
+    assert canvas.render(surface, VIEW_SIZE) == [canvas.tile_rect((-1, 1))]
+    assert _same(surface, _full_render(canvas))
+
+
+def test_render_scrolls_when_panning(canvas, mocker):
+    '''Panning scrolls the rendered pixels and only draws the exposed strips'''
+    surface = pygame.Surface(VIEW_SIZE)
+    canvas.render(surface, VIEW_SIZE)
+    canvas.highlighted_tile = (0, 0)
+    canvas.render(surface, VIEW_SIZE)
+    full_draw = mocker.spy(canvas, 'draw')
+    for delta in ((13, -7), (-40, 0), (0, 25), (-3, -60)):
+        canvas.pan(delta, VIEW_SIZE)
+        assert canvas.has_updates
+        assert canvas.render(surface, VIEW_SIZE) == [surface.get_rect()]
+        assert _same(surface, _full_render(canvas))
+    # Only the reference renders did full draws
+    assert full_draw.call_count == 4
+
+
+def test_canvases_share_a_map(canvas):
+    '''A second canvas on the same map sees tile changes without taking them from the first'''
+    other = HexCanvas(canvas.assets, canvas.tilemap)
+    canvas.tilemap.set_color((-1, 1), (0, 255, 0, 255))
+    assert canvas.has_tile_changes and other.has_tile_changes
+    canvas.render(pygame.Surface(VIEW_SIZE), VIEW_SIZE)
+    assert other.has_tile_changes
+
+
+def test_collision_uses_origin(canvas):
+    '''Hit-testing finds the tile under a point on the viewport'''
+    center = canvas.tile_rect((1, -1)).center
+    canvas.hover(center)
+    assert canvas.highlighted_tile == (1, -1)
+    canvas.hover((-500, -500))
+    assert canvas.highlighted_tile is None
+
+
+def test_lod_follows_scale(canvas):
+    '''Zooming out switches to flat hexes and then to merged blocks'''
+    canvas.assets.scale = DETAIL_SCALE
+    assert canvas.lod == LOD_FULL
+    canvas.assets.scale = DETAIL_SCALE - 5
+    assert canvas.lod == LOD_FLAT
+    canvas.assets.scale = BLOCK_SCALE
+    assert canvas.lod == LOD_BLOCKS
+
+
+@pytest.mark.parametrize('scale', [DETAIL_SCALE - 5, BLOCK_SCALE])
+def test_low_detail_render_matches_full_draw(canvas, mocker, scale):
+    '''Partial renders at low detail give the same pixels as a full draw'''
+    canvas.zoom((scale - canvas.assets.scale) // 5)
+    assert canvas.assets.scale == scale
+    surface = pygame.Surface(VIEW_SIZE)
+    tile_draw = mocker.spy(canvas.tilemap.tiles[(0, 0)], 'draw')
+    canvas.render(surface, VIEW_SIZE)
+    # Tiles are not drawn with their images
+    assert tile_draw.call_count == 0
+
+    canvas.highlighted_tile = (0, 0)
+    canvas.render(surface, VIEW_SIZE)
+    # Nor is the highlighted one
+    assert tile_draw.call_count == 0
+    assert _same(surface, _full_render(canvas))
+
+    canvas.tilemap.set_color((-1, 1), (0, 255, 0, 255))
+    canvas.tilemap.set_border((-1, 1), 0)
+    canvas.render(surface, VIEW_SIZE)
+    assert _same(surface, _full_render(canvas))
+
+    canvas.pan((11, -6), VIEW_SIZE)
+    canvas.render(surface, VIEW_SIZE)
+    assert _same(surface, _full_render(canvas))
+
+
+def test_block_colors_follow_tile_changes(canvas):
+    '''Changing a tile recomputes the color of its block'''
+    canvas.zoom(-10)
+    canvas.render(pygame.Surface(VIEW_SIZE), VIEW_SIZE)
+    block = (0, 0)
+    before = canvas.block_color(block)
+    canvas.tilemap.set_layers((1, 1), [])
+    canvas.tilemap.set_color((1, 1), (0, 0, 255, 255))
+    canvas.tilemap.set_border((1, 1), 0)
+    canvas.render(pygame.Surface(VIEW_SIZE), VIEW_SIZE)
+    assert canvas.block_color(block) != before
+
+
+def test_colors_follow_reloaded_images(canvas):
+    '''Reloading an image recomputes the colors of the tiles and blocks using it'''
+    canvas.zoom(-10)
+    canvas.render(pygame.Surface(VIEW_SIZE), VIEW_SIZE)
+    tile = canvas.tilemap.tiles[(0, 0)]
+    before = tile.dominant_color(), canvas.block_color((0, 0))
+    canvas.assets.load_image('tests/testing_assets/Testing_Smiley.png', tile.images[0].image)
+    assert (tile.dominant_color(), canvas.block_color((0, 0))) != before
+
+
+def test_zoom_previews_until_input_settles(canvas, mocker):
+    '''Zoom steps scale the last frame, and the map is drawn at the new scale once they stop'''
+    now = [0]
+    canvas.time_source = lambda: now[0]
+    surface = pygame.Surface(VIEW_SIZE)
+    canvas.render(surface, VIEW_SIZE)
+    scale = canvas.assets.scale
+    rescale = mocker.spy(canvas.assets, 'rescale_images')
+    smoothscale = mocker.spy(pygame.transform, 'smoothscale')
+
+    for _ in range(3):
+        canvas.zoom(1)
+        canvas.hover(canvas.tile_rect((1, -1)).center)
+        now[0] += 50
+        assert canvas.render(surface, VIEW_SIZE) == [surface.get_rect()]
+    assert canvas.assets.scale == scale
+    assert canvas.target_scale == scale + 15
+    assert smoothscale.call_count == 3
+    assert rescale.call_count == 0
+    # Nothing changed, so the preview isn't scaled again
+    assert canvas.render(surface, VIEW_SIZE) == []
+
+    now[0] += ZOOM_SETTLE_MS
+    assert canvas.render(surface, VIEW_SIZE) == [surface.get_rect()]
+    assert canvas.assets.scale == scale + 15
+    assert rescale.call_count == 1
+    assert not canvas.has_updates
+    assert _same(surface, _full_render(canvas))
+    # The hover from during the zoom is hit-tested at the new scale
+    assert canvas.highlighted_tile is not None
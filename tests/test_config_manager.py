@@ -0,0 +1,100 @@
+'''Tests for the typed configuration snapshot and hot reloading'''
+import dataclasses
+import logging
+import os
+
+import pytest
+
+from ffrontier.managers.config_manager import ConfigManager
+
+
+@pytest.fixture(name='config_file')
+def fixture_config_file(tmp_path):
+    '''A config file with the logs kept in tmp_path'''
+    path = tmp_path / 'config.ini'
+    path.write_text(f'''[base]
+fps=30
+
+[logging]
+gamelog={tmp_path / 'game.log'}
+ailog={tmp_path / 'ai.log'}
+guilog={tmp_path / 'gui.log'}
+''', encoding='utf-8')
+    return path
+
+
+@pytest.fixture(name='cfg')
+def fixture_cfg(config_file):
+    '''A ConfigManager that polls the file on every call'''
+    cfg = ConfigManager(str(config_file), reload_interval=0)
+    yield cfg
+    cfg.log_manager.stop()
+    for name in cfg.log_manager.loggers:
+        logging.getLogger(name).removeHandler(cfg.log_manager.queue_handler)
+
+
+def _edit(config_file, old: str, new: str) -> None:
+    '''Change the file, making sure its modification time moves on'''
+    mtime = config_file.stat().st_mtime_ns
+    config_file.write_text(config_file.read_text(encoding='utf-8').replace(old, new),
+                           encoding='utf-8')
+    os.utime(config_file, ns=(mtime + 1_000_000_000, mtime + 1_000_000_000))
+
+
+def test_snapshot_is_typed_and_frozen(cfg):
+    '''Options are parsed once into frozen attributes of their type'''
+    assert cfg.settings.base.fps == 30
+    assert cfg.settings.base.width == 800
+    assert cfg.settings.profiling.trace is False
+    assert cfg.get('base', 'fps') == 30
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        cfg.settings.base.fps = 60
+    with pytest.raises(ValueError):
+        cfg.get('base', 'missing')
+
+
+def test_poll_reload_notifies_changed_keys(cfg, config_file, mocker):
+    '''Editing the file swaps the snapshot and tells subscribers what changed'''
+    everything = mocker.Mock()
+    rates = mocker.Mock()
+    widths = mocker.Mock()
+    cfg.subscribe(everything)
+    cfg.subscribe(rates, [('base', 'fps'), ('base', 'idlefps')])
+    cfg.subscribe(widths, [('base', 'width')])
+    old = cfg.settings
+
+    assert not cfg.poll_reload()
+    _edit(config_file, 'fps=30', 'fps=45\nidlefps=5\ntitle=FFrontier')
+    assert cfg.poll_reload() == {('base', 'fps'), ('base', 'idlefps')}
+
+    assert cfg.settings.base.fps == 45 and old.base.fps == 30
+    everything.assert_called_once_with(cfg.settings, {('base', 'fps'), ('base', 'idlefps')})
+    rates.assert_called_once_with(cfg.settings, {('base', 'fps'), ('base', 'idlefps')})
+    widths.assert_not_called()
+    assert not cfg.poll_reload()
+
+
+def test_missing_file_keeps_snapshot(cfg, config_file):
+    '''A file that is gone for a while is read again once it is back, not reset to defaults'''
+    text = config_file.read_text(encoding='utf-8')
+    config_file.unlink()
+    assert not cfg.poll_reload()
+    assert cfg.settings.base.fps == 30
+    config_file.write_text(text, encoding='utf-8')
+    _edit(config_file, 'fps=30', 'fps=45')
+    assert cfg.poll_reload() == {('base', 'fps')}
+
+
+def test_invalid_reload_keeps_snapshot(cfg, config_file):
+    '''A value that doesn't parse leaves the current configuration in place'''
+    old = cfg.settings
+    _edit(config_file, 'fps=30', 'fps=fast')
+    assert not cfg.poll_reload()
+    assert cfg.settings is old
+
+
+def test_reload_sets_log_levels(cfg, config_file):
+    '''Changing a logger's level applies it straight away'''
+    _edit(config_file, '[logging]', '[logging]\ngameloglevel=WARNING')
+    cfg.poll_reload()
+    assert cfg.get_logger('game').level == logging.WARNING
@@ -0,0 +1,98 @@
+'''Tests for the dependency graph and the city yields built on it'''
+import pytest
+
+from ffrontier.game.dependency import REBUILD_UPDATES, Derived, Input, Node, SumNode
+from ffrontier.game.yields import CityYields
+from ffrontier.hex.tileutils import TileMap
+from ffrontier.tools import mapgen
+
+
+def test_derived_recomputes_lazily_and_only_when_dirty():
+    '''A change marks dependents dirty, and they recompute once on the next read'''
+    calls = []
+    a, b = Input(1), Input(2)
+    total = Derived(lambda x, y: calls.append('total') or x + y, [a, b])
+    double = Derived(lambda x: calls.append('double') or x * 2, [total])
+    other = Derived(lambda y: calls.append('other') or -y, [b])
+
+    assert double.get() == 6 and other.get() == -2
+    a.set(5)
+    assert total.dirty and double.dirty and not other.dirty
+    assert calls == ['total', 'double', 'other']
+    assert double.get() == 14 and double.get() == 14
+    assert calls == ['total', 'double', 'other', 'total', 'double']
+    # Setting the same value changes nothing
+    a.set(5)
+    assert not total.dirty
+
+
+def test_sum_node_updates_by_difference():
+    '''A total only reads the inputs that changed'''
+    reads = []
+    inputs = [Input(i) for i in range(100)]
+    squares = [Derived(lambda x, i=i: reads.append(i) or x * x, [node])
+               for i, node in enumerate(inputs)]
+    total = SumNode(squares)
+    assert total.get() == sum(i * i for i in range(100))
+    reads.clear()
+    inputs[3].set(10)
+    inputs[7].set(0)
+    assert total.dirty
+    assert total.get() == sum(i * i for i in range(100)) - 9 + 100 - 49
+    assert sorted(reads) == [3, 7]
+
+
+def test_sum_node_float_total_does_not_drift():
+    '''Many small float updates stay within rounding of the exact total'''
+    inputs = [Input(0.0) for _ in range(10)]
+    total = SumNode(inputs, 0.0)
+    # Differences against huge values lose the small ones entirely
+    for step in range(100):
+        inputs[step % 10].set(1e16 if step % 2 else 0.1 * step)
+        total.get()
+    for step in range(REBUILD_UPDATES):
+        inputs[step % 10].set(0.2 if step // 10 % 2 else 0.1)
+        total.get()
+    for node in inputs:
+        node.set(0.1)
+    assert total.get() == pytest.approx(1.0, abs=1e-12)
+
+
+def test_node_is_abstract():
+    '''Nodes must say how to get their value and react to changes'''
+    with pytest.raises(TypeError):
+        Node()  # pylint: disable=abstract-class-instantiated
+
+
+@pytest.fixture(name='tilemap')
+def fixture_tilemap(tmp_path, mocker):
+    '''A small generated map without any features'''
+    path = tmp_path / 'yields.ffm'
+    mapgen.generate_map(str(path), radius=2, seed=1,
+                        distribution={'terrains': [{'weight': 1}]})
+    return TileMap(mocker.MagicMock(), str(path))
+
+
+def test_city_yields_follow_tile_changes(tilemap):
+    '''Changing a tile's features updates it, its neighbours and the total'''
+    yields = CityYields(tilemap)
+    assert yields.total_yield() == 0.0
+    tilemap.set_features((0, 0), ['farm'])
+    tilemap.set_features((1, 0), ['farm'])
+    tilemap.set_features((2, -2), ['tree'])
+    assert yields.tile_yield((0, 0)) == 3.5
+    assert yields.tile_yields([(1, 0), (2, -2)]) == {(1, 0): 3.5, (2, -2): 1.0}
+    assert yields.total_yield() == 8.0
+
+    untouched = yields.yields[(-2, 2)]
+    tilemap.set_features((1, 0), [])
+    yields.sync()
+    assert yields.yields[(0, 0)].dirty and not untouched.dirty
+    assert yields.total_yield() == 4.0
+
+
+def test_city_yields_share_a_map(tilemap):
+    '''Several CityYields on one map each see every change'''
+    first, second = CityYields(tilemap), CityYields(tilemap)
+    tilemap.set_features((2, -2), ['tree'])
+    assert first.total_yield() == second.total_yield() == 1.0
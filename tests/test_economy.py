@@ -0,0 +1,84 @@
+'''Tests for the vectorised economy'''
+import numpy as np
+import pytest
+
+from ffrontier.game.economy import Economy, INITIAL_CAPACITY, RESOURCES
+
+
+def test_resolve_turn_totals():
+    '''Production, upkeep and taxes add up over districts and tiles'''
+    economy = Economy(city=(1, 1))
+    economy.add_district('commerce', tier=2, wealth='rich', population=100, upgrades=2)
+    economy.add_district('residential', wealth='modest', population=200)
+    economy.claim_tiles([(1, 1), (3, 1), (1, -2)], 'farm', tile_yield=2.0)
+    economy.claim_tiles([(0, 0)], 'mine')
+
+    report = economy.resolve_turn()
+    gold, food, _, _, ore = RESOURCES
+    net = report.as_dict()
+    # Commerce at tier 2 makes 4 * 1.75; farms yield 3 food each at yield 2; the mine 1 ore
+    assert report.production.tolist() == [7.0, 18.0, 0.0, 0.0, 1.0]
+    # Districts 1 * 1.75 + 0.5 and 2 upgrades; tiles 3 * 0.1 + 0.3 plus 0 + 2 + 3 + 2 hexes
+    assert report.upkeep[0] == pytest.approx(1.75 + 0.5 + 1.0 + 0.6 + 7 * 0.05)
+    # 100 rich residents at 0.2 and 200 modest ones at 0.05
+    assert report.taxes == pytest.approx(30.0)
+    assert net[gold] == pytest.approx(7.0 - 4.2 + 30.0)
+    assert net[food] == 18.0 and net[ore] == 1.0
+    np.testing.assert_allclose(economy.stockpile, report.net)
+
+
+def test_removed_rows_stop_counting():
+    '''Removed districts and released tiles drop out of the next turn'''
+    economy = Economy()
+    keep = economy.add_district('commerce')
+    gone = economy.add_district('commerce')
+    tiles = economy.claim_tiles([(1, 0), (2, 0)], 'quarry')
+    economy.remove_district(gone)
+    economy.release_tiles(tiles[1:])
+    economy.set_district(keep, tier=3)
+    report = economy.resolve_turn()
+    assert report.production[0] == 4.0 * 2.5
+    assert report.production[3] == 2.0
+
+
+def test_districts_are_entities():
+    '''Districts live in the entity-component store, with their upgrades as entities'''
+    economy = Economy()
+    district = economy.add_district('commerce', upgrades=2)
+    found = economy.world.query('district')
+    assert found.entities.tolist() == [district]
+    assert economy.world.slots_used([district]).tolist() == [2]
+    upkeep = economy.resolve_turn().upkeep[0]
+    economy.remove_district(district)
+    assert len(economy.world) == 0
+    assert upkeep == pytest.approx(1.0 + 2 * 0.5)
+    assert economy.resolve_turn().upkeep[0] == 0.0
+
+
+def test_columns_grow():
+    '''Adding past the initial capacity keeps earlier rows intact'''
+    economy = Economy()
+    first = economy.claim_tiles([(1, 0)], 'forest')
+    economy.claim_tiles([(i, 0) for i in range(INITIAL_CAPACITY * 3)], 'forest')
+    assert economy.tiles.view('distance')[first[0]] == 1
+    assert economy.resolve_turn().production[2] == 2.0 * (INITIAL_CAPACITY * 3 + 1)
+
+
+def test_invalid_district():
+    '''Unknown types and tiers are rejected'''
+    economy = Economy()
+    with pytest.raises(ValueError):
+        economy.add_district('castle')
+    with pytest.raises(ValueError):
+        economy.add_district('commerce', tier=4)
+    index = economy.add_district('commerce', tier=2)
+    for values in ({'tier': 0}, {'tier': 7}, {'kind': 'castle'}, {'wealth': 'royal'}):
+        with pytest.raises(ValueError):
+            economy.set_district(index, **values)
+    assert economy.districts.columns['tier'][economy.districts.rows([index])].tolist() == [2]
+    with pytest.raises(ValueError):
+        economy.set_district(index, upgrades=1)
+    with pytest.raises(ValueError):
+        economy.add_district('commerce', upgrades=4)
+    assert len(economy.world) == 1
+    economy.resolve_turn()
@@ -0,0 +1,108 @@
+'''Tests for the entity-component store'''
+import numpy as np
+import pytest
+
+from ffrontier.game.ecs import INITIAL_CAPACITY, World
+
+
+def _districts(world, count, tier=1):
+    entities = world.create(count)
+    world.add('district', entities, kind=0, tier=tier, wealth=0, population=10)
+    return entities
+
+
+def test_query_intersects_components():
+    '''Queries return the entities with every component, with their values'''
+    world = World()
+    districts = _districts(world, 4)
+    world.add('position', districts[1:3], q=[5, 6], r=[0, 1])
+    loose = world.create(1)
+    world.add('position', loose, q=9, r=9)
+
+    found = world.query('district', 'position')
+    assert sorted(found.entities.tolist()) == districts[1:3].tolist()
+    by_entity = dict(zip(found.entities.tolist(), found.column('position', 'q').tolist()))
+    assert by_entity == {districts[1]: 5, districts[2]: 6}
+    assert len(world.query('district')) == 4
+
+
+def test_bulk_remove_keeps_rows_packed():
+    '''Removing entities keeps the other rows contiguous and findable'''
+    world = World()
+    districts = _districts(world, INITIAL_CAPACITY * 2 + 1)
+    world.add('district', districts[::2], kind=0, tier=2, wealth=0, population=10)
+    world.components['district'].remove(districts[1::2])
+
+    district = world.components['district']
+    assert len(district) == len(districts[::2])
+    assert (district.view('tier') == 2).all()
+    assert (district.rows(districts[::2]) == np.arange(len(district))).all()
+    assert not district.has(districts[1::2]).any()
+
+
+def test_tile_index_follows_positions():
+    '''Entities can be looked up by tile, and move or disappear from it'''
+    world = World()
+    first, second = world.create(2).tolist()
+    world.add('position', [first, second], q=1, r=2)
+    assert sorted(world.at(1, 2)) == [first, second]
+    world.add('position', [first], q=3, r=3)
+    assert world.at(1, 2) == [second] and world.at(3, 3) == [first]
+    world.destroy([second])
+    assert world.at(1, 2) == []
+    # Destroyed ids are reused
+    assert world.create(1).tolist() == [second]
+    assert world.at(1, 2) == []
+
+
+def test_upgrade_slots():
+    '''Upgrades fill a district's slots, multi-slot ones taking more than one'''
+    world = World()
+    district, other = _districts(world, 2).tolist()
+    world.add_upgrades(world.create(2), [district, other], kind=[1, 2], slots=[2, 1])
+    assert world.slots_used([district, other, 99]).tolist() == [2, 1, 0]
+    world.add_upgrades(world.create(1), district, kind=3)
+    with pytest.raises(ValueError):
+        world.add_upgrades(world.create(1), district, kind=4)
+    with pytest.raises(ValueError):
+        world.add_upgrades(world.create(1), other, kind=4, slots=3)
+    with pytest.raises(ValueError):
+        world.add_upgrades(world.create(1), world.create(1), kind=4)
+
+
+def test_missing_entities_rejected():
+    '''Components can only be added to entities that exist'''
+    world = World()
+    with pytest.raises(ValueError):
+        world.add('position', [0], q=0, r=0)
+    with pytest.raises(ValueError):
+        world.add('position', [-1], q=0, r=0)
+    assert not world.components['position'].has([-1]).any()
+
+
+def test_duplicate_entities_leave_tile_index_alone():
+    '''Adding a position twice in one call is refused before the index changes'''
+    world = World()
+    entity = world.create(1)[0]
+    world.add('position', [entity], q=1, r=1)
+    with pytest.raises(ValueError):
+        world.add('position', [entity, entity], q=[2, 3], r=0)
+    assert world.at(1, 1) == [entity]
+    assert world.query('position').column('position', 'q').tolist() == [1]
+
+
+def test_destroying_district_destroys_upgrades():
+    '''A district's upgrades go with it, so a reused id starts with empty slots'''
+    world = World()
+    district, other = _districts(world, 2).tolist()
+    upgrades = world.create(3)
+    world.add_upgrades(upgrades, [district, district, other], kind=1)
+    world.destroy([district])
+    assert len(world.components['upgrade']) == 1
+    assert len(world) == 2
+
+    reused = world.create(3)
+    assert district in reused.tolist()
+    world.add('district', reused, kind=0, tier=1, wealth=0, population=0)
+    assert world.slots_used(reused).tolist() == [0, 0, 0]
+    world.add_upgrades(world.create(3), district, kind=2)
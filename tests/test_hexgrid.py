@@ -18,3 +18,26 @@ def test_axial_to_cube():
     assert hexgrid.axial_to_cube(hexgrid.HexInfo(0, 1, True, 0)) == (0, 1, -1)
     assert hexgrid.axial_to_cube(hexgrid.HexInfo(1, 1, True, 0)) == (1, 1, -2)
     assert hexgrid.axial_to_cube(hexgrid.HexInfo(1, 1, False, 0)) == (1, 1, -2)
+
+
+def test_neighbors():
+    '''Test the neighbours of a hex'''
+    assert sorted(hexgrid.neighbors(0, 0)) == [(-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0)]
+    assert all(hexgrid.get_distance(hexgrid.HexInfo(2, 3, True, 0),
+                                    hexgrid.HexInfo(q, r, True, 0)) == 1
+               for q, r in hexgrid.neighbors(2, 3))
+
+
+def test_hexes_in_rect():
+    '''Every hex whose bounding box overlaps a rectangle is found'''
+    for flat in (True, False):
+        radius = 10
+        offset = (37, -12)
+        candidates = set(hexgrid.hexes_in_rect(40, 30, 120, 95, radius, flat, offset))
+        for q in range(-30, 30):
+            for r in range(-30, 30):
+                x, y = hexgrid.axial_to_pixel(hexgrid.HexInfo(q, r, flat, 0), radius, offset)
+                if x + radius >= 40 and x - radius < 120 and y + radius >= 30 and y - radius < 95:
+                    assert (q, r) in candidates
+        # The search stays local to the rectangle
+        assert len(candidates) < 100
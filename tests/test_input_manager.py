@@ -0,0 +1,62 @@
+'''Tests for the per-frame input coalescer'''
+import pygame
+
+from ffrontier.managers.controls_manager import ControlsManager
+from ffrontier.managers.input_manager import InputCoalescer
+
+
+def _coalescer() -> InputCoalescer:
+    controls = ControlsManager()
+    controls.add_mapping('test', pygame.K_w, 'camera_up', pygame.KEYDOWN)
+    controls.add_mapping('test', pygame.K_a, 'camera_left', pygame.KEYDOWN)
+    controls.add_mapping('test', pygame.K_MINUS, 'zoom_out', pygame.KEYDOWN)
+    controls.add_mapping('test', pygame.K_t, 'end_turn', pygame.KEYDOWN)
+    controls.set_context('test')
+    return InputCoalescer(controls)
+
+
+def _key(key: int) -> pygame.event.Event:
+    return pygame.event.Event(pygame.KEYDOWN, key=key, mod=0)
+
+
+def _motion(pos, rel, held=False) -> pygame.event.Event:
+    return pygame.event.Event(pygame.MOUSEMOTION, pos=pos, rel=rel,
+                              buttons=(1 if held else 0, 0, 0))
+
+
+def test_coalesce_motion(mocker):
+    '''Motion collapses to the final position and drags are summed'''
+    mocker.patch('pygame.key.get_mods', return_value=0)
+    frame = _coalescer().collect([_motion((10, 10), (1, 1)),
+                                  _motion((15, 12), (5, 2), held=True),
+                                  _motion((20, 20), (5, 8), held=True)])
+    assert frame.mouse_pos == (20, 20)
+    assert frame.drag == (10, 10)
+    assert not frame.events
+    assert not frame.is_empty
+
+
+def test_coalesce_commands(mocker):
+    '''Camera moves and zoom steps are summed, other commands and events pass through'''
+    mocker.patch('pygame.key.get_mods', return_value=0)
+    click = pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=(1, 1), button=1)
+    wheel = pygame.event.Event(pygame.MOUSEWHEEL, x=0, y=2, flipped=False)
+    frame = _coalescer().collect([_key(pygame.K_w), _key(pygame.K_w), click, _key(pygame.K_a),
+                                  _key(pygame.K_MINUS), wheel, _key(pygame.K_t)])
+    assert frame.camera == (10, 20)
+    assert frame.zoom == -1
+    assert frame.wheel == 1
+    assert frame.commands == ['end_turn']
+    assert frame.events[2] is click
+    assert wheel in frame.events
+    assert frame.motion is None
+    assert not frame.quit
+
+
+def test_coalesce_quit(mocker):
+    '''Quitting is noticed and an empty tick is empty'''
+    mocker.patch('pygame.key.get_mods', return_value=0)
+    coalescer = _coalescer()
+    assert coalescer.collect([]).is_empty
+    assert coalescer.collect([_key(pygame.K_ESCAPE)]).quit
+    assert coalescer.collect([pygame.event.Event(pygame.QUIT)]).quit
@@ -0,0 +1,88 @@
+'''Tests for the queue based log manager'''
+import logging
+import queue
+
+import pytest
+
+from ffrontier.managers.log_manager import (LogManager, OverflowQueueHandler, DROP_NEWEST,
+                                            DROP_OLDEST)
+
+
+def _record(message: str) -> logging.LogRecord:
+    return logging.LogRecord('test', logging.INFO, __file__, 0, message, None, None)
+
+
+def test_records_routed_to_their_files(tmp_path):
+    '''Each logger's records end up in its own file once the manager stops'''
+    manager = LogManager(ring_size=3)
+    manager.setup_logger('lm_game', str(tmp_path / 'game.log'), 'INFO')
+    manager.setup_logger('lm_ai', str(tmp_path / 'ai.log'), 'WARNING')
+    for i in range(5):
+        manager.get_logger('lm_game').info('game %d', i)
+    manager.get_logger('lm_ai').info('too quiet')
+    manager.get_logger('lm_ai').warning('ai warning')
+    manager.stop()
+
+    game = (tmp_path / 'game.log').read_text(encoding='utf-8').splitlines()
+    ai = (tmp_path / 'ai.log').read_text(encoding='utf-8').splitlines()
+    assert [line.rsplit(' - ', 1)[1] for line in game] == [f'game {i}' for i in range(5)]
+    assert len(ai) == 1 and ai[0].endswith('lm_ai - WARNING - ai warning')
+    assert [line.rsplit(' - ', 1)[1] for line in manager.recent()] == \
+        ['game 3', 'game 4', 'ai warning']
+    with pytest.raises(ValueError):
+        manager.setup_logger('lm_game', str(tmp_path / 'game.log'), 'INFO')
+
+
+@pytest.mark.parametrize('policy, kept', [(DROP_NEWEST, ['0', '1']), (DROP_OLDEST, ['3', '4'])])
+def test_full_queue_drops_records(policy, kept):
+    '''A full queue drops records by the policy instead of raising'''
+    log_queue: queue.Queue = queue.Queue(2)
+    handler = OverflowQueueHandler(log_queue, policy)
+    for i in range(5):
+        handler.handle(_record(str(i)))
+    assert handler.dropped == 3
+    assert [log_queue.get_nowait().getMessage() for _ in range(2)] == kept
+
+
+def test_unknown_policy():
+    '''Overflow policies are checked'''
+    with pytest.raises(ValueError):
+        LogManager(overflow='explode')
+
+
+def test_log_file_created_on_first_record(tmp_path):
+    '''Setting up a logger doesn't touch the disk until something is logged'''
+    log_file = tmp_path / 'nested' / 'late.log'
+    manager = LogManager()
+    manager.setup_logger('lm_late', str(log_file), 'INFO')
+    assert not log_file.parent.exists()
+    manager.get_logger('lm_late').info('now')
+    manager.stop()
+    assert log_file.read_text(encoding='utf-8').endswith('now\n')
+
+
+def test_child_records_reach_parent_files(tmp_path):
+    '''Records from child loggers are written by the set up loggers above them, once each'''
+    manager = LogManager()
+    manager.setup_logger('lm_parent', str(tmp_path / 'parent.log'), 'INFO')
+    manager.setup_logger('lm_parent.child', str(tmp_path / 'child.log'), 'INFO')
+    logging.getLogger('lm_parent.other').info('from other')
+    manager.get_logger('lm_parent.child').info('from child')
+    manager.stop()
+
+    parent = (tmp_path / 'parent.log').read_text(encoding='utf-8').splitlines()
+    child = (tmp_path / 'child.log').read_text(encoding='utf-8').splitlines()
+    assert [line.rsplit(' - ', 1)[1] for line in parent] == ['from other', 'from child']
+    assert [line.rsplit(' - ', 1)[1] for line in child] == ['from child']
+
+
+def test_queued_records_are_not_marked():
+    '''Records are tracked by the handler rather than given extra attributes'''
+    handler = OverflowQueueHandler(queue.Queue())
+    record = _record('hello')
+    fields = set(record.__dict__)
+    handler.emit(record)
+    handler.emit(record)
+    assert handler.queue.qsize() == 1
+    # Formatting the message is the only change
+    assert set(record.__dict__) - fields <= {'message'}
@@ -0,0 +1,52 @@
+'''Tests for the procedural map generator'''
+import pytest
+
+from ffrontier.game.maphandler import MapHandler
+from ffrontier.hex.tileutils import TileMap
+from ffrontier.tools import mapgen
+
+
+def test_generate_hexagon(tmp_path, mocker):
+    '''A generated hexagon map loads as a complete TileMap'''
+    path = str(tmp_path / 'map.ffm')
+    assert mapgen.generate_map(path, radius=3, seed=1) == 37
+    map_handler = MapHandler(path)
+    assert len(map_handler.map_data) == 37
+    assert map_handler.flat is True
+    tile_map = TileMap(mocker.MagicMock(), path)
+    assert len(tile_map.tiles) == 37
+
+
+def test_generate_reproducible(tmp_path):
+    '''The same seed gives the same map and a different seed a different one'''
+    paths = [str(tmp_path / name) for name in ('a.ffm', 'b.ffm', 'c.ffm')]
+    mapgen.generate_map(paths[0], radius=5, seed=7)
+    mapgen.generate_map(paths[1], radius=5, seed=7)
+    mapgen.generate_map(paths[2], radius=5, seed=8)
+    contents = [open(path, encoding='utf-8').read() for path in paths]
+    assert contents[0] == contents[1]
+    assert contents[0] != contents[2]
+
+
+def test_generate_distribution(tmp_path):
+    '''Custom distributions are followed'''
+    path = str(tmp_path / 'map.ffm')
+    distribution = {'terrains': [{'layers': [{'image': 'water'}], 'color': '#0000ff', 'weight': 1}],
+                    'borders': [{'border': 2, 'weight': 1}],
+                    'features': [{'name': 'boat', 'chance': 1.0}]}
+    mapgen.generate_map(path, 'parallelogram', width=4, height=3, flat=False,
+                        distribution=distribution)
+    map_handler = MapHandler(path)
+    assert map_handler.flat is False
+    assert len(map_handler.map_data) == 12
+    assert all(tile['layers'] == [{'image': 'water'}] and tile['color'] == (0, 0, 255, 255) and
+               tile['border'] == 2 and tile['features'] == ['boat']
+               for tile in map_handler.map_data)
+
+
+def test_generate_bad_format(tmp_path):
+    '''Unknown file formats and shapes are rejected'''
+    with pytest.raises(ValueError):
+        mapgen.generate_map(str(tmp_path / 'map.csv'))
+    with pytest.raises(ValueError):
+        mapgen.generate_map(str(tmp_path / 'map.ffm'), 'triangle')
@@ -1,7 +1,11 @@
 '''Tests the MapHandler class'''
+import json
+import os
+
 import pytest
 from jsonschema.exceptions import ValidationError
 
+from ffrontier.game import maphandler
 from ffrontier.game.maphandler import MapHandler
 
 
@@ -34,3 +38,199 @@ def test_map_handler_missing_file():
     # This should raise an exception
     with pytest.raises(FileNotFoundError) as e:  # noqa
         MapHandler('tests/testing_assets/test_map_missing.csv')
+
+
+def _write_map(path, lines):
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return str(path)
+
+
+BASIC_MAP = ['{"orientation": false}',
+             '{"coordinates": [0, 0], "layers": [{"image": "grass"}], "color": "#ff000080"}',
+             '{"coordinates": [1, 0], "features": ["farm"], "border": 1}']
+
+
+def test_map_handler_save_roundtrip(tmp_path):
+    '''Saving and reloading keeps the map data and orientation'''
+    map_file = _write_map(tmp_path / 'map.ffm', BASIC_MAP)
+    map_handler = MapHandler(map_file)
+    map_handler.map_data[1]['color'] = (0, 255, 0, 255)
+    map_handler.save_map()
+
+    reloaded = MapHandler(map_file)
+    assert reloaded.flat is False
+    assert reloaded.map_data == map_handler.map_data
+    assert reloaded.map_data[0]['color'] == (255, 0, 0, 128)
+    # No temporary files should be left behind
+    assert [p.name for p in tmp_path.iterdir()] == ['map.ffm']
+
+
+def test_map_handler_seed_saved(tmp_path):
+    '''The game seed is read from and written to the header, and kept by the cache'''
+    map_file = _write_map(tmp_path / 'map.ffm', BASIC_MAP)
+    map_handler = MapHandler(map_file, cache_dir=str(tmp_path / 'cache'))
+    assert map_handler.seed is None
+    map_handler.seed = 2 ** 100 + 7
+    map_handler.save_map()
+    assert MapHandler(map_file).seed == 2 ** 100 + 7
+    MapHandler(map_file, cache_dir=str(tmp_path / 'cache'))
+    cached = MapHandler(map_file, cache_dir=str(tmp_path / 'cache'))
+    assert cached.from_cache and cached.seed == 2 ** 100 + 7
+
+
+def test_map_handler_seed_float(tmp_path):
+    '''A whole-number float seed is read as an int, and a fractional one is rejected'''
+    tiles = BASIC_MAP[1:]
+    map_file = _write_map(tmp_path / 'map.ffm', ['{"orientation": false, "seed": 5.0}'] + tiles)
+    seed = MapHandler(map_file).seed
+    assert seed == 5 and isinstance(seed, int)
+    map_file = _write_map(tmp_path / 'bad.ffm', ['{"orientation": false, "seed": 5.5}'] + tiles)
+    with pytest.raises(ValidationError):
+        MapHandler(map_file)
+
+
+def test_map_handler_save_keeps_mode(tmp_path):
+    '''Saving keeps an existing map's permissions, and new files follow the umask'''
+    map_file = _write_map(tmp_path / 'map.ffm', BASIC_MAP)
+    os.chmod(map_file, 0o644)
+    MapHandler(map_file).save_map()
+    assert os.stat(map_file).st_mode & 0o777 == 0o644
+
+    umask = os.umask(0o022)
+    try:
+        maphandler.write_lines_atomic(str(tmp_path / 'new.ffm'), ['{}'])
+    finally:
+        os.umask(umask)
+    assert os.stat(tmp_path / 'new.ffm').st_mode & 0o777 == 0o644
+
+
+def test_map_handler_save_streams_tiles(tmp_path):
+    '''save_map accepts any iterable of tiles, such as a generator'''
+    map_file = _write_map(tmp_path / 'map.ffm', BASIC_MAP)
+    map_handler = MapHandler(map_file)
+    map_handler.save_map(tile for tile in map_handler.map_data[:1])
+    assert len(MapHandler(map_file).map_data) == 1
+
+
+def test_map_handler_compact_after_full_save(tmp_path):
+    '''Tiles written by a full save aren't reverted by a later compaction'''
+    map_file = _write_map(tmp_path / 'map.ffm', BASIC_MAP)
+    map_handler = MapHandler(map_file)
+    edited = [dict(tile, features=['mine']) for tile in map_handler.map_data]
+    map_handler.save_map(iter(edited))
+    map_handler.compact()
+    assert [tile['features'] for tile in MapHandler(map_file).map_data] == [['mine'], ['mine']]
+
+
+def test_map_handler_delta_log(tmp_path):
+    '''Appended deltas are replayed on load and folded in by compaction'''
+    map_file = _write_map(tmp_path / 'map.ffm', BASIC_MAP)
+    map_handler = MapHandler(map_file)
+    changed = dict(map_handler.map_data[1], features=['mine'])
+    assert map_handler.append_delta([changed]) == 1
+    original = (tmp_path / 'map.ffm').read_text(encoding='utf-8')
+
+    reloaded = MapHandler(map_file)
+    assert reloaded.delta_records == 1
+    assert reloaded.map_data[1]['features'] == ['mine']
+    assert len(reloaded.map_data) == 2
+    # The map file itself is untouched until compaction
+    assert (tmp_path / 'map.ffm').read_text(encoding='utf-8') == original
+
+    reloaded.compact()
+    assert not (tmp_path / 'map.ffm.delta').exists()
+    assert MapHandler(map_file).map_data == reloaded.map_data
+
+
+def test_map_handler_stale_delta_ignored(tmp_path):
+    '''A delta log left behind by a crash during a full save doesn't undo newer edits'''
+    map_file = _write_map(tmp_path / 'map.ffm', BASIC_MAP)
+    map_handler = MapHandler(map_file)
+    map_handler.append_delta([dict(map_handler.map_data[1], features=['mine'])])
+    stale = (tmp_path / 'map.ffm.delta').read_text(encoding='utf-8')
+    map_handler.save_map([dict(map_handler.map_data[1], features=['farm']),
+                          map_handler.map_data[0]])
+    # As if the crash came between replacing the map and removing the delta log
+    (tmp_path / 'map.ffm.delta').write_text(stale, encoding='utf-8')
+
+    reloaded = MapHandler(map_file)
+    assert reloaded.generation == 1 and reloaded.delta_records == 0
+    assert reloaded.map_data[0]['features'] == ['farm']
+    reloaded.append_delta([dict(reloaded.map_data[0], border=5)])
+    assert MapHandler(map_file).map_data[0]['border'] == 5
+
+
+def test_map_handler_torn_delta(tmp_path):
+    '''A partially written last delta record is ignored'''
+    map_file = _write_map(tmp_path / 'map.ffm', BASIC_MAP)
+    (tmp_path / 'map.ffm.delta').write_text('{"coordinates": [0, 0], "border": 3}\n'
+                                            '{"coordinates": [1, 0], "bor', encoding='utf-8')
+    map_handler = MapHandler(map_file)
+    assert map_handler.delta_records == 1
+    assert map_handler.map_data[0]['border'] == 3
+    assert map_handler.map_data[1]['border'] == 1
+
+
+def test_map_handler_cache(tmp_path, mocker):
+    '''An unchanged map is loaded from the cache without parsing'''
+    map_file = _write_map(tmp_path / 'map.ffm', BASIC_MAP)
+    cache_dir = str(tmp_path / 'cache')
+    first = MapHandler(map_file, cache_dir=cache_dir)
+    assert first.from_cache is False
+
+    loads = mocker.spy(json, 'loads')
+    second = MapHandler(map_file, cache_dir=cache_dir)
+    assert second.from_cache is True
+    assert loads.call_count == 0
+    assert second.map_data == first.map_data
+    assert second.flat is False
+
+
+def test_map_handler_cache_invalidated(tmp_path):
+    '''Changing the map invalidates the cache, while only touching it does not'''
+    map_file = _write_map(tmp_path / 'map.ffm', BASIC_MAP)
+    cache_dir = str(tmp_path / 'cache')
+    MapHandler(map_file, cache_dir=cache_dir)
+
+    stat = os.stat(map_file)
+    os.utime(map_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert MapHandler(map_file, cache_dir=cache_dir).from_cache is True
+
+    _write_map(tmp_path / 'map.ffm', BASIC_MAP[:2])
+    changed = MapHandler(map_file, cache_dir=cache_dir)
+    assert changed.from_cache is False
+    assert len(changed.map_data) == 1
+
+
+def test_map_handler_corrupt_cache(tmp_path):
+    '''A corrupt cache falls back to a full parse and is rewritten'''
+    map_file = _write_map(tmp_path / 'map.ffm', BASIC_MAP)
+    cache_dir = str(tmp_path / 'cache')
+    handler = MapHandler(map_file, cache_dir=cache_dir)
+    with open(handler.cache_file, 'wb') as file:
+        file.write(b'not a pickle')
+    assert MapHandler(map_file, cache_dir=cache_dir).from_cache is False
+    assert MapHandler(map_file, cache_dir=cache_dir).from_cache is True
+
+
+def test_map_handler_parallel(tmp_path, monkeypatch):
+    '''Parallel loading returns the same tiles as a serial load, in coordinate order'''
+    monkeypatch.setattr(maphandler, 'PARALLEL_MIN_BYTES', 0)
+    lines = ['{"orientation": true}']
+    lines += [f'{{"coordinates": [{q}, {r}], "border": {abs(q * r) % 3}}}'
+              for q in range(4, -4, -1) for r in range(-4, 4)]
+    lines.append(lines[5])
+    map_file = _write_map(tmp_path / 'map.ffm', lines)
+
+    serial = MapHandler(map_file)
+    parallel = MapHandler(map_file, workers=3)
+    assert parallel.flat is True
+    assert len(parallel.map_data) == len(serial.map_data) == 65
+    assert parallel.map_data == sorted(serial.map_data, key=lambda tile: tile['coordinates'])
+
+
+def test_map_handler_parallel_bad_validation(monkeypatch):
+    '''Validation errors in worker processes reach the caller'''
+    monkeypatch.setattr(maphandler, 'PARALLEL_MIN_BYTES', 0)
+    with pytest.raises(ValidationError):
+        MapHandler('tests/testing_assets/test_map_bad.csv', workers=2)
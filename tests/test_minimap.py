@@ -0,0 +1,74 @@
+'''Tests for the minimap'''
+import pygame
+import pytest
+
+from ffrontier.hex.canvas import HexCanvas
+from ffrontier.hex.tileutils import TileMap
+from ffrontier.managers.asset_manager import AssetManager
+from ffrontier.ui.minimap import Minimap
+
+MAP_FILE = 'ffrontier/assets/maps/city/basic1.ffm'
+ASSET_FILE = 'ffrontier/assets/configs/city_assets.json'
+VIEW_SIZE = (400, 300)
+
+
+@pytest.fixture(name='minimap')
+def fixture_minimap():
+    '''A minimap of the basic city map in the corner of the screen'''
+    assets = AssetManager(ASSET_FILE)
+    canvas = HexCanvas(assets, TileMap(assets, MAP_FILE))
+    canvas.vp_pos = (VIEW_SIZE[0] // 2 - canvas.offset[0], VIEW_SIZE[1] // 2 - canvas.offset[1])
+    return Minimap(canvas, pygame.Rect(600, 400, 180, 180), VIEW_SIZE)
+
+
+def _tile_pixel(minimap: Minimap, coordinates):
+    '''Get a screen pixel inside a tile's cell'''
+    x, y = minimap.to_minimap(_tile_center(minimap, coordinates))
+    return int(x) + minimap.rect.x, int(y) + minimap.rect.y
+
+
+def _tile_center(minimap: Minimap, coordinates):
+    '''Get the center of a tile on the map, relative to tile (0, 0)'''
+    rect = minimap.canvas.tile_rect(coordinates)
+    origin = minimap.canvas.origin
+    return rect.centerx - origin[0], rect.centery - origin[1]
+
+
+def test_update_repaints_changed_tiles(minimap, mocker):
+    '''Only tiles reported by the change journal are painted again'''
+    assert minimap.update()
+    assert not minimap.update()
+    draw_tile = mocker.spy(minimap, '_draw_tile')
+    minimap.canvas.tilemap.set_layers((1, -1), [])
+    minimap.canvas.tilemap.set_color((1, -1), (0, 0, 255, 255))
+    minimap.canvas.tilemap.set_border((1, -1), 0)
+    assert minimap.has_updates
+    assert minimap.update()
+    draw_tile.assert_called_once_with((1, -1))
+
+    screen = pygame.Surface((800, 600))
+    minimap.draw(screen)
+    assert screen.get_at(_tile_pixel(minimap, (1, -1)))[:3] == (0, 0, 255)
+
+
+def test_view_rect_follows_viewport(minimap):
+    '''Panning the canvas moves the view outline'''
+    minimap.update()
+    before = minimap.view_rect
+    minimap.canvas.pan((-50, 0), VIEW_SIZE)
+    assert minimap.has_updates
+    assert minimap.update()
+    assert minimap.view_rect.x > before.x
+
+
+def test_click_jumps_camera(minimap):
+    '''Clicking the minimap centers the viewport on that part of the map'''
+    minimap.canvas.pan((-100, -100), VIEW_SIZE)
+    pos = _tile_pixel(minimap, (0, 0))
+    event = pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=pos, button=1)
+    assert minimap.handle_event(event)
+    center = (VIEW_SIZE[0] // 2, VIEW_SIZE[1] // 2)
+    assert minimap.canvas.tilemap.check_collision(center, minimap.canvas.origin) == (0, 0)
+    assert minimap.handle_event(pygame.event.Event(pygame.MOUSEBUTTONUP, pos=pos, button=1))
+    outside = pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=(10, 10), button=1)
+    assert not minimap.handle_event(outside)
@@ -0,0 +1,66 @@
+'''Tests for the batched population draws'''
+import numpy as np
+
+from ffrontier.game.economy import Economy
+from ffrontier.game.population import Population
+
+
+def _economy():
+    economy = Economy()
+    for i in range(200):
+        economy.add_district('residential', population=1000 + i, education=(i % 5) / 4)
+    return economy
+
+
+def test_same_seed_and_turn_reproduce_exactly():
+    '''The draws depend only on the seed, the turn and the state'''
+    first, second = _economy(), _economy()
+    reports = [Population(1234).resolve_turn(economy, 7) for economy in (first, second)]
+    for name in ('births', 'deaths', 'new_thinkers', 'new_wizards'):
+        assert np.array_equal(getattr(reports[0], name), getattr(reports[1], name))
+    assert np.array_equal(first.districts.view('population'),
+                          second.districts.view('population'))
+
+    other = Population(1234).resolve_turn(_economy(), 8)
+    assert not np.array_equal(other.new_thinkers, reports[0].new_thinkers)
+
+
+def test_population_changes_and_education_matters():
+    '''Births and deaths update districts, and the uneducated produce no thinkers'''
+    economy = _economy()
+    before = economy.districts.view('population').copy()
+    report = Population(1).resolve_turn(economy, 0)
+    assert np.array_equal(economy.districts.view('population'),
+                          before + report.births - report.deaths)
+    uneducated = np.arange(200) % 5 == 0
+    assert not report.thinkers[uneducated].any() and not report.wizards[uneducated].any()
+    assert np.array_equal(report.thinkers, report.new_thinkers)
+    assert report.total_thinkers > report.total_wizards > 0
+
+
+def test_removed_districts_drop_out():
+    '''Removed districts don't draw, and the report follows the remaining districts'''
+    economy = _economy()
+    economy.remove_district(3)
+    report = Population(1).resolve_turn(economy, 0)
+    assert len(report.births) == len(economy.districts) == 199
+    assert 3 not in economy.districts.active_entities.tolist()
+    assert np.array_equal(economy.districts.view('thinkers'), report.thinkers)
+
+
+def test_thinkers_and_wizards_stay():
+    '''Thinkers and wizards are kept per district and only leave by dying'''
+    economy = _economy()
+    people = Population(5)
+    first = people.resolve_turn(economy, 0)
+    assert np.array_equal(economy.districts.view('thinkers'), first.new_thinkers)
+    second = people.resolve_turn(economy, 1)
+    assert second.total_thinkers > first.total_thinkers
+    assert (second.thinkers <= first.thinkers + second.new_thinkers).all()
+    assert np.array_equal(economy.districts.view('wizards'), second.wizards)
+    assert (second.thinkers + second.wizards <= economy.districts.view('population')).all()
+
+    # Fewer people than researchers left, after the population was cut
+    economy.set_district(0, population=0)
+    third = people.resolve_turn(economy, 2)
+    assert third.thinkers[0] == third.wizards[0] == 0
@@ -0,0 +1,110 @@
+'''Tests for the profiler and its overlay'''
+import json
+
+import pygame
+
+from ffrontier.ui.profiler_overlay import ProfilerOverlay
+from ffrontier.utils.profiling import Profiler
+
+
+def test_disabled_profiler_records_nothing():
+    '''While off, spans and counters are no-ops'''
+    profiler = Profiler()
+    calls = []
+    timed = profiler.timed('work')(lambda x: calls.append(x) or x * 2)
+    with profiler.span('block'):
+        profiler.count('things')
+    assert timed(3) == 6
+    profiler.begin_frame()
+    profiler.end_frame()
+    assert calls == [3]
+    assert not profiler.timers and not profiler.counters
+    assert not profiler.frame_times
+
+
+def test_profiler_collects_per_frame():
+    '''Timers and counters are kept per frame and averaged over the window'''
+    profiler = Profiler(window=4)
+    profiler.set_enabled(True)
+    timed = profiler.timed('work')(lambda: None)
+    for frame in range(6):
+        profiler.begin_frame()
+        with profiler.span('block'):
+            timed()
+        profiler.count('things', frame)
+        profiler.count('cache.hit', 3)
+        profiler.count('cache.miss')
+        profiler.end_frame()
+    assert len(profiler.frame_times) == 4
+    # Frames 2 to 5 are in the window
+    assert profiler.counter_averages()['things'] == 3.5
+    assert profiler.hit_rates() == {'cache': 0.75}
+    assert set(profiler.timer_averages()) == {'block', 'work'}
+    labels = [label for label, _ in profiler.summary()]
+    assert labels[0] == 'frame ms'
+    assert 'things' in labels and 'cache' in labels and 'cache.hit' not in labels
+
+
+def test_percentiles_nearest_rank():
+    '''Percentiles pick the nearest rank of the sorted frame times'''
+    profiler = Profiler()
+    profiler.frame_times.extend(float(ms) for ms in range(1, 101))
+    assert profiler.percentiles((50, 95, 99, 100)) == {50: 50.0, 95: 95.0, 99: 99.0, 100: 100.0}
+    assert Profiler().percentiles((50,)) == {50: 0.0}
+
+
+def test_overlay_switches_profiler():
+    '''Showing the overlay turns the profiler on, and it never shrinks while shown'''
+    pygame.font.init()
+    profiler = Profiler()
+    overlay = ProfilerOverlay(profiler)
+    screen = pygame.Surface((400, 300))
+    assert overlay.draw(screen) == []
+    overlay.toggle()
+    assert profiler.enabled
+    for name in ('a', 'bb', 'ccc'):
+        profiler.count(name)
+    profiler.begin_frame()
+    profiler.end_frame()
+    big = overlay.draw(screen, now=0)[0]
+    profiler.reset()
+    assert overlay.draw(screen, now=1000)[0].size == big.size
+    overlay.toggle()
+    assert not profiler.enabled
+    assert overlay.draw(screen) == []
+
+
+def test_trace_export(tmp_path):
+    '''Traced spans are kept in a bounded buffer and written as Chrome trace events'''
+    profiler = Profiler()
+    profiler.start_trace(size=3)
+    assert profiler.enabled and not profiler.collecting
+    profiler.begin_frame()
+    for name in ('map.load', 'canvas.draw', 'canvas.draw', 'gui.draw'):
+        with profiler.span(name):
+            pass
+    profiler.count('things')
+    profiler.end_frame()
+    profiler.stop_trace()
+    assert not profiler.enabled
+    # Tracing alone doesn't collect statistics
+    assert not profiler.frame_times and not profiler.counters
+
+    path = tmp_path / 'traces' / 'trace.json'
+    assert profiler.export_trace(str(path)) == 3
+    events = json.loads(path.read_text(encoding='utf-8'))['traceEvents']
+    assert [event['name'] for event in events] == ['canvas.draw', 'gui.draw', 'frame']
+    assert all(event['ph'] == 'X' and event['dur'] >= 0 for event in events)
+    assert events[0]['cat'] == 'canvas'
+    assert events[2]['ts'] <= events[0]['ts']
+
+
+def test_trace_files_are_unique(tmp_path, monkeypatch):
+    '''Traces saved in the same millisecond get different files'''
+    monkeypatch.setattr('time.time', lambda: 1_700_000_000.25)
+    paths = []
+    for _ in range(3):
+        paths.append(Profiler.trace_file(str(tmp_path)))
+        Profiler().export_trace(paths[-1])
+    assert len(set(paths)) == 3
+    assert paths[0].endswith('250.json') and paths[2].endswith('250-2.json')
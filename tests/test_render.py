@@ -0,0 +1,68 @@
+'''Tests for the headless map renderer'''
+import pygame
+
+from ffrontier.hex.tileutils import Tile
+from ffrontier.tools import mapgen, render
+
+MAP_FILE = 'ffrontier/assets/maps/city/basic1.ffm'
+
+
+def test_render_whole_map():
+    '''A whole map render covers every tile and has no canvas outline'''
+    render.init_headless()
+    canvas = render.load_canvas(MAP_FILE, scale=40)
+    surface = render.render_map(canvas)
+    assert surface.get_size() == render.map_bounds(canvas).size
+    # The center of tile (0, 0) is drawn
+    bounds = render.map_bounds(canvas)
+    assert surface.get_at((-bounds.x, -bounds.y))[:3] != (0, 0, 0)
+    # The corners are outside every hex
+    assert surface.get_at((0, 0))[:3] == (0, 0, 0)
+
+
+def test_default_render_draws_tile_images(mocker):
+    '''Renders at the default scale draw the tile art rather than averaged color blocks'''
+    render.init_headless()
+    canvas = render.load_canvas(MAP_FILE)
+    draw = mocker.spy(Tile, 'draw')
+    render.render_map(canvas)
+    assert draw.call_count == len(canvas.tilemap.tiles)
+
+
+def test_render_region():
+    '''A region renders the same pixels as that part of the whole map'''
+    render.init_headless()
+    canvas = render.load_canvas(MAP_FILE, scale=40)
+    whole = render.render_map(canvas)
+    bounds = render.map_bounds(canvas)
+    region = pygame.Rect(-30, -20, 50, 40)
+    part = render.render_map(canvas, region)
+    assert part.get_size() == (50, 40)
+    expected = whole.subsurface(region.move(-bounds.x, -bounds.y))
+    assert bytes(part.get_view('2')) == bytes(expected.copy().get_view('2'))
+
+
+def test_thumbnail_in_chunks(monkeypatch):
+    '''Thumbnails of maps bigger than a chunk are shrunk a chunk at a time'''
+    render.init_headless()
+    canvas = render.load_canvas(MAP_FILE, scale=100)
+    monkeypatch.setattr(render, 'CHUNK_SIZE', 64)
+    draw = []
+    monkeypatch.setattr(canvas, 'draw', lambda surface, size: draw.append(size))
+    thumbnail = render.render_thumbnail(canvas, 100)
+    assert max(thumbnail.get_size()) == 100
+    assert len(draw) > 1
+    assert all(max(size) <= 64 for size in draw)
+
+
+def test_cli_renders_directory(tmp_path):
+    '''The CLI writes a PNG for every map in a directory'''
+    maps = tmp_path / 'maps'
+    maps.mkdir()
+    for name, seed in (('a', 1), ('b', 2)):
+        mapgen.generate_map(str(maps / f'{name}.ffm'), radius=4, seed=seed)
+    (maps / 'notes.txt').write_text('not a map', encoding='utf-8')
+    output = tmp_path / 'thumbs'
+    assert render.main([str(maps), str(output), '--size', '64', '--workers', '1']) == 0
+    assert sorted(path.name for path in output.iterdir()) == ['a.png', 'b.png']
+    assert max(pygame.image.load(str(output / 'a.png')).get_size()) <= 64
@@ -0,0 +1,72 @@
+'''Tests for the research trees'''
+import pytest
+
+from ffrontier.game.research import Research, ResearchTree, Topic
+
+RESEARCH_FILE = 'ffrontier/assets/configs/research.json'
+
+
+def _topic(name, requires=(), tree='tech', cost=10):
+    return Topic(name, name, tree, 1, cost, tuple(requires))
+
+
+def test_topological_order_and_closures():
+    '''Prerequisites come first and closures include indirect ones'''
+    tree = ResearchTree([_topic('c', ['b']), _topic('b', ['a']), _topic('a'), _topic('d')])
+    assert [topic.name for topic in tree.topics] == ['a', 'd', 'b', 'c']
+    assert tree.names(tree.closures[tree.index['c']]) == ['a', 'b']
+    assert tree.names(tree.dependents[tree.index['a']]) == ['b']
+
+
+def test_queries_are_bitset_operations():
+    '''Availability, unlocks and paths follow the prerequisites'''
+    tree = ResearchTree.load(RESEARCH_FILE)
+    done = tree.mask(['architecture_1', 'architecture_2'])
+    available = tree.names(tree.available(done))
+    assert 'concrete' in available and 'architecture_3' in available
+    assert 'architecture_1' not in available and 'multi_story' not in available
+    assert tree.names(tree.unlocks(tree.index['concrete'], done)) == []
+    assert tree.names(tree.unlocks(tree.index['architecture_3'],
+                                   done | tree.mask(['concrete']))) == ['multi_story']
+    assert tree.names(tree.path_to(tree.index['multi_story'], done)) == \
+        ['architecture_3', 'concrete', 'multi_story']
+    # Asking again is a lookup
+    assert tree.available(done) is tree.available(done)
+
+
+def test_accumulate_finishes_queued_topics():
+    '''A turn of thinkers and wizards pays for queued topics and carries the rest over'''
+    research = Research(ResearchTree.load(RESEARCH_FILE))
+    assert research.set_goal('architecture_2') == ['architecture_1', 'architecture_2']
+    research.set_goal('earth_magic_1')
+    assert research.accumulate(thinkers=50, wizards=30) == ['architecture_1']
+    assert research.progress[research.tree.index['architecture_2']] == 10
+    assert research.stored['magic'] == 0
+    assert research.accumulate(thinkers=80, wizards=70) == ['architecture_2', 'arcane_theory',
+                                                            'earth_magic_1']
+    assert research.is_done('earth_magic_1') and not research.is_done('concrete')
+    # Nothing queued, so the points wait
+    assert research.accumulate(thinkers=5, wizards=0) == []
+    assert research.stored['tech'] == 5
+
+
+def test_completing_queued_topic_unblocks_queue():
+    '''A queued topic finished some other way leaves the queue instead of stalling it'''
+    research = Research(ResearchTree.load(RESEARCH_FILE))
+    research.set_goal('architecture_2')
+    research.complete(research.tree.index['architecture_1'])
+    assert [research.tree.topics[i].name for i in research.queues['tech']] == \
+        ['architecture_2']
+    assert research.accumulate(thinkers=1000, wizards=0) == ['architecture_2']
+
+
+@pytest.mark.parametrize('topics', [
+    [_topic('a', ['b']), _topic('b', ['a'])],
+    [_topic('a', ['missing'])],
+    [_topic('a'), _topic('a')],
+    [_topic('a', tree='alchemy')],
+])
+def test_invalid_trees(topics):
+    '''Cycles, unknown prerequisites, duplicates and unknown trees are rejected'''
+    with pytest.raises(ValueError):
+        ResearchTree(topics)
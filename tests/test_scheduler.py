@@ -0,0 +1,52 @@
+'''Tests for the frame scheduler'''
+from ffrontier.ui import scheduler
+
+
+class FakeClock:
+    '''Records the frame rates the scheduler ticks at'''
+    def __init__(self):
+        self.rates = []
+
+    def tick(self, rate):
+        self.rates.append(rate)
+        return 16
+
+
+def test_scheduler_idles_when_clean():
+    '''The scheduler renders after an invalidation, then settles down to the idle rate'''
+    now = [0]
+    clock = FakeClock()
+    frames = scheduler.FrameScheduler(60, 5, settle_ms=100, clock=clock,
+                                      time_source=lambda: now[0])
+    # The first frame is always drawn
+    assert frames.should_render()
+    assert frames.consume() == {scheduler.UI}
+    assert frames.tick() == 0.016
+
+    now[0] = 150
+    assert not frames.should_render()
+    frames.tick()
+    assert clock.rates == [60, 5]
+
+    frames.invalidate(scheduler.ZOOM)
+    frames.invalidate(scheduler.INPUT)
+    assert frames.should_render()
+    assert frames.consume() == {scheduler.ZOOM, scheduler.INPUT}
+    # Still inside the settle period, so keep rendering at the full rate
+    now[0] = 200
+    assert frames.should_render()
+    frames.tick()
+    now[0] = 300
+    assert not frames.should_render()
+    frames.tick()
+    assert clock.rates == [60, 5, 60, 5]
+
+
+def test_scheduler_set_rates():
+    '''Frame rates can be changed at runtime'''
+    clock = FakeClock()
+    frames = scheduler.FrameScheduler(60, 5, clock=clock, time_source=lambda: 0)
+    frames.set_rates(fps=30)
+    frames.tick()
+    assert clock.rates == [30]
+    assert frames.idle_fps == 5
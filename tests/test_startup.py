@@ -0,0 +1,22 @@
+'''Tests for the startup timer'''
+import io
+
+from ffrontier.utils.startup import StartupTimer
+
+
+def test_phases_and_marks(mocker):
+    '''Phases record their offset from the start and their duration'''
+    clock = mocker.patch('ffrontier.utils.startup.time.perf_counter',
+                         side_effect=[10.0, 10.5, 11.0, 11.25, 12.0])
+    timer = StartupTimer()
+    with timer.phase('imports'):
+        pass
+    timer.mark('window')
+    assert timer.phases == [('imports', 0.5, 0.5), ('window', 1.0, 0.25)]
+
+    out = io.StringIO()
+    timer.report(out)
+    lines = out.getvalue().splitlines()
+    assert lines[1].split() == ['imports', '500.0', '500.0']
+    assert lines[-1].split() == ['total', '2000.0']
+    assert clock.call_count == 5
@@ -1,8 +1,12 @@
 '''Tests tilemap and tile functionality'''
+import os
+
 import pytest
 
+from ffrontier.game.maphandler import MapHandler
 from ffrontier.hex.tileutils import Tile, TileMap, IncompleteGridError, DuplicateTileError, Layer
 from ffrontier.hex.hexgrid import HexInfo
+from ffrontier.hex.journal import TileChange
 
 
 def test_tile():
@@ -103,3 +107,117 @@ def test_collision_pointy():
     hex_info = HexInfo(0, 0, False, 0)
     assert hex_info.collides(9, 0, 10) is False
     assert hex_info.collides(0, 9, 10) is True
+
+
+def test_tile_map_features(mocker):
+    '''Test that tile features are carried over from the map data'''
+    MockDependency = mocker.patch('ffrontier.hex.tileutils.MapHandler')
+    mock_instance = MockDependency.return_value
+    mock_instance.flat = True
+    mock_instance.map_data = [{'coordinates': (0, 0), 'layers': [], 'features': ['tree', 'rock'],
+                               'border': 0, 'color': (255, 255, 255, 255)}]
+    tile_map = TileMap(mocker.MagicMock(), 'fake_map_file')
+    assert tile_map.tiles[(0, 0)].features == ['tree', 'rock']
+
+
+def test_tile_map_change_journal(mocker):
+    '''Test that tile mutations are recorded in the change journal for each subscriber'''
+    MockDependency = mocker.patch('ffrontier.hex.tileutils.MapHandler')
+    mock_instance = MockDependency.return_value
+    mock_instance.flat = True
+    mock_instance.map_data = [{'coordinates': (0, 0), 'layers': [], 'features': [],
+                               'border': 0, 'color': (255, 255, 255, 255)}]
+    tile_map = TileMap(mocker.MagicMock(), 'fake_map_file')
+    tile_map.journal.subscribe('canvas')
+
+    tile_map.set_layers((0, 0), [Layer('grass', 128)])
+    tile_map.set_color((0, 0), (255, 0, 0, 255))
+    assert tile_map.tiles[(0, 0)].images[0].alpha == 128
+    assert tile_map.tiles[(0, 0)].hex_info.color == (255, 0, 0, 255)
+    assert tile_map.journal.drain('canvas') == {(0, 0): TileChange.LAYERS | TileChange.COLOR}
+
+    tile_map.set_border((0, 0), 2)
+    tile_map.set_features((0, 0), ['farm'])
+    assert tile_map.journal.drain('canvas') == {(0, 0): TileChange.BORDER | TileChange.FEATURES}
+    # The saver has not drained yet, so it still sees everything
+    assert tile_map.journal.drain('saver') == {(0, 0): TileChange.ALL}
+    assert not tile_map.journal.has_changes('saver')
+    for method in (tile_map.journal.has_changes, tile_map.journal.drain):
+        with pytest.raises(ValueError):
+            method('missing')
+
+    with pytest.raises(KeyError):
+        tile_map.set_color((5, 5), (0, 0, 0, 0))
+
+
+def test_tile_map_incremental_save(mocker, tmp_path):
+    '''Saving only appends the tiles changed since the last save'''
+    map_file = tmp_path / 'map.ffm'
+    coords = [(0, 0), (1, 0), (-1, 1), (0, 1), (-1, 0), (0, -1), (1, -1)]
+    map_file.write_text('{"orientation": true}\n' +
+                        ''.join(f'{{"coordinates": [{q}, {r}]}}\n' for q, r in coords),
+                        encoding='utf-8')
+    tile_map = TileMap(mocker.MagicMock(), str(map_file))
+    tile_map.set_features((1, 0), ['farm'])
+    tile_map.save()
+
+    delta = (tmp_path / 'map.ffm.delta').read_text(encoding='utf-8').splitlines()
+    assert len(delta) == 1
+    assert TileMap(mocker.MagicMock(), str(map_file)).tiles[(1, 0)].features == ['farm']
+
+    tile_map.set_layers((0, 0), [Layer('grass', 100)])
+    tile_map.save(full=True)
+    assert not (tmp_path / 'map.ffm.delta').exists()
+    reloaded = TileMap(mocker.MagicMock(), str(map_file))
+    assert reloaded.tiles[(0, 0)].images[0].alpha == 100
+    assert reloaded.tiles[(1, 0)].features == ['farm']
+
+
+def test_tile_map_failed_save_keeps_changes(mocker, tmp_path):
+    '''Changes from a save that failed are saved by the next one'''
+    map_file = tmp_path / 'map.ffm'
+    coords = [(0, 0), (1, 0), (-1, 1), (0, 1), (-1, 0), (0, -1), (1, -1)]
+    map_file.write_text('{"orientation": true}\n' +
+                        ''.join(f'{{"coordinates": [{q}, {r}]}}\n' for q, r in coords),
+                        encoding='utf-8')
+    tile_map = TileMap(mocker.MagicMock(), str(map_file))
+    tile_map.set_features((1, 0), ['farm'])
+    mocker.patch.object(tile_map.map_handler, 'append_delta', side_effect=OSError('disk full'))
+    with pytest.raises(OSError):
+        tile_map.save()
+    mocker.stopall()
+
+    tile_map.save()
+    assert TileMap(mocker.MagicMock(), str(map_file)).tiles[(1, 0)].features == ['farm']
+
+
+def test_tile_map_save_writes_new_seed(mocker, tmp_path):
+    '''The first save after the seed is set rewrites the header, then saves go to the delta log'''
+    map_file = tmp_path / 'map.ffm'
+    coords = [(0, 0), (1, 0), (-1, 1), (0, 1), (-1, 0), (0, -1), (1, -1)]
+    map_file.write_text('{"orientation": true}\n' +
+                        ''.join(f'{{"coordinates": [{q}, {r}]}}\n' for q, r in coords),
+                        encoding='utf-8')
+    tile_map = TileMap(mocker.MagicMock(), str(map_file))
+    tile_map.map_handler.seed = 1234
+    tile_map.save()
+    assert MapHandler(str(map_file)).seed == 1234
+    tile_map.set_features((1, 0), ['farm'])
+    tile_map.save()
+    assert os.path.exists(tile_map.map_handler.delta_file)
+
+
+def test_tile_dominant_color(mocker):
+    '''A tile's dominant color blends its layers and fill, and is reset when it changes'''
+    assets = mocker.Mock()
+    assets.get_average_color.return_value = (100, 200, 0, 255)
+    tile = Tile(HexInfo(0, 0, True, 1, (255, 0, 0, 255)), [Layer('grass')], assets)
+    assert tile.dominant_color() == (100, 200, 0)
+    # A filled hex covers the layers
+    tile.hex_info.border = 0
+    assert tile.dominant_color() == (100, 200, 0)
+    tile.invalidate()
+    assert tile.dominant_color() == (255, 0, 0)
+    # With no layers only the outline shows
+    tile = Tile(HexInfo(0, 0, True, 1, (0, 0, 255, 64)), [], assets)
+    assert tile.dominant_color() == (0, 0, 255)
@@ -0,0 +1,70 @@
+'''Tests for the compiled schema validators'''
+import jsonschema
+import pytest
+from jsonschema.exceptions import ValidationError
+
+from ffrontier.game.maphandler import MAP_DATA_SCHEMA
+from ffrontier.tools.mapgen import DISTRIBUTION_SCHEMA
+from ffrontier.utils.validation import compile_schema
+
+
+TILES = [
+    {'coordinates': [0, 0]},
+    {'coordinates': [1.0, -2], 'layers': [{'image': 'a', 'alpha': 3}], 'border': 2},
+    {'coordinates': [0, 0], 'features': ['tree'], 'color': '#ffffff'},
+    {'coordinates': [0]},
+    {'coordinates': [0, 0, 0]},
+    {'coordinates': [0, True]},
+    {'coordinates': [0, 1.5]},
+    {'coordinates': '0,0'},
+    {'layers': []},
+    {'coordinates': [0, 0], 'layers': [{'alpha': 3}]},
+    {'coordinates': [0, 0], 'layers': [{'image': 'a', 'alpha': '3'}]},
+    {'coordinates': [0, 0], 'border': False},
+    {'coordinates': [0, 0], 'features': [1]},
+    {'coordinates': [0, 0], 'unknown': object()},
+    [0, 0],
+    None,
+]
+
+
+@pytest.mark.parametrize('tile', TILES)
+def test_matches_jsonschema(tile):
+    '''The generated check agrees with jsonschema and raises the same error'''
+    validator = compile_schema(MAP_DATA_SCHEMA)
+    assert validator.source is not None
+    expected = jsonschema.Draft202012Validator(MAP_DATA_SCHEMA).is_valid(tile)
+    assert validator.is_valid(tile) == expected
+    if expected:
+        validator(tile)
+        return
+    with pytest.raises(ValidationError) as error:
+        validator(tile)
+    with pytest.raises(ValidationError) as reference:
+        jsonschema.validate(tile, MAP_DATA_SCHEMA)
+    assert error.value.message == reference.value.message
+
+
+def test_limits():
+    '''minItems, maxItems and number types are checked'''
+    validator = compile_schema(DISTRIBUTION_SCHEMA)
+    assert validator.is_valid({'terrains': [{'weight': 0.5}]})
+    assert not validator.is_valid({'terrains': []})
+    assert not validator.is_valid({'terrains': [{'weight': '1'}]})
+    assert not validator.is_valid({'terrains': [{'weight': 1}],
+                                   'features': [{'name': 'x', 'chance': 1}] * 13})
+
+
+def test_unsupported_keywords_fall_back():
+    '''Schemas with keywords the generator doesn't know still validate, through jsonschema'''
+    schema = {'type': 'string', 'enum': ['a', 'b']}
+    validator = compile_schema(schema)
+    assert validator.source is None
+    validator('a')
+    with pytest.raises(ValidationError):
+        validator('c')
+
+
+def test_compiled_once():
+    '''The same schema object shares one validator'''
+    assert compile_schema(MAP_DATA_SCHEMA) is compile_schema(MAP_DATA_SCHEMA)